@@ -37,6 +37,7 @@ def main(key="basic", url="ws://localhost:8000/connect/text", debug=False):
     q.open()
 
     s = Subcribe(your_app_client_id, your_app_client_secret, queue, debug)
+    q.labels = s.labels
 
     # list data streams
     streams = ["eeg", "mot", "met", "pow"]
@@ -1330,11 +1331,17 @@ class QueryAPI:
         self._responded = threading.Event()
         self._response = None
         self._responded.set()
+        self._resume = None
+        self._declared = set()
+        self._deadline = None
+        # Channel names by stream, from Subcribe.on_new_data_labels
+        self.labels = {}
 
     def trigger(self, timeout=None):
         if not self._trigger.is_set() and self._responded.is_set():
             self._responded.clear()
             self._response = None
+            self._deadline = timeout
             self._trigger.set()
             self.wait(timeout)
         return self._response
@@ -1342,9 +1349,14 @@ class QueryAPI:
     def wait(self, timeout=None):
         self._responded.wait(timeout)
 
+    def marker(self, label, value=None):
+        if self.is_open:
+            self.ws.send(json.dumps({"marker": label, "value": value}))
+
     def join(self):
         self.transmit_thread.join()
-        self.websock_thread.join()
+        while self.websock_thread.is_alive():
+            self.websock_thread.join()
 
     def close(self):
         self.is_open = False
@@ -1352,9 +1364,20 @@ class QueryAPI:
         self.ws.close()
 
     def open(self):
+        self.connect()
+        threadName = "TransmitThread:-{:%Y%m%d%H%M%S}".format(datetime.utcnow())
+        self.transmit_thread = threading.Thread(
+            target=self.handler, args=(), name=threadName
+        )
+        self.transmit_thread.start()
+
+    def connect(self):
+        url = self.url
+        if self._resume:
+            url += ("&" if "?" in url else "?") + "resume=" + self._resume
         # websocket.enableTrace(True)
         self.ws = websocket.WebSocketApp(
-            self.url,
+            url,
             on_message=self.on_message,
             on_open=self.on_open,
             on_error=self.on_error,
@@ -1375,12 +1398,6 @@ class QueryAPI:
         )
         self.websock_thread.start()
 
-        threadName = "TransmitThread:-{:%Y%m%d%H%M%S}".format(datetime.utcnow())
-        self.transmit_thread = threading.Thread(
-            target=self.handler, args=(), name=threadName
-        )
-        self.transmit_thread.start()
-
     def handler(self):
         while not self._stopped:
             time.sleep(0.001)
@@ -1393,7 +1410,22 @@ class QueryAPI:
             if triggered:
                 self._trigger.clear()
 
-            self.ws.send(json.dumps({"triggered": triggered, "values": data}))
+            key = next((k for k in ("mot", "dev", "met", "pow") if k in data), None)
+            if key is None:
+                frame = {"triggered": triggered, "values": data}
+                if triggered and self._deadline is not None:
+                    # The server drops the trigger once we stop waiting
+                    frame["deadline"] = self._deadline
+                self.ws.send(json.dumps(frame))
+            else:
+                if key not in self._declared:
+                    declare = {"declare": key, "channels": self.labels[key]}
+                    self.ws.send(json.dumps(declare))
+                    self._declared.add(key)
+                frame = {"stream": key, "values": data[key], "triggered": triggered}
+                if "time" in data:
+                    frame["time"] = data["time"]
+                self.ws.send(json.dumps(frame))
             self.queue.task_done()
 
     def print(self, *args, **kwargs):
@@ -1402,6 +1434,8 @@ class QueryAPI:
 
     def on_open(self, *args, **kwargs):
         self.is_open = True
+        self._resume = None
+        self._declared = set()
         self.print("websocket opened")
 
     def on_error(self, *args):
@@ -1412,9 +1446,21 @@ class QueryAPI:
         self.is_open = False
         self.print("on_close")
         self.print(args[1])
+        if self._resume and not self._stopped:
+            # The server is restarting: pick the session up on another worker
+            time.sleep(1)
+            self.connect()
 
     def on_message(self, *args):
         data = json.loads(args[1])
+        if "ping" in data:
+            return
+        if "reconnect" in data:
+            # Stop sending, hand the token back and wait for the server to close
+            self.is_open = False
+            self._resume = data["reconnect"]
+            self.ws.send(json.dumps(data))
+            return
         self._response = data
         self._responded.set()
 
@@ -1,7 +1,17 @@
-from importlib.metadata import PackageNotFoundError, version
+def __getattr__(name):
+    # resolved on first use so that importing reapi, and the worker processes
+    # that import reapi.ai, never pay for a package metadata lookup
+    if name != "__version__":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    global __version__
+    try:
+        from ._version import version as __version__
+    except ImportError:  # pragma: no cover
+        from importlib.metadata import PackageNotFoundError, version
 
-try:
-    __version__ = version(__name__)
-except PackageNotFoundError:  # pragma: no cover
-    # package is not installed
-    __version__ = "0.0.0.dev0"
+        try:
+            __version__ = version(__name__)
+        except PackageNotFoundError:
+            # package is not installed
+            __version__ = "0.0.0.dev0"
+    return __version__
@@ -0,0 +1,113 @@
+import asyncio
+import secrets
+from typing import Annotated
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from . import memory, profiler
+from .ai import registry
+from .scheduler import scheduler
+from .tracing import tracer
+
+
+def require_admin(request: Request, authorization: Annotated[str, Header()] = ""):
+    token = request.app.state.settings.admin_token
+    if token is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+    if not secrets.compare_digest(authorization, f"Bearer {token}"):
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED)
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+class ModelSource(BaseModel):
+    version: str
+    source: str
+
+
+@router.get("/models")
+async def models():
+    return registry.summary()
+
+
+@router.post("/models")
+async def load_model(spec: ModelSource):
+    """Load a version in a worker thread; it takes no traffic until split."""
+    try:
+        await asyncio.to_thread(registry.load, spec.version, spec.source)
+    except (ImportError, AttributeError) as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+    return registry.summary()
+
+
+@router.put("/models/split")
+async def split(weights: dict[str, float]):
+    try:
+        registry.split(weights)
+    except KeyError as e:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"unknown versions: {e}")
+    except ValueError as e:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, str(e))
+    return registry.summary()
+
+
+@router.delete("/models/{version}")
+async def remove(version: str):
+    if version not in registry.models:
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+    try:
+        registry.remove(version)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_409_CONFLICT, str(e))
+    return registry.summary()
+
+
+@router.get("/memory")
+async def memory_usage():
+    return dict(memory.usage(), weights=memory.weights(registry))
+
+
+@router.get("/scheduler")
+async def scheduling():
+    return scheduler.summary()
+
+
+@router.get("/traces")
+async def traces(limit: int = 20):
+    return tracer.summary(limit)
+
+
+@router.put("/traces")
+async def trace_rate(rate: Annotated[float, Query(ge=0, le=1)]):
+    tracer.rate = rate
+    return tracer.summary(0)
+
+
+profiling = asyncio.Lock()
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: Annotated[float, Query(gt=0, le=60)] = 5.0,
+    interval: Annotated[float, Query(ge=0.001, le=1)] = 0.005,
+):
+    """
+    Sample every thread's stack for ``seconds`` and return the counts in
+    the folded format of flame graph tools.
+    """
+    if profiling.locked():
+        raise HTTPException(status.HTTP_409_CONFLICT, "already profiling")
+    async with profiling:
+        counts = await asyncio.to_thread(profiler.sample, seconds, interval)
+    return profiler.folded(counts)
@@ -1,11 +1,40 @@
+import os
+
 from ..models import EEGValues
+from .registry import Registry
+
+registry = Registry()
 
+THREAD_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
 
-def call_eeg_to_text(values: EEGValues):
+
+def limit_threads(threads, environ=os.environ):
     """
-    Used to ensure lazy import of multiple models during testing.
-    A better solution is required for production.
+    Cap the intra-op thread pools of numpy's BLAS and of onnxruntime so that
+    several uvicorn workers do not oversubscribe the cores. The BLAS pools
+    are sized when numpy is first imported, which reapi defers until the
+    app warms up, so this has to run before that.
     """
-    from . import text
+    registry.threads = threads
+    if threads:
+        for name in THREAD_VARIABLES:
+            environ.setdefault(name, str(threads))
+
 
-    return text.eeg_to_text(values)
+def get_model(version=None):
+    return registry.get(version)
+
+
+def call_eeg_to_text(values: EEGValues, window=None, features=None, version=None):
+    """
+    Decode with ``version``, or with the version that takes default traffic.
+    Models are only imported once the registry first needs them.
+    """
+    if version is None:
+        version = registry.primary
+    return registry.decode(version, values, window, features)
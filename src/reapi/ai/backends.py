@@ -0,0 +1,153 @@
+"""
+Inference backends for CPU-only nodes.
+
+``NumpyBackend`` runs a small layer graph straight from a memory-mapped
+weights file, and ``OnnxBackend`` runs an ONNX model when onnxruntime is
+installed. Both take ``(batch, inputs)`` float arrays and return scores.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+
+from .features import RunningMean, RunningVariance
+from .model import Model
+from .weights import Weights
+
+
+def softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+class Backend(ABC):
+    vocabulary = ()
+    inputs = ("mean", "variance")
+    size = None
+
+    @abstractmethod
+    def run(self, x):
+        """Return the ``(batch, outputs)`` scores of ``(batch, inputs)`` x."""
+
+
+class NumpyBackend(Backend):
+    """
+    Runs the ``layers`` listed in the weights metadata, for example
+    ``[{"op": "dense", "weight": "w0", "bias": "b0"}, {"op": "relu"}]``.
+    Matrices are multiplied a ``block`` of elements at a time, converting
+    only that block to float32, and the row scales of quantized matrices are
+    applied to the output, so the weights are never dequantized in memory as
+    a whole.
+    """
+
+    block = 1 << 20
+
+    OPS = {
+        "relu": lambda x: np.maximum(x, 0),
+        "tanh": np.tanh,
+        "softmax": softmax,
+    }
+
+    def __init__(self, path):
+        self.weights = Weights(path)
+        meta = self.weights.meta
+        self.layers = meta["layers"]
+        self.vocabulary = tuple(meta.get("vocabulary", ()))
+        self.inputs = tuple(meta.get("inputs", self.inputs))
+        for layer in self.layers:
+            if layer["op"] != "dense" and layer["op"] not in self.OPS:
+                raise ValueError(f"unknown op {layer['op']!r}")
+        dense = [layer for layer in self.layers if layer["op"] == "dense"]
+        if dense:
+            self.size = self.weights[dense[0]["weight"]][0].shape[1]
+
+    def run(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        for layer in self.layers:
+            if layer["op"] != "dense":
+                x = self.OPS[layer["op"]](x)
+                continue
+            weight, scale = self.weights[layer["weight"]]
+            x = self._dense(x, weight)
+            if scale is not None:
+                x *= scale
+            if "bias" in layer:
+                x += self.weights[layer["bias"]][0]
+            x = x.astype(np.float32, copy=False)
+        return x
+
+    def _dense(self, x, weight):
+        out = np.empty((len(x), len(weight)), dtype=np.float32)
+        rows = max(1, self.block // weight.shape[1])
+        for i in range(0, len(weight), rows):
+            block = weight[i : i + rows].astype(np.float32, copy=False)
+            out[:, i : i + rows] = x @ block.T
+        return out
+
+
+class OnnxBackend(Backend):
+    def __init__(self, path, threads=None):
+        try:
+            import onnxruntime
+        except ImportError as e:  # pragma: no cover
+            raise ImportError("ONNX models need onnxruntime installed") from e
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            str(path), options, providers=["CPUExecutionProvider"]
+        )
+        (input,) = self.session.get_inputs()
+        self._input = input.name
+        if isinstance(input.shape[-1], int):
+            self.size = input.shape[-1]
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.vocabulary = tuple(json.loads(meta.get("vocabulary", "[]")))
+        self.inputs = tuple(json.loads(meta.get("inputs", "null")) or self.inputs)
+
+    def run(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        return self.session.run(None, {self._input: x})[0]
+
+
+def open_backend(path, threads=None):
+    if Path(path).suffix == ".onnx":
+        return OnnxBackend(path, threads)
+    return NumpyBackend(path)
+
+
+class Network(Model):
+    """
+    Decodes the session's running channel statistics with a backend and
+    returns the ``words`` best scoring entries of its vocabulary.
+    """
+
+    def __init__(self, backend, words=4):
+        self.backend = backend
+        self.words = words
+
+    @classmethod
+    def open(cls, path, threads=None, words=4):
+        return cls(open_backend(path, threads), words)
+
+    def extractors(self, fs):
+        return {"mean": RunningMean(), "variance": RunningVariance()}
+
+    def warm_up(self):
+        if self.backend.size:
+            self.backend.run(np.zeros((1, self.backend.size)))
+
+    def head(self, values, window, features):
+        inputs = [features[name] for name in self.backend.inputs]
+        if any(x is None for x in inputs):
+            if self.backend.size is None:
+                return []
+            x = np.zeros(self.backend.size)
+        else:
+            x = np.concatenate(inputs)
+        scores = self.backend.run(x[None])[0]
+        best = np.argsort(scores)[::-1][: self.words]
+        return [self.backend.vocabulary[i] for i in best]
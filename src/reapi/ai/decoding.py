@@ -0,0 +1,266 @@
+"""
+Beam search from per-step symbol scores to words.
+
+A sequence model scores, at every step, each symbol of an ``alphabet``
+whose first symbol is the blank, which emits nothing, and which has a
+space between words. ``BeamSearch`` keeps the best hypotheses, extending
+them step by step with the symbols that keep them within a ``Trie`` of the
+vocabulary and scoring every completed word with a language model. The
+language model states of word prefixes are shared through an LRU
+``PrefixCache``, across hypotheses and across decodes.
+
+``BeamModel`` runs the search incrementally in a session: its ``beams``
+extractor collects the rows that arrive between triggers, and a trigger
+scores only those and extends the hypotheses kept from the previous one.
+Words that every hypothesis agrees on are committed: a trigger answers with
+the words committed since the previous one, and they are dropped from the
+hypotheses, which stay as short as the words still in doubt.
+"""
+
+import heapq
+import math
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from .features import Extractor
+from .model import Model
+
+END = ""
+
+
+class Trie:
+    def __init__(self, words=()):
+        self.root = {}
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[END] = True
+
+    def __contains__(self, word):
+        node = self.find(word)
+        return node is not None and END in node
+
+    def find(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+
+class LanguageModel:
+    """Scores words given a hashable state summarising the words before."""
+
+    def initial(self):
+        return ()
+
+    def score(self, state, word):
+        """Return the log probability of ``word`` after ``state`` and the next state."""
+        return 0.0, state
+
+
+class Bigram(LanguageModel):
+    """A bigram model with add-``k`` smoothing, estimated from sentences."""
+
+    def __init__(self, sentences, k=1.0):
+        self.k = k
+        self.unigrams = Counter()
+        self.bigrams = Counter()
+        for words in sentences:
+            words = ["<s>", *words]
+            self.unigrams.update(words)
+            self.bigrams.update(zip(words, words[1:]))
+        self.vocabulary = len(self.unigrams)
+
+    def initial(self):
+        return "<s>"
+
+    def score(self, state, word):
+        count = self.bigrams[state, word] + self.k
+        total = self.unigrams[state] + self.k * self.vocabulary
+        return math.log(count / total), word
+
+
+class PrefixCache:
+    """LRU cache of ``(state, word) -> (log probability, state)``."""
+
+    def __init__(self, lm, size=4096):
+        self.lm = lm
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def score(self, state, word):
+        key = state, word
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        entry = self.entries[key] = self.lm.score(state, word)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return entry
+
+
+def _score(hypothesis):
+    return hypothesis[0]
+
+
+def _unlink(words):
+    result = []
+    while words is not None:
+        word, words = words
+        result.append(word)
+    return result[::-1]
+
+
+def _link(words):
+    linked = None
+    for word in words:
+        linked = word, linked
+    return linked
+
+
+class BeamSearch:
+    def __init__(self, trie, alphabet, cache, width=8, lm_weight=0.5):
+        self.trie = trie
+        self.index = {symbol: i for i, symbol in enumerate(alphabet)}
+        self.space = self.index[" "]
+        self.cache = cache
+        self.width = width
+        self.lm_weight = lm_weight
+        self.reset()
+
+    def reset(self):
+        # (score, acoustic, lm score, words, partial word, trie node, lm state),
+        # with words as a linked list of (word, words before)
+        self.beams = [
+            (0.0, 0.0, 0.0, None, "", self.trie.root, self.cache.lm.initial())
+        ]
+
+    def extend(self, scores):
+        """Extend the hypotheses with ``(steps, symbols)`` log probabilities."""
+        for row in np.asarray(scores, dtype=float).tolist():
+            candidates = {}
+            for _, acoustic, lm, words, partial, node, state in self.beams:
+                hyp = acoustic + row[0], lm, words, partial, node, state
+                self._add(candidates, *hyp)
+                for char, child in node.items():
+                    if char != END:
+                        index = self.index[char]
+                        hyp = acoustic + row[index], lm, words, partial + char, child
+                        self._add(candidates, *hyp, state)
+                if END in node and partial:
+                    logp, after = self.cache.score(state, partial)
+                    hyp = acoustic + row[self.space], lm + logp, (partial, words)
+                    self._add(candidates, *hyp, "", self.trie.root, after)
+            self.beams = heapq.nlargest(self.width, candidates.values(), key=_score)
+
+    def _add(self, candidates, acoustic, lm, words, partial, node, state):
+        score = acoustic + self.lm_weight * lm
+        # Hypotheses that agree on the future are merged, keeping the best
+        key = state, partial, id(node)
+        if key not in candidates or candidates[key][0] < score:
+            candidates[key] = score, acoustic, lm, words, partial, node, state
+
+    def best(self):
+        """The words of the best hypothesis, with its unfinished word."""
+        _, _, _, words, partial, _, _ = max(self.beams, key=_score)
+        return _unlink(words) + ([partial] if partial else [])
+
+    def commit(self):
+        """
+        Drop the first words that every hypothesis agrees on from all of
+        them and return those words.
+        """
+        lists = [_unlink(words) for _, _, _, words, *_ in self.beams]
+        agreed = 0
+        for words in zip(*lists):
+            if len(set(words)) > 1:
+                break
+            agreed += 1
+        if agreed:
+            self.beams = [
+                (*beam[:3], _link(words[agreed:]), *beam[4:])
+                for beam, words in zip(self.beams, lists)
+            ]
+        return lists[0][:agreed]
+
+
+class Beams(Extractor):
+    """
+    Collects the rows that arrive between decodes for a ``BeamSearch``,
+    keeping the newest ``window`` of them.
+    """
+
+    def __init__(self, search, window=256):
+        self.search = search
+        self.window = window
+        self.pending = []
+        self.lock = threading.Lock()
+        self._pending = threading.Lock()
+
+    def update(self, x):
+        with self._pending:
+            self.pending.append(x)
+            if sum(len(rows) for rows in self.pending) > self.window:
+                # A session that streams without triggering drops its oldest
+                self.pending = [np.concatenate(self.pending)[-self.window :]]
+
+    def take(self):
+        with self._pending:
+            pending, self.pending = self.pending, []
+        return pending
+
+    def value(self):
+        return self
+
+    def __getstate__(self):
+        # Locks do not pickle, as into the snapshot of a draining session
+        return {"search": self.search, "window": self.window, "pending": self.pending}
+
+    def __setstate__(self, state):
+        self.__init__(state["search"], state["window"])
+        self.pending = state["pending"]
+
+
+class BeamModel(Model):
+    """
+    A decoder that turns rows of a window into ``(steps, symbols)`` log
+    probabilities with ``emit`` and searches them for the words of
+    ``vocabulary``, scored by ``lm``. Between decodes, the newest ``window``
+    rows are kept. Each decode returns the words committed since the last.
+    """
+
+    def __init__(
+        self, emit, vocabulary, alphabet, lm=None, width=8, cache=4096, window=256
+    ):
+        self.emit = emit
+        self.trie = Trie(vocabulary)
+        self.alphabet = alphabet
+        self.lm = lm or LanguageModel()
+        self.width = width
+        self.cache = cache
+        self.window = window
+
+    def extractors(self, fs):
+        cache = PrefixCache(self.lm, self.cache)
+        search = BeamSearch(self.trie, self.alphabet, cache, self.width)
+        return {"beams": Beams(search, self.window)}
+
+    def head(self, values, window, features):
+        beams = features["beams"]
+        with beams.lock:
+            pending = beams.take()
+            if pending:
+                beams.search.extend(self.emit(np.concatenate(pending)))
+            return beams.search.commit()
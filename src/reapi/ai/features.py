@@ -0,0 +1,108 @@
+"""
+Incremental feature extractors.
+
+Extractors are updated with each batch of ``(samples, channels)`` rows as
+it arrives, so the cost of reading their value does not grow with the
+length of the session. A ``decay`` below one weights each sample by
+``decay ** age``, which turns the running statistics into exponentially
+forgetting ones.
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class Extractor(ABC):
+    @abstractmethod
+    def update(self, x):
+        """Take the next ``(samples, channels)`` rows."""
+
+    @abstractmethod
+    def value(self):
+        """The feature over every row so far."""
+
+
+class RunningMean(Extractor):
+    """Weighted mean and variance merged batch by batch (Chan et al.)."""
+
+    def __init__(self, decay=1.0):
+        self.decay = decay
+        self.weight = 0.0
+        self.mean = self._m2 = None
+
+    def update(self, x):
+        if not len(x):
+            return
+        w = self.decay ** np.arange(len(x) - 1, -1, -1.0)[:, None]
+        weight = w.sum()
+        mean = (w * x).sum(axis=0) / weight
+        m2 = (w * (x - mean) ** 2).sum(axis=0)
+        if self.mean is None:
+            self.weight, self.mean, self._m2 = weight, mean, m2
+            return
+        scale = self.decay ** len(x)
+        previous = self.weight * scale
+        self.weight = previous + weight
+        delta = mean - self.mean
+        self.mean = self.mean + delta * weight / self.weight
+        self._m2 = self._m2 * scale + m2 + delta**2 * previous * weight / self.weight
+
+    @property
+    def variance(self):
+        return None if self.mean is None else self._m2 / self.weight
+
+    def value(self):
+        return self.mean
+
+
+class RunningVariance(RunningMean):
+    def value(self):
+        return self.variance
+
+
+class Welch(Extractor):
+    """
+    Welch power spectral density, one-sided with density scaling, averaged
+    over every complete segment seen so far. Samples that do not yet fill
+    a segment are held back until the next update.
+    """
+
+    def __init__(self, fs, nperseg=128, noverlap=None, decay=1.0):
+        self.fs = fs
+        self.nperseg = nperseg
+        self.step = nperseg - (nperseg // 2 if noverlap is None else noverlap)
+        self.decay = decay
+        self.window = np.hanning(nperseg + 1)[:-1]
+        self.freqs = np.fft.rfftfreq(nperseg, 1 / fs)
+        self._scale = np.full(len(self.freqs), 2 / (fs * (self.window**2).sum()))
+        self._scale[0] /= 2
+        if nperseg % 2 == 0:
+            self._scale[-1] /= 2
+        self._pending = None
+        self._sum = None
+        self.weight = 0.0
+        self.segments = 0
+
+    def update(self, x):
+        if self._pending is not None:
+            x = np.concatenate([self._pending, x])
+        if len(x) < self.nperseg:
+            self._pending = x
+            return
+        segments = sliding_window_view(x, self.nperseg, axis=0)[:: self.step]
+        spectrum = np.fft.rfft(segments * self.window, axis=-1)
+        power = (np.abs(spectrum) ** 2 * self._scale).transpose(0, 2, 1)
+        n = len(segments)
+        w = self.decay ** np.arange(n - 1, -1, -1.0)[:, None, None]
+        total = (w * power).sum(axis=0)
+        scale = self.decay**n
+        self._sum = total if self._sum is None else self._sum * scale + total
+        self.weight = self.weight * scale + w.sum()
+        self.segments += n
+        self._pending = x[n * self.step :]
+
+    def value(self):
+        """Return a ``(frequencies, channels)`` array, or None before a segment."""
+        return None if self._sum is None else self._sum / self.weight
@@ -0,0 +1,46 @@
+from abc import ABC, abstractmethod
+
+from ..models import EEGValues
+
+
+class Model(ABC):
+    """
+    A text decoder split into incremental feature ``extractors`` and a
+    ``head`` that turns their current values into text. Sessions update
+    the extractors as samples arrive, so a trigger only runs the head.
+    When a session carries other streams besides the EEG, the features
+    passed to the head also map ``"streams"`` to their windows by stream id,
+    and ``"aligned"`` to the same streams, and the EEG as ``"eeg"``,
+    resampled at the times in ``"aligned_times"``. Once the session has
+    markers, ``"markers"`` lists the ``(index, label, value)`` of those in
+    the window, ``index`` being the row of the window they fall on.
+    """
+
+    def warm_up(self):  # noqa: B027
+        """Called once when loaded, before the model receives traffic."""
+
+    def extractors(self, fs):
+        return {}
+
+    @abstractmethod
+    def head(self, values: EEGValues, window, features):
+        """Return the text for the current ``features``."""
+
+    def __call__(self, values: EEGValues, window=None, fs=128.0):
+        """Decode ``window`` from scratch, as when there is no session."""
+        features = Features(self.extractors(fs))
+        if window is not None:
+            features.update(window)
+        return self.head(values, window, features.values())
+
+
+class Features:
+    def __init__(self, extractors):
+        self.extractors = extractors
+
+    def update(self, x):
+        for extractor in self.extractors.values():
+            extractor.update(x)
+
+    def values(self):
+        return {name: e.value() for name, e in self.extractors.items()}
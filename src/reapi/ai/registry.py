@@ -0,0 +1,146 @@
+import importlib
+import threading
+import time
+import zlib
+
+from ..stats import Stats
+from ..tracing import span
+
+MODEL_FILES = (".weights", ".onnx")
+
+
+def load(source, threads=None):
+    """
+    Import a model from ``package.module:attribute``, or open a weights or
+    ONNX file with a backend. Callable attributes that are not models yet
+    are called to build one.
+    """
+    from .model import Model
+
+    if source.endswith(MODEL_FILES):
+        from .backends import Network
+
+        return Network.open(source, threads)
+    module, _, name = source.partition(":")
+    model = getattr(importlib.import_module(module), name or "model")
+    if not isinstance(model, Model) and callable(model):
+        model = model()
+    return model
+
+
+class Registry:
+    """
+    Loaded model versions and how traffic is split between them.
+
+    Sessions are routed by key: a stable hash of the key picks a version
+    according to the weights, so a session keeps its version for as long as
+    the split does not change. Keys can also be pinned to a version. Loading
+    happens before a version is published, and the routing table is swapped
+    in one assignment, so callers never see a half-loaded model.
+    """
+
+    def __init__(self, default="reapi.ai.text:model"):
+        self.default = default
+        self.models = {}
+        self.stats = {}
+        self.loading = set()
+        self.pins = {}
+        self.threads = None
+        self._routes = ()
+        self._lock = threading.Lock()
+
+    @property
+    def weights(self):
+        return {version: weight for version, weight, _ in self._routes}
+
+    def add(self, version, model):
+        with self._lock:
+            self.models[version] = model
+            self.stats.setdefault(version, Stats())
+            if not self._routes:
+                self._publish({version: 1.0})
+
+    def load(self, version, source):
+        """Import, warm up and add a model; meant to run off the event loop."""
+        self.loading.add(version)
+        try:
+            model = load(source, self.threads)
+            model.warm_up()
+            self.add(version, model)
+        finally:
+            self.loading.discard(version)
+        return model
+
+    def split(self, weights):
+        with self._lock:
+            unknown = weights.keys() - self.models.keys()
+            if unknown:
+                raise KeyError(", ".join(sorted(unknown)))
+            self._publish(weights)
+
+    def _publish(self, weights):
+        weights = {v: float(w) for v, w in sorted(weights.items()) if w > 0}
+        total = sum(weights.values())
+        if not total:
+            raise ValueError("at least one version needs a positive weight")
+        routes, bound = [], 0.0
+        for version, weight in weights.items():
+            bound += weight / total
+            routes.append((version, weight, bound))
+        self._routes = tuple(routes)
+
+    def remove(self, version):
+        with self._lock:
+            if version in self.weights:
+                raise ValueError(f"{version} still receives traffic")
+            del self.models[version]
+            self.pins = {k: v for k, v in self.pins.items() if v != version}
+
+    @property
+    def primary(self):
+        """The version with the largest share of traffic."""
+        routes = self._ensure()
+        return max(routes, key=lambda route: route[1])[0]
+
+    def _ensure(self):
+        if not self._routes:
+            self.load("default", self.default)
+        return self._routes
+
+    def route(self, key):
+        version = self.pins.get(key)
+        if version in self.models:
+            return version
+        routes = self._ensure()
+        point = zlib.crc32(str(key).encode()) / 2**32
+        for version, _, bound in routes[:-1]:
+            if point < bound:
+                return version
+        return routes[-1][0]
+
+    def get(self, version=None):
+        return self.models[self.primary if version is None else version]
+
+    def decode(self, version, values, window=None, features=None):
+        model = self.models[version]
+        start = time.perf_counter()
+        try:
+            with span("inference"):
+                if features is None:
+                    result = model(values, window)
+                else:
+                    result = model.head(values, window, features)
+        except Exception:
+            self.stats[version].observe(time.perf_counter() - start, True)
+            raise
+        self.stats[version].observe(time.perf_counter() - start)
+        return result
+
+    def summary(self):
+        return {
+            "weights": self.weights,
+            "loading": sorted(self.loading),
+            "versions": {
+                v: s.summary() for v, s in self.stats.items() if v in self.models
+            },
+        }
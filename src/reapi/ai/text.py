@@ -1,5 +1,20 @@
 from ..models import EEGValues
+from .features import RunningMean, RunningVariance
+from .model import Model
 
 
-def eeg_to_text(values: EEGValues):
-    return ["Some", "ai", "generated", "data"]
+class TextModel(Model):
+    def extractors(self, fs):
+        return {"mean": RunningMean(), "variance": RunningVariance()}
+
+    def head(self, values: EEGValues, window, features):
+        return ["Some", "ai", "generated", "data"]
+
+
+model = TextModel()
+
+
+def eeg_to_text(values: EEGValues, window=None, features=None):
+    if features is None:
+        return model(values, window)
+    return model.head(values, window, features)
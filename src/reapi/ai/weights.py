@@ -0,0 +1,98 @@
+"""
+Memory-mapped model weight files.
+
+A weights file is a JSON header followed by 64 byte aligned tensors. It is
+opened read-only with ``mmap`` so every worker process on a node shares the
+same page cache copy of the weights. Matrices may be stored as ``float16``
+or as symmetric ``int8`` with one ``float32`` scale per row; vectors are
+always ``float32``.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b"REAPIWTS"
+HEADER = struct.Struct("<8sQ")
+ALIGN = 64
+DTYPES = ("float32", "float16", "int8")
+
+
+def _align(size):
+    return -size % ALIGN
+
+
+def quantize(array):
+    """Symmetric per-row ``int8`` quantization, returning ``(data, scale)``."""
+    rows = array.reshape(len(array), -1)
+    scale = (np.abs(rows).max(axis=1) / 127).astype(np.float32)
+    scale[scale == 0] = 1
+    data = np.round(rows / scale[:, None]).astype(np.int8).reshape(array.shape)
+    return data, scale
+
+
+def save(path, tensors, dtype="float32", meta=None):
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(DTYPES)}")
+    entries, blobs, offset = {}, [], 0
+
+    def add(array):
+        nonlocal offset
+        array = np.ascontiguousarray(array)
+        blob = array.tobytes()
+        entry = {"dtype": array.dtype.name, "shape": array.shape, "offset": offset}
+        blobs.append(blob + b"\0" * _align(len(blob)))
+        offset += len(blobs[-1])
+        return entry
+
+    for name, array in tensors.items():
+        array = np.asarray(array, dtype=np.float32)
+        if array.ndim < 2 or dtype == "float32":
+            entries[name] = add(array)
+        elif dtype == "float16":
+            entries[name] = add(array.astype(np.float16))
+        else:
+            data, scale = quantize(array)
+            entries[name] = dict(add(data), scale=add(scale))
+    header = json.dumps({"tensors": entries, "meta": meta or {}}).encode()
+    header += b" " * _align(HEADER.size + len(header))
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(header)) + header)
+        f.writelines(blobs)
+
+
+class Weights:
+    def __init__(self, path):
+        self.path = path
+        self._map = np.memmap(path, dtype="u1", mode="r")
+        magic, size = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a reapi weights file")
+        header = json.loads(bytes(self._map[HEADER.size : HEADER.size + size]))
+        self.meta = header["meta"]
+        self._entries = header["tensors"]
+        self._start = HEADER.size + size
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def _view(self, entry):
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"]))
+        offset = self._start + entry["offset"]
+        data = np.frombuffer(self._map, dtype=dtype, count=count, offset=offset)
+        return data.reshape(entry["shape"])
+
+    def __getitem__(self, name):
+        """Return ``(array, scale)`` where ``scale`` is None unless quantized."""
+        entry = self._entries[name]
+        scale = entry.get("scale")
+        return self._view(entry), scale and self._view(scale)
+
+    @property
+    def nbytes(self):
+        return len(self._map)
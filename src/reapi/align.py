@@ -0,0 +1,93 @@
+"""
+Alignment of a session's streams on one time base.
+
+Streams arrive at their own rates and times. ``Alignment`` resamples every
+stream of a session, and its preprocessed EEG as ``"eeg"``, on a common
+grid, at the session's sample rate, with linear interpolation or
+sample-and-hold per stream. The grid trails the newest sample by
+``latency`` seconds, so the slower streams have usually arrived by the time
+a grid point is computed, and each point is computed once, as the samples
+after it arrive. Points before a stream's first
+sample hold its first value, and points after its last hold its last.
+
+All times are on the session clock, ``Session.clock``: the server's Unix
+time when a frame arrives. EEG samples end at the arrival of their frame,
+spaced at the sample rate, and the times a client sends with its streams
+and markers, such as Cortex timestamps, are taken to be Unix times too.
+"""
+
+import math
+
+import numpy as np
+
+from .buffer import RingBuffer
+
+METHODS = ("linear", "hold")
+
+
+def resample(times, values, grid, method="linear"):
+    """Sample the rows of ``values``, taken at sorted ``times``, at ``grid``."""
+    right = np.searchsorted(times, grid, side="right")
+    before = np.maximum(right - 1, 0)
+    if method == "hold":
+        return values[before]
+    after = np.minimum(right, len(times) - 1)
+    span = times[after] - times[before]
+    weight = np.divide(
+        grid - times[before], span, out=np.zeros(len(grid)), where=span > 0
+    )
+    return values[before] + weight[:, None] * (values[after] - values[before])
+
+
+class Alignment:
+    def __init__(self, rate, capacity, latency=0.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.latency = latency
+        self.end = None
+        self.length = 0
+        self.buffers = {}
+
+    def grid(self, start, stop):
+        return np.arange(start, stop) / self.rate
+
+    def update(self, streams):
+        """Compute the grid points that the latest samples have settled."""
+        streams = {id: s for id, s in streams.items() if len(s.times)}
+        if not streams:
+            return
+        newest = max(s.times.view()[-1, 0] for s in streams.values())
+        stop = math.floor((newest - self.latency) * self.rate) + 1
+        if self.end is None:
+            first = min(s.times.view()[0, 0] for s in streams.values())
+            self.end = min(math.ceil(first * self.rate), stop)
+        start = max(self.end, stop - self.capacity)
+        if start > self.end:
+            # Too long a gap to carry on from the aligned rows
+            self.buffers.clear()
+            self.length = 0
+        stop = max(stop, start)
+        self.length = min(self.length + stop - start, self.capacity)
+        self.end = stop
+        for id, stream in streams.items():
+            held, buffer = self.buffers.get(id, (None, None))
+            if held is not stream:
+                # A new or redeclared stream is aligned over the whole grid
+                buffer = RingBuffer(self.capacity, len(stream.channels))
+                self.buffers[id] = stream, buffer
+                grid = self.grid(stop - self.length, stop)
+            else:
+                grid = self.grid(start, stop)
+            if len(grid):
+                times = stream.times.view()[:, 0]
+                buffer.extend(resample(times, stream.window(), grid, stream.method))
+        for id in self.buffers.keys() - streams.keys():
+            del self.buffers[id]
+
+    def times(self):
+        if self.end is None:
+            return np.zeros(0)
+        return self.grid(self.end - self.length, self.end)
+
+    def window(self):
+        return {id: buffer.view() for id, (_, buffer) in self.buffers.items()}
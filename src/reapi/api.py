@@ -1,18 +1,154 @@
-from fastapi import APIRouter, WebSocket
+import asyncio
+import json
+from contextlib import aclosing
 
-from .ai import call_eeg_to_text
-from .models import Message
-from .websockets import json_emitter
+from fastapi import APIRouter, WebSocket, status
+from pydantic import ValidationError
+
+from . import drain
+from .ai import registry
+from .continuous import Continuous
+from .extensions import build
+from .models import Options
+from .tracing import span, tracer
+from .websockets import frame_emitter, manager
 
 router = APIRouter()
 
 
+def warm_up(settings):
+    """
+    Import the numeric stack and load the models. Sessions import these
+    lazily so that the app itself imports quickly; the lifespan calls this
+    in a thread so that the first session does not pay for it.
+    """
+    from . import recording, session  # noqa: F401
+
+    for version, source in settings.models.items():
+        if version not in registry.models:
+            registry.load(version, source)
+    if settings.model_split:
+        registry.split(settings.model_split)
+    registry.get()
+
+
+def load(frame):
+    return frame if isinstance(frame, bytes) else json.loads(frame)
+
+
+def describe(error):
+    if isinstance(error, ValidationError):
+        error = error.errors()[0]
+        return f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+    return str(error)
+
+
+async def answer(session, data):
+    """Handle a frame, answering one that is invalid with why."""
+    try:
+        return await session.receive(data)
+    except (ValueError, KeyError, TypeError) as e:
+        return {"error": describe(e)}
+
+
+def reconnecting(session, data):
+    return session.token is not None and isinstance(data, dict) and "reconnect" in data
+
+
+async def watch(work, frames):
+    """
+    Await a trigger's ``work`` while reading the next frame ahead, so that
+    the work is cancelled if the client goes away meanwhile. Returns its
+    result and the task reading ahead, which is None once the socket closed.
+    """
+    work = asyncio.ensure_future(work)
+    ahead = asyncio.ensure_future(anext(frames, None))
+    try:
+        await asyncio.wait((work, ahead), return_when=asyncio.FIRST_COMPLETED)
+        if not work.done() and ahead.done() and ahead.result() is None:
+            await stop(work)
+            return None, None
+        return await work, ahead
+    except BaseException:
+        work.cancel()
+        await stop(ahead)
+        raise
+
+
+async def stop(task):
+    task.cancel()
+    await asyncio.wait([task])
+
+
+async def reject(ws: WebSocket, reason, code=status.WS_1008_POLICY_VIOLATION):
+    await ws.close(code, reason)
+
+
 @router.websocket("/text")
 async def connect(ws: WebSocket):
-    async for data in json_emitter(ws):
-        msg = Message.model_validate(data)
-        if msg.triggered:
-            text = call_eeg_to_text(msg.values)
-            await ws.send_json({"text": text})
-        else:
-            await ws.send_json({"ack": "received"})
+    try:
+        options = Options.model_validate(dict(ws.query_params))
+    except ValidationError as e:
+        return await reject(ws, describe(e))
+    warmup = getattr(ws.app.state, "warmup", None)
+    if warmup is not None:
+        await warmup
+    if options.model is not None and options.model not in registry.models:
+        return await reject(ws, f"model: unknown version {options.model}")
+    settings = ws.app.state.settings
+    if ws.app.state.drain is not None:
+        return await reject(ws, "draining", status.WS_1013_TRY_AGAIN_LATER)
+    limits = settings.max_connections, settings.max_client_connections
+    reason = manager.refuse(ws, *limits)
+    if reason is not None:
+        return await reject(ws, reason, status.WS_1013_TRY_AGAIN_LATER)
+    from .session import Session
+
+    snapshot = options.resume and drain.load(settings, options.resume)
+    if snapshot:
+        session = Session.restore(snapshot, options, settings)
+    else:
+        session = Session(options, settings)
+    continuous = task = None
+    try:
+        session.extensions = build(ws, session)
+        if options.mode == "continuous":
+            continuous = Continuous(options.hop, session.decode, ws.send_json)
+            task = asyncio.create_task(continuous.run())
+        frames = frame_emitter(ws, session, settings.max_message)
+        ahead = None
+        async with aclosing(frames):
+            try:
+                while True:
+                    frame = await (ahead or anext(frames, None))
+                    if frame is None:
+                        break
+                    ahead = None
+                    with tracer.trace("frame"):
+                        try:
+                            with span("parse"):
+                                data = load(frame)
+                        except ValueError as e:
+                            await ws.send_json({"error": f"invalid JSON: {e}"})
+                            continue
+                        if reconnecting(session, data):
+                            break
+                        work = answer(session, data)
+                        if isinstance(data, dict) and data.get("triggered"):
+                            response, ahead = await watch(work, frames)
+                            if ahead is None:
+                                break
+                        else:
+                            response = await work
+                        if response is not None:
+                            with span("send"):
+                                await ws.send_json(response)
+            finally:
+                if ahead is not None:
+                    await stop(ahead)
+        if session.token is not None:
+            await drain.hand_off(ws, session, continuous, task)
+    finally:
+        if task is not None:
+            task.cancel()
+        session.close()
@@ -1,12 +1,74 @@
+import asyncio
+import gc
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from . import __version__
-from .api import router
+from . import __version__, admin, drain, health, ingest, sessions
+from .ai import limit_threads
+from .api import router, warm_up
+from .config import Settings
+from .extensions import EXTENSIONS
+from .scheduler import scheduler
+from .tracing import tracer
+from .websockets import manager
+
+
+def preload(settings):
+    """
+    Load the models before worker processes are forked, as under gunicorn
+    with ``--preload``. Workers then share the parent's model memory
+    copy-on-write. Freezing the garbage collector keeps collections in the
+    workers from writing to, and so copying, the pages of preloaded objects.
+    """
+    warm_up(settings)
+    gc.freeze()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    settings = app.state.settings
+    if settings.preprocess:
+        from .preprocess import build
+
+        # A bad spec fails the startup instead of every session
+        await asyncio.to_thread(build, settings.preprocess, settings.sample_rate)
+    app.state.drain = None
+    app.state.warmup = asyncio.ensure_future(asyncio.to_thread(warm_up, settings))
+    reaper = None
+    if settings.heartbeat or settings.idle_timeout:
+        timeouts = settings.heartbeat, settings.idle_timeout
+        reaper = asyncio.create_task(manager.reap(*timeouts))
+    if settings.sink is not None:
+        from .sink import open_sink
+
+        open_sink(settings)
+    drain.install(app)
+    yield
+    await drain.start(app)
+    if reaper is not None:
+        reaper.cancel()
+    if settings.sink is not None:
+        from .sink import close_sink
+
+        await asyncio.to_thread(close_sink)
 
 
-def make():
+def make(settings=None):
     app = FastAPI(
         version=__version__,
+        lifespan=lifespan,
     )
+    app.state.settings = settings = settings or Settings.from_env()
+    limit_threads(settings.threads)
+    scheduler.configure(settings.inference_workers, settings.priority_weights)
+    tracer.rate = settings.trace_rate
+    manager.configure(settings.buffer_slots)
+    app.state.extensions = list(EXTENSIONS)
+    app.state.drain = None
     app.include_router(router, prefix="/connect")
+    app.include_router(ingest.router, prefix="/ingest")
+    app.include_router(sessions.router, prefix="/sessions")
+    app.include_router(health.router, prefix="/health")
+    app.include_router(admin.router, prefix="/admin")
     return app
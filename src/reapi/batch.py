@@ -0,0 +1,201 @@
+"""
+Offline decoding of recorded sessions.
+
+Recordings are read block by block from their memory map and cut into
+sliding windows with strided views, so a whole day of samples is never
+copied at once. Batches of windows are decoded in a process pool and the
+results are yielded in order as they complete.
+
+As in a session, the samples go through the ``REAPI_PREPROCESS`` pipeline,
+built for the recording's rate, before they are cut into windows, and the
+model is given the last raw sample of each window as its values.
+"""
+
+import csv
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .ai import registry
+from .ai.registry import load
+from .config import Settings
+from .models import CHANNELS, EEGValues
+from .preprocess import build
+from .recording import Recording
+
+_models = {}
+
+
+def read_csv(path, channels=CHANNELS):
+    """
+    Read a CSV export such as the ones written by ``Cortex.export_record``.
+    Exports may start with a metadata line, so the header is the first row
+    naming every channel, either bare or with an ``EEG.`` prefix.
+    """
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            names = [name.strip() for name in row]
+            columns = [_find(names, name) for name in channels]
+            if None not in columns:
+                break
+        else:
+            raise ValueError(f"{path} has no columns for {', '.join(channels)}")
+    timestamp = _find(names, "Timestamp")
+    if timestamp is None:
+        timestamp = _find(names, "time")
+    if timestamp is not None:
+        columns.insert(0, timestamp)
+    data = np.loadtxt(
+        path, delimiter=",", skiprows=reader.line_num, usecols=columns, ndmin=2
+    )
+    if timestamp is None:
+        yield np.arange(len(data), dtype=float), data
+    else:
+        yield data[:, 0], data[:, 1:]
+
+
+def _find(names, name):
+    for candidate in (name, f"EEG.{name}"):
+        if candidate in names:
+            return names.index(candidate)
+
+
+def read_recording(path, channels=CHANNELS):
+    recording = Recording(path)
+    for times, _, values in recording.blocks():
+        yield times, np.column_stack([values[name] for name in channels])
+
+
+def read(path, channels=CHANNELS):
+    path = Path(path)
+    if path.suffix == ".csv":
+        return read_csv(path, channels)
+    return read_recording(path, channels)
+
+
+def sample_rate(path, default):
+    """
+    The rate of a recording, from its header, or of a CSV export, from a
+    metadata line such as ``sampling rate:eeg_128``, else ``default``.
+    """
+    path = Path(path)
+    if path.suffix != ".csv":
+        return float(Recording(path).meta.get("rate", default))
+    with open(path) as f:
+        match = re.search(r"sampling rate:\s*eeg_([\d.]+)", f.readline())
+    return float(match[1]) if match else default
+
+
+def preprocess(chunks, pipeline, fs):
+    """
+    Run ``(times, values)`` chunks through ``pipeline`` in order, keeping
+    the raw values after the processed ones on every row. Rows of a
+    decimated signal end at the chunk's last time, ``1 / rate`` apart.
+    """
+    rate = pipeline.rate(fs)
+    for times, values in chunks:
+        x = pipeline.process(values)
+        if len(x) != len(times):
+            end = times[-1] - np.arange(len(x) - 1, -1, -1) / rate
+            rows = np.searchsorted(times, end, side="right") - 1
+            times, values = end, values[np.maximum(rows, 0)]
+        if len(x):
+            yield times, np.hstack([x, values])
+
+
+def windows(chunks, size, hop, batch=256):
+    """
+    Yield ``(times, windows)`` batches where ``windows`` has the shape
+    ``(n, size, channels)`` and ``times`` holds the time of the last sample
+    of each window. Windows may span chunk boundaries.
+    """
+    tail_times = tail = None
+    base = 0  # index of values[0] since the start of the session
+    end = size - 1  # index of the last sample of the next window
+    for times, values in chunks:
+        if tail is not None:
+            times = np.concatenate([tail_times, times])
+            values = np.concatenate([tail, values])
+        if end - base < len(values):
+            start = end - base - (size - 1)
+            view = sliding_window_view(values, size, axis=0)[start::hop]
+            ends = times[end - base :: hop]
+            for i in range(0, len(view), batch):
+                yield ends[i : i + batch], view[i : i + batch].transpose(0, 2, 1)
+            end += hop * len(view)
+        keep = min(len(values), size - 1)
+        base += len(values) - keep
+        tail_times, tail = times[len(times) - keep :], values[len(values) - keep :]
+
+
+def model(source=None):
+    """The model at ``source``, loaded once per process, or the default."""
+    if source is None:
+        return registry.get()
+    if source not in _models:
+        _models[source] = load(source, registry.threads)
+        _models[source].warm_up()
+    return _models[source]
+
+
+def decode(batch, source=None, fs=128.0, width=None, channels=CHANNELS):
+    """
+    Decode windows with the model at ``source``. With ``width``, the
+    windows hold that many processed columns followed by the raw values.
+    """
+    times, windows = batch
+    decoder = model(source)
+    results = []
+    for time, window in zip(times.tolist(), windows):
+        raw = window[-1] if width is None else window[-1, width:]
+        values = EEGValues(**dict(zip(channels, raw.tolist())))
+        window = window if width is None else window[:, :width]
+        results.append({"time": time, "text": decoder(values, window, fs)})
+    return results
+
+
+def _jobs(paths, size, hop, batch, settings):
+    for path in paths:
+        chunks, fs, width = read(path), sample_rate(path, settings.sample_rate), None
+        if settings.preprocess:
+            pipeline = build(settings.preprocess, fs)
+            chunks = preprocess(chunks, pipeline, fs)
+            fs, width = pipeline.rate(fs), pipeline.width(len(CHANNELS))
+        for item in windows(chunks, size, hop, batch):
+            yield str(path), (item, fs, width)
+
+
+def run(paths, size, hop, workers=None, batch=256, source=None, settings=None):
+    """
+    Decode every window of every path with ``workers`` processes, yielding
+    one result dict per window in order. ``workers=0`` decodes inline.
+    ``source`` is a model as in the registry, by default the default model,
+    and ``settings`` give the preprocessing and the fallback sample rate.
+    """
+    jobs = _jobs(paths, size, hop, batch, settings or Settings())
+    if workers == 0:
+        for path, (item, fs, width) in jobs:
+            for result in decode(item, source, fs, width):
+                yield dict(source=path, **result)
+        return
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        limit = 2 * workers
+        for path, (item, fs, width) in jobs:
+            pending.append((path, pool.submit(decode, item, source, fs, width)))
+            while len(pending) >= limit or pending and pending[0][1].done():
+                yield from _results(*pending.popleft())
+        while pending:
+            yield from _results(*pending.popleft())
+
+
+def _results(source, future):
+    for result in future.result():
+        yield dict(source=source, **result)
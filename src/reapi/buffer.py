@@ -0,0 +1,32 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed capacity buffer of the most recent rows. Every row is written
+    twice, ``capacity`` rows apart, so the newest ``capacity`` rows are
+    always one contiguous slice and ``view`` never copies.
+    """
+
+    def __init__(self, capacity, width, dtype=float):
+        self.capacity = capacity
+        self._data = np.zeros((2 * capacity, width), dtype=dtype)
+        self._end = 0
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def extend(self, rows):
+        self.count += len(rows)
+        rows = rows[max(len(rows) - self.capacity, 0) :]
+        n = len(rows)
+        first = min(n, self.capacity - self._end)
+        for start, part in ((self._end, rows[:first]), (0, rows[first:])):
+            self._data[start : start + len(part)] = part
+            self._data[start + self.capacity : start + self.capacity + len(part)] = part
+        self._end = (self._end + n) % self.capacity
+
+    def view(self):
+        end = self._end + self.capacity
+        return self._data[end - len(self) : end]
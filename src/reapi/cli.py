@@ -0,0 +1,65 @@
+import argparse
+import json
+import sys
+from contextlib import nullcontext
+
+
+def replay(args):
+    from websockets.sync.client import connect
+
+    from .replay import replay
+
+    url = args.url
+    if "priority=" not in url:
+        url += ("&" if "?" in url else "?") + "priority=replay"
+    with connect(url) as ws:
+        for response in replay(args.recording, ws.send, ws.recv, args.speed):
+            if args.all or "ack" not in response:
+                print(json.dumps(response), flush=True)
+
+
+def batch(args):
+    from .batch import run
+
+    output = nullcontext(sys.stdout) if args.output == "-" else open(args.output, "w")
+    with output as out:
+        results = run(
+            args.paths, args.window, args.hop, args.workers, args.batch, args.model
+        )
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+
+
+def parser():
+    parser = argparse.ArgumentParser(prog="reapi", description="Reality Engine API")
+    commands = parser.add_subparsers(required=True)
+
+    command = commands.add_parser("replay", help="replay a recorded session")
+    command.add_argument("recording", help="path to a .reapi recording")
+    command.add_argument("--url", default="ws://localhost:8000/connect/text")
+    command.add_argument(
+        "--speed", type=float, default=1.0, help="playback rate, 0 for maximum"
+    )
+    command.add_argument("--all", action="store_true", help="also print acks")
+    command.set_defaults(func=replay)
+
+    command = commands.add_parser("batch", help="decode recorded sessions offline")
+    command.add_argument("paths", nargs="+", help=".reapi recordings or CSV exports")
+    command.add_argument("--window", type=int, default=256, help="window in samples")
+    command.add_argument("--hop", type=int, default=32, help="hop in samples")
+    command.add_argument(
+        "--workers", type=int, help="processes, 0 to decode inline (default: cores)"
+    )
+    command.add_argument("--batch", type=int, default=256, help="windows per task")
+    command.add_argument(
+        "--model", help="model source, as for the registry (default: the default)"
+    )
+    command.add_argument("-o", "--output", default="-", help="JSONL output file")
+    command.set_defaults(func=batch)
+
+    return parser
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    args.func(args)
@@ -0,0 +1,97 @@
+"""
+Batched sample frames.
+
+A batch carries several samples in one frame, one row per sample with the
+channels in ``CHANNELS`` order::
+
+    {"triggered": false, "samples": [[Cx, Drm], [Cx, Drm], ...]}
+
+With ``scale`` set the rows are integers: the first row is the first sample
+divided by ``scale`` and every other row is its difference from the row
+before. Slowly changing signals become runs of small integers, which take
+few characters and compress well under permessage-deflate. The trigger
+applies to the last sample.
+
+Binary frames carry the same thing more compactly: a ``HEADER`` with the
+magic, the trigger, the type code of the rows (``h`` or ``i`` for int16 or
+int32 deltas, ``f`` for float32 values), the number of rows and the scale,
+followed by the rows as little endian values.
+"""
+
+import struct
+
+import numpy as np
+
+from .models import CHANNELS
+
+MAGIC = b"RB"
+HEADER = struct.Struct("<2s?cHf")
+CODES = {b"h": "<i2", b"i": "<i4", b"f": "<f4"}
+
+
+def decode(rows, scale=None, width=None):
+    """Return the samples of a batch as a ``(rows, width)`` float array."""
+    width = width or len(CHANNELS)
+    values = np.asarray(rows, dtype=np.int64 if scale else np.float64)
+    if values.ndim != 2 or values.shape[1] != width:
+        if values.size:
+            raise ValueError(f"samples need {width} channels per row")
+        return np.empty((0, width))
+    if scale:
+        return np.cumsum(values, axis=0) * scale
+    return values
+
+
+def quantize(values, scale):
+    q = np.round(np.asarray(values, dtype=np.float64) / scale).astype(np.int64)
+    return np.diff(q, axis=0, prepend=np.zeros((1, q.shape[1]), dtype=np.int64))
+
+
+def encode(values, triggered=False, scale=None):
+    """Build a JSON batch frame, delta encoded when ``scale`` is given."""
+    rows = quantize(values, scale) if scale else np.asarray(values, dtype=float)
+    frame = {"triggered": triggered, "samples": rows.tolist()}
+    if scale:
+        frame["scale"] = scale
+    return frame
+
+
+def pack(values, triggered=False, scale=None):
+    """Build a binary batch frame, delta encoded when ``scale`` is given."""
+    if scale:
+        rows = quantize(values, scale)
+        code = b"h" if np.abs(rows).max(initial=0) < 2**15 else b"i"
+    else:
+        rows, code = values, b"f"
+    rows = np.ascontiguousarray(rows, dtype=CODES[code])
+    return HEADER.pack(MAGIC, triggered, code, len(rows), scale or 0) + rows.tobytes()
+
+
+def split(data):
+    """Split concatenated binary frames, returning them and the incomplete rest."""
+    frames, offset = [], 0
+    while len(data) - offset >= HEADER.size:
+        magic, _, code, count, _ = HEADER.unpack_from(data, offset)
+        if magic != MAGIC or code not in CODES:
+            raise ValueError("not a reapi batch frame")
+        size = count * len(CHANNELS) * np.dtype(CODES[code]).itemsize
+        end = offset + HEADER.size + size
+        if end > len(data):
+            break
+        frames.append(bytes(data[offset:end]))
+        offset = end
+    return frames, data[offset:]
+
+
+def unpack(frame):
+    """Return ``(triggered, values)`` from a binary batch frame."""
+    if len(frame) < HEADER.size:
+        raise ValueError("batch frame shorter than its header")
+    magic, triggered, code, count, scale = HEADER.unpack_from(frame)
+    if magic != MAGIC or code not in CODES:
+        raise ValueError("not a reapi batch frame")
+    dtype = np.dtype(CODES[code])
+    if len(frame) != HEADER.size + count * len(CHANNELS) * dtype.itemsize:
+        raise ValueError("batch frame size does not match its header")
+    rows = np.frombuffer(frame, dtype=dtype, offset=HEADER.size)
+    return triggered, decode(rows.reshape(count, len(CHANNELS)), scale)
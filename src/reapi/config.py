@@ -0,0 +1,67 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+
+class Settings(BaseModel):
+    record_dir: Path | None = None
+    record_chunk: int = 1024
+    sample_rate: float = 128.0
+    preprocess: list[dict[str, Any]] = []
+    window: int = 256
+    models: dict[str, str] = {}
+    model_split: dict[str, float] = {}
+    admin_token: str | None = None
+    threads: int | None = None
+    preload: bool = False
+    heartbeat: float = 20.0
+    idle_timeout: float = 60.0
+    max_connections: int | None = None
+    max_client_connections: int | None = None
+    max_message: int = 65536
+    snapshot_dir: Path | None = None
+    drain_timeout: float = 10.0
+    inference_workers: int = 2
+    priority_weights: dict[str, float] = {}
+    trace_rate: float = 0.01
+    max_streams: int = 8
+    align_latency: float = 0.25
+    store_chunk: int = 1024
+    store_hot: int = 8
+    store_cold: int = 256
+    store_dir: Path | None = None
+    max_markers: int = 4096
+    quality_gate: bool = False
+    quality_window: int = 128
+    quality_stream: str = "dev"
+    flat: float = 0.5
+    max_deviation: float = 1000.0
+    clipping: float = 0.1
+    min_contact: float = 50.0
+    fallback: str | None = None
+    buffer_slots: int = 0
+    sink: Literal["recording", "arrow"] | None = None
+    sink_dir: Path | None = None
+    sink_queue: int = 4096
+    sink_policy: Literal["block", "spill"] = "block"
+    sink_roll_bytes: int = 64 << 20
+    sink_roll_seconds: float = 3600.0
+
+    @classmethod
+    def from_env(cls, environ=os.environ, prefix="REAPI_"):
+        """
+        Read settings from ``REAPI_<FIELD>`` environment variables.
+        Values that look like JSON arrays or objects are decoded first.
+        """
+        data = {}
+        for name in cls.model_fields:
+            value = environ.get(prefix + name.upper())
+            if value is None:
+                continue
+            if value.startswith(("[", "{")):
+                value = json.loads(value)
+            data[name] = value
+        return cls.model_validate(data)
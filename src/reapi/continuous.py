@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Continuous:
+    """
+    Decode every ``hop`` seconds for as long as ``run`` is awaited.
+
+    A tick is skipped while the previous decode is still running. When a
+    tick is skipped, a decode takes more than half a hop or the event loop
+    wakes up more than a quarter of a hop late, the hop is multiplied by
+    ``backoff`` up to ``max_hop``. Otherwise it shrinks by ``recover`` back
+    towards the requested hop.
+
+    A decode that fails is logged and answered with an ``{"error": ...}``
+    result. When ``send`` fails, the connection is gone, so ``run`` stops.
+    """
+
+    def __init__(self, hop, decode, send, max_hop=None, backoff=2.0, recover=0.9):
+        self.target = self.hop = hop
+        self.max_hop = max_hop or 8 * hop
+        self.backoff = backoff
+        self.recover = recover
+        self.decode = decode
+        self.send = send
+        self.finishing = self.stopped = False
+        self.runs = self.skipped = 0
+        self.duration = 0.0
+        self._task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while not self.stopped:
+                start = loop.time()
+                await asyncio.sleep(self.hop)
+                lag = loop.time() - start - self.hop
+                if self._task is not None and not self._task.done():
+                    self.skipped += 1
+                    self._adapt(True)
+                    continue
+                self._task = asyncio.create_task(self._decode())
+                self._adapt(lag > 0.25 * self.hop or self.duration > 0.5 * self.hop)
+        finally:
+            if self._task is not None and not self.finishing:
+                self._task.cancel()
+
+    async def finish(self, runner):
+        """Stop ``runner`` but let the decode in flight send its result."""
+        self.finishing = True
+        runner.cancel()
+        if self._task is not None:
+            await asyncio.wait([self._task])
+
+    def _adapt(self, overloaded):
+        if overloaded:
+            self.hop = min(self.hop * self.backoff, self.max_hop)
+        else:
+            self.hop = max(self.hop * self.recover, self.target)
+
+    async def _decode(self):
+        start = time.perf_counter()
+        try:
+            result = await self.decode()
+        except Exception as e:
+            log.exception("continuous: decode failed")
+            result = {"error": str(e)}
+        self.duration = time.perf_counter() - start
+        if result is not None:
+            self.runs += 1
+            try:
+                await self.send(result)
+            except Exception:
+                log.exception("continuous: could not send, stopping")
+                self.stopped = True
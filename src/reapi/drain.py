@@ -0,0 +1,117 @@
+"""
+Graceful shutdown.
+
+On SIGTERM, or at the latest when the app shuts down, the app stops taking
+connections and sends every session ``{"reconnect": <token>}``. A client
+answers by sending the frame back and waiting for the socket to close: the
+server finishes the decode in flight, saves a snapshot of the session to
+``snapshot_dir`` and closes with 1012. Connecting again with
+``?resume=<token>`` to any worker that shares the directory restores the
+window, filter and feature state. Sessions that do not answer within
+``drain_timeout`` seconds are saved and closed anyway.
+
+Snapshots are pickles, so ``snapshot_dir`` must only be writable by the
+servers.
+"""
+
+import asyncio
+import os
+import pickle
+import signal
+import threading
+from uuid import uuid4
+
+from fastapi import status
+from starlette.websockets import WebSocketState
+
+from .websockets import manager
+
+
+def save(session):
+    token, session.token = session.token, None
+    directory = session.settings.snapshot_dir
+    if token is None or directory is None:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    partial = directory / f"{token}.partial"
+    with open(partial, "wb") as f:
+        pickle.dump(session.snapshot(), f)
+    partial.replace(directory / f"{token}.snapshot")
+
+
+def load(settings, token):
+    """Take the snapshot saved under ``token``, if there is one."""
+    if settings.snapshot_dir is None or not token.isalnum():
+        return None
+    path = settings.snapshot_dir / f"{token}.snapshot"
+    claimed = path.with_suffix(f".{os.getpid()}")
+    try:
+        path.rename(claimed)
+    except FileNotFoundError:
+        return None
+    with open(claimed, "rb") as f:
+        snapshot = pickle.load(f)
+    claimed.unlink()
+    return snapshot
+
+
+async def close(ws):
+    connected = WebSocketState.CONNECTED
+    if ws.client_state == connected and ws.application_state == connected:
+        await ws.close(status.WS_1012_SERVICE_RESTART, "reconnect")
+
+
+async def hand_off(ws, session, continuous=None, runner=None):
+    if continuous is not None:
+        await continuous.finish(runner)
+    save(session)
+    await close(ws)
+
+
+async def drain(app):
+    settings = app.state.settings
+    sessions = {
+        ws: session
+        for ws, session in manager.active_connections.items()
+        if session is not None and ws.app is app
+    }
+    for session in sessions.values():
+        session.token = uuid4().hex
+    sends = (ws.send_json({"reconnect": s.token}) for ws, s in sessions.items())
+    await asyncio.gather(*sends, return_exceptions=True)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.drain_timeout
+    pending = sessions
+    while pending and loop.time() < deadline:
+        await asyncio.sleep(0.05)
+        pending = {ws: s for ws, s in pending.items() if s.token is not None}
+    for ws, session in pending.items():
+        save(session)
+        manager.disconnect(ws)
+    await asyncio.gather(*map(close, pending), return_exceptions=True)
+
+
+def start(app):
+    """Start draining ``app``, once, and return the task doing it."""
+    if app.state.drain is None:
+        app.state.drain = asyncio.ensure_future(drain(app))
+    return app.state.drain
+
+
+def install(app):
+    """
+    Drain on SIGTERM before handing the signal to the server. Servers such
+    as uvicorn close every websocket with 1012 as soon as they shut down.
+    """
+    previous = signal.getsignal(signal.SIGTERM)
+    if threading.current_thread() is not threading.main_thread() or previous is None:
+        return
+    loop = asyncio.get_running_loop()
+
+    def handle(sig, frame):
+        signal.signal(sig, previous)
+        loop.call_soon_threadsafe(
+            lambda: start(app).add_done_callback(lambda _: signal.raise_signal(sig))
+        )
+
+    signal.signal(signal.SIGTERM, handle)
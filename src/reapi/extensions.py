@@ -0,0 +1,86 @@
+import time
+
+from .models import CHANNELS
+
+
+class Extension:
+    """
+    Per-session hooks. Extensions are built for every session by the
+    factories in ``app.state.extensions``; every hook is optional.
+    """
+
+    def samples(self, session, now, triggered, values):
+        """
+        Called with every ``(samples, channels)`` array received, before
+        preprocessing. ``now`` is the time of the last sample, see
+        ``Session.stamp``, and ``triggered`` applies to it. May be a
+        coroutine function, awaited before the samples are handled.
+        """
+
+    def stream(self, session, stream, values, times):
+        """Called with the samples and times of every frame of a stream."""
+
+    def respond(self, session, response):
+        pass
+
+    def close(self, session):
+        pass
+
+
+class Record(Extension):
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    def samples(self, session, now, triggered, values):
+        rate = session.settings.sample_rate
+        self.recorder.extend(now, triggered, values, rate)
+
+    def respond(self, session, response):
+        self.recorder.respond(time.time(), response["text"])
+
+    def close(self, session):
+        self.recorder.close()
+
+
+def build(connection, session):
+    """Build the extensions of a session from ``app.state.extensions``."""
+    factories = connection.app.state.extensions
+    extensions = (factory(connection, session) for factory in factories)
+    return tuple(e for e in extensions if e is not None)
+
+
+def record(ws, session):
+    settings = session.settings
+    if settings.record_dir is None:
+        return None
+    from .recording import Recorder
+
+    settings.record_dir.mkdir(parents=True, exist_ok=True)
+    path = settings.record_dir / f"{session.id}.reapi"
+    meta = {
+        "client": ws.client and f"{ws.client.host}:{ws.client.port}",
+        "rate": settings.sample_rate,
+    }
+    return Record(Recorder(path, CHANNELS, settings.record_chunk, meta))
+
+
+def store(connection, session):
+    settings = session.settings
+    if not settings.store_hot:
+        return None
+    from .store import Store
+
+    path = settings.store_dir and settings.store_dir / session.id
+    return Store(settings, path)
+
+
+def persist(connection, session):
+    settings = session.settings
+    if settings.sink is None:
+        return None
+    from .sink import Persist, open_sink
+
+    return Persist(open_sink(settings))
+
+
+EXTENSIONS = (record, store, persist)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Request, Response, status
+
+router = APIRouter()
+
+
+@router.get("/live")
+async def live():
+    return {"status": "live"}
+
+
+@router.get("/ready")
+async def ready(request: Request, response: Response):
+    warmup = getattr(request.app.state, "warmup", None)
+    if warmup is None or not warmup.done() or warmup.exception():
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "starting"}
+    if getattr(request.app.state, "drain", None) is not None:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "draining"}
+    return {"status": "ready"}
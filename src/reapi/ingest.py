@@ -0,0 +1,163 @@
+"""
+HTTP ingest for clients that cannot hold a websocket open.
+
+``POST /ingest`` opens a session, taking the same options as the websocket
+in its query string. ``POST /ingest/{id}`` streams samples into it, either
+as NDJSON lines in the websocket's frame formats or, with content type
+``application/octet-stream``, as concatenated binary batch frames. Uploads
+are decoded as they arrive, in batches, and lines or frames longer than
+``max_message`` bytes are refused. ``GET /ingest/{id}/events`` streams
+the responses to triggers as server-sent events. Uploads are bulk work, so
+their triggers default to the replay priority.
+"""
+
+import asyncio
+import json
+import time
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from .ai import registry
+from .extensions import Extension, build
+from .models import Options
+from .websockets import manager
+
+router = APIRouter()
+
+BINARY = "application/octet-stream"
+
+
+class Events(Extension):
+    """Hands a session's responses to its event stream listeners."""
+
+    def __init__(self, size=256):
+        self.size = size
+        self.listeners = set()
+
+    def listen(self):
+        queue = asyncio.Queue(self.size)
+        self.listeners.add(queue)
+        return queue
+
+    def publish(self, event):
+        """Queue ``event`` for every listener, dropping their oldest if full."""
+        for queue in self.listeners:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def respond(self, session, response):
+        self.publish(response)
+
+    def close(self, session):
+        self.publish(None)
+
+
+def lookup(id):
+    session = manager.streams.get(id)
+    if session is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "unknown session")
+    return session
+
+
+@router.post("", status_code=status.HTTP_201_CREATED)
+async def open_session(request: Request):
+    try:
+        query = {"priority": "replay", **request.query_params}
+        options = Options.model_validate(query)
+    except ValidationError as e:
+        error = e.errors()[0]
+        detail = f"{error['loc'][0]}: {error['msg']}"
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail)
+    state = request.app.state
+    if getattr(state, "warmup", None) is not None:
+        await state.warmup
+    if options.model is not None and options.model not in registry.models:
+        detail = f"model: unknown version {options.model}"
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail)
+    settings = state.settings
+    limits = settings.max_connections, settings.max_client_connections
+    reason = "draining" if state.drain is not None else None
+    reason = reason or manager.refuse(request, *limits)
+    if reason is not None:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, reason)
+    from .session import Session
+
+    session = Session(options, settings)
+    session.extensions = (*build(request, session), Events())
+    manager.add_stream(session, request)
+    return {"id": session.id}
+
+
+@router.post("/{id}")
+async def upload(id: str, request: Request):
+    session = lookup(id)
+    from . import codec
+
+    binary = request.headers.get("content-type", "").startswith(BINARY)
+    limit = request.app.state.settings.max_message
+    samples, triggers = session.samples, session.triggers
+    pending = bytearray()
+    try:
+        async for chunk in request.stream():
+            if binary:
+                pending += chunk
+                frames, pending = codec.split(pending)
+                for frame in frames:
+                    await session.receive(frame)
+            elif b"\n" in chunk:
+                # Only the new bytes are searched for the ends of lines
+                lines = chunk.split(b"\n")
+                lines[0] = bytes(pending + lines[0])
+                pending = bytearray(lines.pop())
+                await session.feed(lines)
+            else:
+                pending += chunk
+            if len(pending) > limit:
+                detail = f"frame larger than {limit} bytes"
+                raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail)
+        if binary and pending:
+            raise ValueError("upload ends in an incomplete frame")
+        await session.feed([pending])
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+    return {
+        "samples": session.samples - samples,
+        "triggers": session.triggers - triggers,
+    }
+
+
+@router.get("/{id}/events")
+async def events(id: str, request: Request):
+    session = lookup(id)
+    (events,) = (e for e in session.extensions if isinstance(e, Events))
+    queue = events.listen()
+    keepalive = request.app.state.settings.heartbeat or None
+
+    async def stream():
+        try:
+            while True:
+                try:
+                    response = await asyncio.wait_for(queue.get(), keepalive)
+                except TimeoutError:
+                    # An open event stream keeps its session alive
+                    session.last_seen = time.time()
+                    yield ": keepalive\n\n"
+                    continue
+                if response is None:
+                    return
+                yield f"data: {json.dumps(response)}\n\n"
+        finally:
+            events.listeners.discard(queue)
+
+    headers = {"Cache-Control": "no-cache"}
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=headers)
+
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def close_session(id: str):
+    lookup(id)
+    manager.close_stream(id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,3 +1,5 @@
-from .app import make
+from .app import make, preload
 
 app = make()
+if app.state.settings.preload:
+    preload(app.state.settings)
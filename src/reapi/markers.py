@@ -0,0 +1,70 @@
+"""
+Markers: labelled instants, such as stimulus onsets, sent by clients as
+
+    {"marker": "stimulus", "time": 1712.25, "value": 3}
+
+with ``time`` on the clock of the EEG, the time the frame arrived when
+left out, and an optional JSON ``value``. A session keeps its latest
+markers sorted by time, and ``epochs`` cuts the samples around them.
+"""
+
+import math
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+
+class Markers:
+    def __init__(self, size=4096):
+        self.size = size
+        self.times = []
+        self.labels = []
+        self.values = []
+
+    def __len__(self):
+        return len(self.times)
+
+    def add(self, time, label, value=None):
+        i = bisect_right(self.times, time)
+        self.times.insert(i, time)
+        self.labels.insert(i, label)
+        self.values.insert(i, value)
+        if len(self.times) > self.size:
+            del self.times[0], self.labels[0], self.values[0]
+
+    def between(self, start=None, end=None, label=None):
+        """Return the ``(time, label, value)`` of markers in ``[start, end]``."""
+        lo = 0 if start is None else bisect_left(self.times, start)
+        hi = len(self.times) if end is None else bisect_right(self.times, end)
+        marks = zip(self.times[lo:hi], self.labels[lo:hi], self.values[lo:hi])
+        return [m for m in marks if label is None or m[1] == label]
+
+
+def parse(data, now):
+    label, time = data["marker"], data.get("time", now)
+    if not isinstance(label, str):
+        raise ValueError("marker: labels are strings")
+    if isinstance(time, bool) or not isinstance(time, (int, float)):
+        raise ValueError("time: must be a number")
+    if not math.isfinite(time):
+        raise ValueError("time: must be finite")
+    return float(time), label, data.get("value")
+
+
+def epochs(times, values, onsets, before, after, rate):
+    """
+    Cut ``before`` samples before and ``after`` samples from each onset out
+    of the ``(samples, channels)`` values taken at sorted ``times``, at
+    ``rate``. Returns the ``(epochs, before + after, channels)`` array and
+    which onsets had all of their samples, without a gap in ``times``.
+    """
+    count = before + after
+    first = np.searchsorted(times, onsets) - before
+    kept = (first >= 0) & (first + count <= len(times))
+    rows = first[kept, None] + np.arange(count)
+    if count:
+        # Evenly spaced rows span count - 1 periods; a missing sample adds one
+        even = times[rows[:, -1]] - times[rows[:, 0]] <= (count - 0.5) / rate
+        kept[kept] = even
+        rows = rows[even]
+    return values[rows], kept
@@ -0,0 +1,45 @@
+import os
+import resource
+import sys
+
+FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+}
+
+
+def usage(path="/proc/self/smaps_rollup"):
+    """
+    Memory of this worker in bytes. On Linux this includes the proportional
+    set size (``pss``), which splits pages shared with other workers, such
+    as memory-mapped or copy-on-write weights, between them, and the unique
+    set size (``uss``) that stopping this worker would free.
+    """
+    report = {"pid": os.getpid()}
+    try:
+        with open(path) as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in FIELDS:
+                    report[FIELDS[name]] = int(value.split()[0]) * 1024
+    except OSError:
+        # ru_maxrss is the peak, in bytes on macOS and kilobytes elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report["max_rss"] = peak if sys.platform == "darwin" else peak * 1024
+    else:
+        report["uss"] = report["private_clean"] + report["private_dirty"]
+    return report
+
+
+def weights(registry):
+    """Bytes of memory-mapped weights per model version."""
+    sizes = {}
+    for version, model in registry.models.items():
+        mapped = getattr(getattr(model, "backend", None), "weights", None)
+        if mapped is not None:
+            sizes[version] = mapped.nbytes
+    return sizes
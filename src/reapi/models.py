@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, Field
 
 
 class EEGValues(BaseModel):
@@ -6,6 +8,20 @@ class EEGValues(BaseModel):
     Drm: float
 
 
+CHANNELS = tuple(EEGValues.model_fields)
+
+
 class Message(BaseModel):
     triggered: bool = False
     values: EEGValues
+
+
+class Options(BaseModel):
+    """Protocol options negotiated through the query string on connect."""
+
+    mode: Literal["triggered", "continuous"] = "triggered"
+    hop: float = Field(0.25, gt=0)
+    ack: bool = True
+    model: str | None = None
+    resume: str | None = None
+    priority: Literal["interactive", "replay"] = "interactive"
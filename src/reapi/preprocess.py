@@ -0,0 +1,234 @@
+"""
+Incremental signal preprocessing.
+
+Every stage keeps its own state between calls, so a session's samples are
+filtered as they arrive instead of refiltering the whole window on each
+trigger. Stages take and return ``(samples, channels)`` arrays and work on
+every channel at once; IIR stages loop over samples, FIR stages do not.
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+BANDS = {
+    "delta": (1.0, 4.0),
+    "theta": (4.0, 8.0),
+    "alpha": (8.0, 12.0),
+    "beta": (12.0, 30.0),
+    "gamma": (30.0, 45.0),
+}
+
+
+def biquad(kind, freq, fs, q=0.7071067811865476):
+    """
+    Second order section from the Audio EQ Cookbook for ``kind`` in
+    ``lowpass``, ``highpass``, ``bandpass`` or ``notch``.
+    """
+    w0 = 2 * np.pi * np.asarray(freq, dtype=float) / fs
+    alpha = np.sin(w0) / (2 * q)
+    cos = np.cos(w0)
+    one = np.ones_like(w0)
+    if kind == "lowpass":
+        b = ((1 - cos) / 2, 1 - cos, (1 - cos) / 2)
+    elif kind == "highpass":
+        b = ((1 + cos) / 2, -(1 + cos), (1 + cos) / 2)
+    elif kind == "bandpass":
+        b = (alpha, 0 * one, -alpha)
+    elif kind == "notch":
+        b = (one, -2 * cos, one)
+    else:
+        raise ValueError(f"unknown filter {kind!r}")
+    a0 = 1 + alpha
+    return np.array([*b, a0, -2 * cos, 1 - alpha]) / a0
+
+
+def firwin(cutoff, fs, taps):
+    """Hamming windowed sinc lowpass with unit gain at DC."""
+    n = np.arange(taps) - (taps - 1) / 2
+    h = np.sinc(2 * cutoff / fs * n) * np.hamming(taps)
+    return h / h.sum()
+
+
+class Stage(ABC):
+    def rate(self, fs):
+        return fs
+
+    def width(self, channels):
+        return channels
+
+    @abstractmethod
+    def process(self, x):
+        """Filter the next ``(samples, channels)`` rows."""
+
+
+class IIR(Stage):
+    """
+    Cascade of second order sections in transposed direct form II.
+    Coefficients may be scalars or have one value per channel.
+    """
+
+    def __init__(self, sos):
+        self.sos = np.asarray(sos, dtype=float)
+        self._z = None
+
+    def process(self, x):
+        if self._z is None:
+            self._z = np.zeros((len(self.sos), 2, x.shape[1]))
+        for (b0, b1, b2, _, a1, a2), z in zip(self.sos, self._z):
+            y = np.empty(x.shape)
+            for i, xi in enumerate(x):
+                yi = b0 * xi + z[0]
+                z[0] = b1 * xi - a1 * yi + z[1]
+                z[1] = b2 * xi - a2 * yi
+                y[i] = yi
+            x = y
+        return x
+
+
+class FIR(Stage):
+    def __init__(self, taps):
+        self.taps = np.asarray(taps, dtype=float)
+        self._history = None
+
+    def process(self, x):
+        if self._history is None:
+            self._history = np.zeros((len(self.taps) - 1, x.shape[1]))
+        x = np.concatenate([self._history, x])
+        self._history = x[len(x) - len(self.taps) + 1 :]
+        return sliding_window_view(x, len(self.taps), axis=0) @ self.taps[::-1]
+
+
+class Decimate(Stage):
+    """Anti-aliased downsampling by an integer ``factor``."""
+
+    def __init__(self, factor, fs, taps=None):
+        self.factor = factor
+        self.filter = FIR(firwin(0.8 * fs / (2 * factor), fs, taps or 8 * factor + 1))
+        self._phase = 0
+
+    def rate(self, fs):
+        return fs / self.factor
+
+    def process(self, x):
+        y = self.filter.process(x)[-self._phase % self.factor :: self.factor]
+        self._phase = (self._phase + len(x)) % self.factor
+        return y
+
+
+class BandPower(Stage):
+    """
+    Rolling power per band and channel: a bandpass section per band
+    followed by an exponential moving average of the squared output with
+    time constant ``tau`` seconds. Output columns are grouped by band.
+    """
+
+    def __init__(self, fs, bands=None, tau=1.0):
+        self.bands = dict(bands or BANDS)
+        low, high = np.array(list(self.bands.values()), dtype=float).T
+        center = np.sqrt(low * high)
+        self._center, self._q = center, center / (high - low)
+        self._fs = fs
+        self._decay = np.exp(-1 / (tau * fs))
+        self.filter = None
+        self._power = None
+
+    def width(self, channels):
+        return channels * len(self.bands)
+
+    def process(self, x):
+        n = x.shape[1]
+        if self.filter is None:
+            sos = biquad("bandpass", self._center, self._fs, self._q)
+            self.filter = IIR([np.repeat(sos, n, axis=1)])
+            self._power = np.zeros(n * len(self.bands))
+        y = self.filter.process(np.tile(x, len(self.bands))) ** 2
+        power, decay = self._power, self._decay
+        for i, yi in enumerate(y):
+            power = decay * power + (1 - decay) * yi
+            y[i] = power
+        self._power = power
+        return y
+
+
+def bandpass(fs, low, high, order=2):
+    return IIR([biquad("highpass", low, fs), biquad("lowpass", high, fs)] * order)
+
+
+def highpass(fs, freq, order=2):
+    return IIR([biquad("highpass", freq, fs)] * order)
+
+
+def lowpass(fs, freq, order=2):
+    return IIR([biquad("lowpass", freq, fs)] * order)
+
+
+def notch(fs, freq, q=30.0):
+    return IIR([biquad("notch", freq, fs, q)])
+
+
+def fir(fs, cutoff, taps=33):
+    return FIR(firwin(cutoff, fs, taps))
+
+
+def decimate(fs, factor, taps=None):
+    return Decimate(factor, fs, taps)
+
+
+def bandpower(fs, bands=None, tau=1.0):
+    return BandPower(fs, bands, tau)
+
+
+STAGES = {
+    "bandpass": bandpass,
+    "highpass": highpass,
+    "lowpass": lowpass,
+    "notch": notch,
+    "fir": fir,
+    "decimate": decimate,
+    "bandpower": bandpower,
+}
+
+
+class Pipeline(Stage):
+    def __init__(self, stages=()):
+        self.stages = list(stages)
+
+    def rate(self, fs):
+        for stage in self.stages:
+            fs = stage.rate(fs)
+        return fs
+
+    def width(self, channels):
+        for stage in self.stages:
+            channels = stage.width(channels)
+        return channels
+
+    def process(self, x):
+        width = x.shape[1]
+        for stage in self.stages:
+            width = stage.width(width)
+            x = stage.process(x) if len(x) else np.empty((0, width))
+        return x
+
+
+def build(specs, fs):
+    """
+    Build a pipeline from specs such as ``{"stage": "notch", "freq": 50}``
+    for a signal sampled at ``fs``. Each stage sees the rate left by the
+    stages before it.
+    """
+    stages = []
+    for spec in specs:
+        spec = dict(spec)
+        name = spec.pop("stage", None)
+        if name not in STAGES:
+            raise ValueError(f"unknown preprocessing stage {name!r}")
+        try:
+            stage = STAGES[name](fs, **spec)
+        except TypeError as e:
+            raise ValueError(f"preprocessing stage {name!r}: {e}") from None
+        fs = stage.rate(fs)
+        stages.append(stage)
+    return Pipeline(stages)
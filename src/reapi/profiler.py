@@ -0,0 +1,42 @@
+"""
+In-process stack sampling.
+
+``sample`` walks the stacks of every other thread at a fixed interval and
+counts them in the folded format read by flamegraph.pl, speedscope and
+most flame graph viewers: one line per distinct stack, frames from the root
+down separated by ``;``, then a space and the number of samples.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def _frames(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", "?")
+        stack.append(f"{module}:{code.co_qualname}")
+        frame = frame.f_back
+    return stack[::-1]
+
+
+def sample(seconds, interval=0.005):
+    """Sample for ``seconds`` and return the folded stack counts."""
+    me = threading.get_ident()
+    counts = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident != me:
+                thread = names.get(ident, str(ident)).replace(" ", "_")
+                counts[";".join([thread, *_frames(frame)])] += 1
+        time.sleep(interval)
+    return counts
+
+
+def folded(counts):
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
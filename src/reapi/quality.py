@@ -0,0 +1,53 @@
+"""
+Signal quality of a session's recent raw samples.
+
+Before a decode, the last ``quality_window`` samples of every channel are
+checked for a flat line (peak to peak below ``flat``), for noise (standard
+deviation above ``max_deviation``) and for clipping (more than one
+sample, and more than a ``clipping`` fraction of them, at the channel's
+extreme). When the
+session has a ``quality_stream``, such as the ``dev`` stream of a Cortex
+headset, its latest contact quality must also reach ``min_contact``: the
+``OVERALL`` channel, from 0 to 100, or else the mean of the per electrode
+values, from 0 to 4, scaled to 100.
+"""
+
+import numpy as np
+
+from .buffer import RingBuffer
+from .models import CHANNELS
+
+
+class Quality:
+    def __init__(self, settings):
+        self.settings = settings
+        self.raw = RingBuffer(settings.quality_window, len(CHANNELS))
+
+    def update(self, values):
+        self.raw.extend(values)
+
+    def check(self, streams):
+        """Return why the recent samples are too poor to decode, if they are."""
+        s = self.settings
+        reasons = []
+        contact = streams.get(s.quality_stream)
+        if contact is not None and len(contact.buffer):
+            latest = contact.window()[-1]
+            if "OVERALL" in contact.channels:
+                score = latest[contact.channels.index("OVERALL")]
+            else:
+                score = 25 * latest.mean()
+            if score < s.min_contact:
+                reasons.append(f"contact: {score:g}")
+        x = self.raw.view()
+        if len(x) < 2:
+            return reasons
+        ptp = np.ptp(x, axis=0)
+        flat = ptp < s.flat
+        noisy = x.std(axis=0) > s.max_deviation
+        extreme = np.maximum((x == x.max(axis=0)).sum(0), (x == x.min(axis=0)).sum(0))
+        # One sample is always at the extreme, a clipped signal repeats it
+        clipped = ~flat & (extreme > 1) & (extreme > s.clipping * len(x))
+        for name, bad in (("flat", flat), ("noisy", noisy), ("clipped", clipped)):
+            reasons.extend(f"{name}: {c}" for c, b in zip(CHANNELS, bad) if b)
+        return reasons
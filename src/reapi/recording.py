@@ -0,0 +1,239 @@
+"""
+Append-only columnar recordings of ``/connect/text`` sessions.
+
+A recording is a single file made of a small JSON header followed by
+blocks. Sample blocks store each column contiguously (time, triggered,
+then one ``float64`` column per channel) so that they can be read back
+as zero-copy views of a memory map. Response blocks store the text sent
+back to the client. Every block is also listed in a ``.idx`` sidecar
+that is sorted by time, so time range queries are a binary search.
+"""
+
+import json
+import struct
+import time
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"REAPIREC"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+BLOCK = struct.Struct("<4sIQdd")
+SAMPLES = b"SMPL"
+RESPONSES = b"RESP"
+INDEX = np.dtype(
+    [
+        ("kind", "S4"),
+        ("count", "<u4"),
+        ("offset", "<u8"),
+        ("size", "<u8"),
+        ("start", "<f8"),
+        ("end", "<f8"),
+    ]
+)
+
+
+def _pad(size):
+    return -size % 8
+
+
+def _index_path(path):
+    return path.with_name(path.name + ".idx")
+
+
+class Recorder:
+    def __init__(self, path, channels, chunk=1024, meta=None):
+        self.path = Path(path)
+        self.channels = tuple(channels)
+        self.chunk = chunk
+        self._rows = np.zeros(
+            chunk,
+            dtype=[("time", "<f8"), ("triggered", "u1")]
+            + [(name, "<f8") for name in self.channels],
+        )
+        self._count = 0
+        self._responses = []
+        self._file = open(self.path, "ab")
+        self._index = open(_index_path(self.path), "ab")
+        if self._file.tell() == 0:
+            header = dict(meta or {}, channels=self.channels, created=time.time())
+            header = json.dumps(header).encode()
+            header += b" " * _pad(len(header))
+            self._file.write(HEADER.pack(MAGIC, VERSION, len(header)) + header)
+        elif Recording(self.path).channels != self.channels:
+            self._file.close()
+            self._index.close()
+            raise ValueError(f"{self.path} was recorded with other channels")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, time, triggered, values):
+        self._rows[self._count] = (time, triggered, *values)
+        self._count += 1
+        if self._count == self.chunk:
+            self.flush()
+
+    def extend(self, time, triggered, values, rate):
+        """
+        Append a ``(samples, channels)`` array. The last sample is at ``time``
+        and the others ``1 / rate`` apart before it; ``triggered`` applies to
+        the last sample.
+        """
+        n = len(values)
+        times = time - np.arange(n - 1, -1, -1) / rate
+        flags = np.zeros(n, dtype=bool)
+        flags[-1:] = triggered
+        self.write(times, flags, values)
+
+    def write(self, times, triggered, values):
+        """Append samples with their own ``times`` and ``triggered`` flags."""
+        n = len(values)
+        done = 0
+        while done < n:
+            size = min(self.chunk - self._count, n - done)
+            rows = self._rows[self._count : self._count + size]
+            rows["time"] = times[done : done + size]
+            rows["triggered"] = triggered[done : done + size]
+            for i, name in enumerate(self.channels):
+                rows[name] = values[done : done + size, i]
+            self._count += size
+            done += size
+            if self._count == self.chunk:
+                self.flush()
+
+    @property
+    def size(self):
+        """Bytes written to the file so far, not counting buffered rows."""
+        return self._file.tell()
+
+    def respond(self, time, response):
+        self._responses.append((time, response))
+
+    def flush(self):
+        if self._count:
+            rows = self._rows[: self._count]
+            times = rows["time"]
+            triggered = rows["triggered"].tobytes()
+            payload = [times.tobytes(), triggered, b"\0" * _pad(len(triggered))]
+            payload += [rows[name].tobytes() for name in self.channels]
+            self._write(SAMPLES, self._count, times[0], times[-1], payload)
+            self._count = 0
+        if self._responses:
+            times = np.array([t for t, _ in self._responses], dtype="<f8")
+            text = json.dumps([r for _, r in self._responses]).encode()
+            payload = [times.tobytes(), text, b" " * _pad(len(text))]
+            self._write(RESPONSES, len(times), times[0], times[-1], payload)
+            self._responses.clear()
+        self._file.flush()
+        self._index.flush()
+
+    def _write(self, kind, count, start, end, payload):
+        size = sum(map(len, payload))
+        offset = self._file.tell()
+        self._file.write(BLOCK.pack(kind, count, size, start, end))
+        self._file.writelines(payload)
+        entry = np.array([(kind, count, offset, size, start, end)], dtype=INDEX)
+        self._index.write(entry.tobytes())
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+            self._index.close()
+
+
+class Recording:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._map = np.memmap(self.path, dtype="u1", mode="r")
+        magic, version, size = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a reapi recording")
+        self.meta = json.loads(bytes(self._map[HEADER.size : HEADER.size + size]))
+        self.channels = tuple(self.meta["channels"])
+        self.index = self._load_index(HEADER.size + size)
+        samples = self.index[self.index["kind"] == SAMPLES]
+        self._samples = samples
+        self._starts = samples["start"]
+        self._ends = np.maximum.accumulate(samples["end"])
+
+    def _load_index(self, offset):
+        """
+        Load the sidecar index, scanning any blocks that it does not cover.
+        The sidecar is written after its block, so after a crash it can only
+        ever be behind the data file.
+        """
+        path = _index_path(self.path)
+        data = path.read_bytes() if path.exists() else b""
+        index = np.frombuffer(data[: len(data) - len(data) % INDEX.itemsize], INDEX)
+        if len(index):
+            offset = int(index["offset"][-1] + BLOCK.size + index["size"][-1])
+        missing = []
+        while offset + BLOCK.size <= len(self._map):
+            kind, count, size, start, end = BLOCK.unpack_from(self._map, offset)
+            if offset + BLOCK.size + size > len(self._map):
+                break
+            missing.append((kind, count, offset, size, start, end))
+            offset += BLOCK.size + size
+        return np.concatenate([index, np.array(missing, dtype=INDEX)])
+
+    def __len__(self):
+        return int(self._samples["count"].sum())
+
+    def _column(self, entry, position, dtype="<f8"):
+        count = int(entry["count"])
+        offset = int(entry["offset"]) + BLOCK.size + position
+        return np.frombuffer(self._map, dtype=dtype, count=count, offset=offset)
+
+    def blocks(self, start=None, end=None):
+        """
+        Yield ``(time, triggered, values)`` for every sample block that
+        overlaps ``[start, end]``. ``time`` and ``triggered`` are views of
+        the memory map and ``values`` maps channel names to views.
+        """
+        lo = 0 if start is None else np.searchsorted(self._ends, start, "left")
+        hi = None if end is None else np.searchsorted(self._starts, end, "right")
+        for entry in self._samples[lo:hi]:
+            count = int(entry["count"])
+            position = 8 * count
+            times = self._column(entry, 0)
+            triggered = self._column(entry, position, "u1").view(bool)
+            position += count + _pad(count)
+            values = {}
+            for name in self.channels:
+                values[name] = self._column(entry, position)
+                position += 8 * count
+            yield times, triggered, values
+
+    def samples(self, start=None, end=None):
+        """
+        Return ``(time, triggered, values)`` arrays for samples with
+        ``start <= time <= end`` where ``values`` has one column per channel.
+        """
+        times, triggered, values = [], [], []
+        for t, trig, columns in self.blocks(start, end):
+            mask = np.ones(len(t), dtype=bool)
+            if start is not None:
+                mask &= t >= start
+            if end is not None:
+                mask &= t <= end
+            times.append(t[mask])
+            triggered.append(trig[mask])
+            values.append(np.column_stack([columns[n][mask] for n in self.channels]))
+        if not times:
+            empty = np.empty((0, len(self.channels)))
+            return np.empty(0), np.empty(0, dtype=bool), empty
+        return np.concatenate(times), np.concatenate(triggered), np.concatenate(values)
+
+    def responses(self):
+        for entry in self.index[self.index["kind"] == RESPONSES]:
+            count = int(entry["count"])
+            times = self._column(entry, 0)
+            offset = int(entry["offset"]) + BLOCK.size + 8 * count
+            text = bytes(self._map[offset : offset + int(entry["size"]) - 8 * count])
+            yield from zip(times.tolist(), json.loads(text))
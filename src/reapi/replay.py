@@ -0,0 +1,29 @@
+import json
+import time
+
+from .recording import Recording
+
+
+def replay(recording, send, recv, speed=1.0, start=None, end=None):
+    """
+    Feed a recording back through ``/connect/text`` one sample at a time,
+    yielding every response. ``speed`` scales the recorded timing and a
+    ``speed`` of zero sends as fast as the server answers.
+    """
+    if not isinstance(recording, Recording):
+        recording = Recording(recording)
+    origin = clock = None
+    for times, triggered, values in recording.blocks(start, end):
+        columns = [values[name].tolist() for name in recording.channels]
+        for t, trig, *row in zip(times.tolist(), triggered.tolist(), *columns):
+            if start is not None and t < start or end is not None and t > end:
+                continue
+            if speed:
+                if origin is None:
+                    origin, clock = t, time.monotonic()
+                delay = (t - origin) / speed - (time.monotonic() - clock)
+                if delay > 0:
+                    time.sleep(delay)
+            values = dict(zip(recording.channels, row))
+            send(json.dumps({"triggered": trig, "values": values}))
+            yield json.loads(recv())
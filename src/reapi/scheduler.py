@@ -0,0 +1,112 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from collections import Counter
+
+from .stats import Stats
+
+WEIGHTS = {"interactive": 16.0, "continuous": 4.0, "replay": 1.0}
+
+
+class Expired(Exception):
+    """The deadline of a job passed while it was queued."""
+
+
+class Scheduler:
+    """
+    Runs decodes in a fixed number of worker threads, in weighted fair order.
+
+    Every job belongs to a priority class and a key, usually a session id.
+    Jobs are dispatched in order of a virtual finish time, self-clocked as in
+    SCFQ: a job finishes ``1 / weight`` after the later of the current
+    virtual time and the previous job of its class and key. Each key gets its
+    own share within a class, so one replaying client cannot starve other
+    replays, and a class with a larger weight gets that many times the turns
+    of a smaller one while both have work queued, so bulk work still makes
+    progress behind interactive triggers. Jobs whose deadline has passed by
+    their turn are dropped, and so are jobs whose caller stopped waiting.
+    """
+
+    def __init__(self, workers=2, weights=None):
+        self.waits = {}
+        self.expired = Counter()
+        self.configure(workers, weights)
+        self.running = 0
+        self._queue = []
+        self._finish = {}
+        self._pending = Counter()
+        self._clock = 0.0
+        self._order = itertools.count()
+
+    def configure(self, workers, weights=None):
+        self.workers = workers
+        self.weights = dict(WEIGHTS, **(weights or {}))
+        for priority in self.weights:
+            self.waits.setdefault(priority, Stats())
+
+    async def run(self, priority, key, func, *args, deadline=None):
+        """
+        Run ``func(*args)`` in a worker thread once its turn comes, or raise
+        ``Expired`` if it comes after the ``perf_counter`` ``deadline``.
+        """
+        flow = priority, key
+        start = max(self._clock, self._finish.get(flow, 0.0))
+        finish = self._finish[flow] = start + 1 / self.weights[priority]
+        self._pending[flow] += 1
+        future = asyncio.get_running_loop().create_future()
+        queued = time.perf_counter()
+        # Jobs start from the callback of another, so keep the caller's context
+        context = contextvars.copy_context()
+        order = next(self._order)
+        job = finish, order, flow, queued, deadline, future, func, args, context
+        heapq.heappush(self._queue, job)
+        self._dispatch()
+        return await future
+
+    def _dispatch(self):
+        while self.running < self.workers and self._queue:
+            job = heapq.heappop(self._queue)
+            finish, _, flow, queued, deadline, future, func, args, context = job
+            self._pending[flow] -= 1
+            if not self._pending[flow]:
+                # The flow's last job sets the clock, so it can start afresh
+                del self._pending[flow], self._finish[flow]
+            if future.cancelled():
+                continue
+            now = time.perf_counter()
+            if deadline is not None and now > deadline:
+                self.expired[flow[0]] += 1
+                future.set_exception(Expired())
+                continue
+            self._clock = finish
+            self.waits[flow[0]].observe(now - queued)
+            self.running += 1
+            loop = asyncio.get_running_loop()
+            task = loop.create_task(asyncio.to_thread(func, *args), context=context)
+            task.add_done_callback(lambda task, future=future: self._done(task, future))
+
+    def _done(self, task, future):
+        self.running -= 1
+        if task.cancelled():
+            future.cancel()
+        elif not future.cancelled():
+            if task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+        self._dispatch()
+
+    def summary(self):
+        queued = Counter(flow[0] for _, _, flow, *_ in self._queue)
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": {priority: queued[priority] for priority in self.weights},
+            "wait": {priority: s.summary() for priority, s in self.waits.items()},
+            "expired": {priority: self.expired[priority] for priority in self.weights},
+        }
+
+
+scheduler = Scheduler()
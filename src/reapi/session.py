@@ -0,0 +1,358 @@
+import json
+import time
+from uuid import uuid4
+
+import numpy as np
+
+from . import codec, markers
+from .ai import registry
+from .ai.model import Features
+from .align import Alignment
+from .buffer import RingBuffer
+from .markers import Markers
+from .models import CHANNELS, EEGValues, Message
+from .preprocess import build
+from .quality import Quality
+from .scheduler import Expired, scheduler
+from .streams import Stream
+from .tracing import span
+
+# One in this many triggers expected to miss their deadline still goes to
+# the routed model, whose latency would otherwise never be measured again
+PROBE = 16
+
+
+def expires(data):
+    """The ``perf_counter`` time by which a frame's trigger is still wanted."""
+    seconds = data.get("deadline")
+    if seconds is None:
+        return None
+    if isinstance(seconds, bool) or not isinstance(seconds, (int, float)):
+        raise ValueError("deadline: must be a number of seconds")
+    return time.perf_counter() + seconds
+
+
+class Session:
+    """
+    The state of one ``/connect/text`` connection: its negotiated options,
+    preprocessing and window buffer, the model version it is routed to with
+    that model's features, counters and timestamps.
+    """
+
+    __slots__ = (
+        "id",
+        "options",
+        "settings",
+        "pipeline",
+        "rate",
+        "buffer",
+        "eeg",
+        "version",
+        "features",
+        "latest",
+        "extensions",
+        "samples",
+        "triggers",
+        "decodes",
+        "opened",
+        "last_seen",
+        "pinged",
+        "token",
+        "streams",
+        "alignment",
+        "markers",
+        "sampled",
+        "quality",
+        "gated",
+        "expired",
+        "fallbacks",
+    )
+    STATE = (
+        "pipeline",
+        "buffer",
+        "eeg",
+        "version",
+        "features",
+        "latest",
+        "samples",
+        "triggers",
+        "decodes",
+        "opened",
+        "streams",
+        "alignment",
+        "markers",
+        "sampled",
+        "quality",
+        "gated",
+        "expired",
+        "fallbacks",
+    )
+
+    def __init__(self, options, settings, id=None):
+        self.id = id or uuid4().hex
+        self.options = options
+        self.settings = settings
+        self.pipeline = build(settings.preprocess, settings.sample_rate)
+        self.rate = self.pipeline.rate(settings.sample_rate)
+        width = self.pipeline.width(len(CHANNELS))
+        self.buffer = RingBuffer(settings.window, width)
+        names = CHANNELS if width == len(CHANNELS) else map(str, range(width))
+        self.eeg = Stream("eeg", names, self.rate, settings.window)
+        if options.model is not None:
+            registry.pins[self.id] = options.model
+        self.version = registry.route(self.id)
+        self.features = Features(registry.models[self.version].extractors(self.rate))
+        self.latest = None
+        self.extensions = ()
+        self.samples = self.triggers = self.decodes = 0
+        self.opened = self.last_seen = time.time()
+        self.pinged = 0.0
+        self.token = None
+        self.streams = {}
+        self.alignment = Alignment(self.rate, settings.window, settings.align_latency)
+        self.markers = Markers(settings.max_markers)
+        self.sampled = None
+        self.quality = Quality(settings) if settings.quality_gate else None
+        self.gated = self.expired = self.fallbacks = 0
+
+    def snapshot(self):
+        return dict({name: getattr(self, name) for name in self.STATE}, id=self.id)
+
+    @classmethod
+    def restore(cls, snapshot, options, settings):
+        """Pick up a session saved by a worker that was shut down."""
+        session = cls(options, settings, snapshot.pop("id"))
+        for name, value in snapshot.items():
+            setattr(session, name, value)
+        return session
+
+    def close(self):
+        registry.pins.pop(self.id, None)
+        for extension in self.extensions:
+            extension.close(self)
+
+    async def receive(self, data):
+        """Handle one frame and return the response to send, if any."""
+        self.last_seen = time.time()
+        if isinstance(data, bytes):
+            with span("validate"):
+                triggered, values = codec.unpack(data)
+            return await self.extend(triggered, values)
+        if "ping" in data:
+            return {"pong": data["ping"]}
+        if "pong" in data:
+            return None
+        if "declare" in data:
+            return self.declare(data)
+        if "stream" in data:
+            return await self.receive_stream(data)
+        if "marker" in data:
+            self.markers.add(*markers.parse(data, self.clock()))
+            return {"ack": "received"} if self.options.ack else None
+        with span("validate"):
+            if "samples" in data:
+                triggered = bool(data.get("triggered"))
+                values = codec.decode(data["samples"], data.get("scale"))
+            else:
+                msg = Message.model_validate(data)
+                triggered = msg.triggered
+                values = np.array([tuple(msg.values.model_dump().values())])
+            deadline = expires(data)
+        return await self.extend(triggered, values, deadline)
+
+    def declare(self, data):
+        stream = Stream.declare(data, self.settings)
+        existing = self.streams.get(stream.id)
+        limit = self.settings.max_streams
+        if existing is None and len(self.streams) >= limit:
+            raise ValueError(f"declare: at most {limit} streams")
+        if existing is None or existing.channels != stream.channels:
+            self.streams[stream.id] = stream
+        return {"declared": stream.id}
+
+    async def receive_stream(self, data):
+        stream = self.streams.get(data["stream"])
+        if stream is None:
+            raise ValueError(f"stream: {data['stream']} was not declared")
+        with span("validate"):
+            values, times = stream.parse(data, self.clock())
+            deadline = expires(data)
+        with span("extensions"):
+            for extension in self.extensions:
+                extension.stream(self, stream, values, times)
+        stream.extend(values, times)
+        with span("align"):
+            self.alignment.update(self.aligned())
+        if data.get("triggered"):
+            self.triggers += 1
+            return await self.decode(self.options.priority, deadline)
+        if self.options.ack:
+            return {"ack": "received"}
+
+    async def feed(self, lines):
+        """
+        Handle NDJSON lines from an upload. Runs of plain samples are decoded
+        together and go through ``extend`` in one batch per trigger.
+        """
+        self.last_seen = time.time()
+        rows = []
+        for line in lines:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            values = data.get("values") if isinstance(data, dict) else None
+            if not isinstance(values, dict) or "stream" in data:
+                if rows:
+                    await self.extend(False, np.array(rows, dtype=float))
+                    rows = []
+                await self.receive(data)
+                continue
+            rows.append([values[name] for name in CHANNELS])
+            if data.get("triggered"):
+                await self.extend(True, np.array(rows, dtype=float))
+                rows = []
+        if rows:
+            await self.extend(False, np.array(rows, dtype=float))
+
+    def clock(self):
+        """
+        The session's time: the server's ``time.time()`` when the latest
+        frame arrived, or the time of the latest sample if uploaded samples
+        run ahead of it. EEG samples, markers and stream samples without
+        times of their own are placed on this clock.
+        """
+        if self.sampled is None:
+            return self.last_seen
+        return max(self.last_seen, self.sampled)
+
+    def aligned(self):
+        """The streams to align, the EEG after preprocessing among them."""
+        return {"eeg": self.eeg, **self.streams}
+
+    def stamp(self, count):
+        """
+        The time of the last of ``count`` new samples: when they arrived,
+        but no sooner than ``count`` sample periods after the previous ones,
+        so that samples uploaded faster than real time follow on from each
+        other.
+        """
+        if self.sampled is None:
+            return self.last_seen
+        return max(self.last_seen, self.sampled + count / self.settings.sample_rate)
+
+    async def extend(self, triggered, values, deadline=None):
+        """
+        Append ``(samples, channels)`` values; a trigger marks the last one
+        and its answer is wanted until the ``perf_counter`` ``deadline``.
+        """
+        now = self.stamp(len(values))
+        with span("extensions"):
+            for extension in self.extensions:
+                pending = extension.samples(self, now, triggered, values)
+                if pending is not None:
+                    await pending
+        with span("preprocess"):
+            if self.quality is not None:
+                self.quality.update(values)
+            x = self.pipeline.process(values)
+            self.buffer.extend(x)
+            self.features.update(x)
+        if len(x):
+            self.eeg.extend(x, now - np.arange(len(x) - 1, -1, -1) / self.rate)
+            if self.streams:
+                with span("align"):
+                    self.alignment.update(self.aligned())
+        if len(values):
+            self.sampled = now
+            self.latest = EEGValues(**dict(zip(CHANNELS, values[-1].tolist())))
+        self.samples += len(values)
+        if triggered and self.latest is not None:
+            self.triggers += 1
+            return await self.decode(self.options.priority, deadline)
+        if self.options.ack:
+            return {"ack": "received"}
+
+    def prepare(self):
+        """
+        Follow the registry: when the session is routed to another version,
+        rebuild its features from the buffered window and carry on.
+        """
+        routed = registry.route(self.id)
+        if routed != self.version:
+            self.version = routed
+            model = registry.models[routed]
+            self.features = Features(model.extractors(self.rate))
+            self.features.update(self.buffer.view())
+        features = self.features.values()
+        if self.markers and self.sampled is not None:
+            # Markers in the window, by the index of the sample they fall on
+            start = self.sampled - (len(self.buffer) - 1) / self.rate
+            marks = self.markers.between(start, self.sampled)
+            features["markers"] = [
+                (round((time - start) * self.rate), label, value)
+                for time, label, value in marks
+            ]
+        if self.streams:
+            features["streams"] = {id: s.window() for id, s in self.streams.items()}
+            features["aligned"] = self.alignment.window()
+            features["aligned_times"] = self.alignment.times()
+        return self.version, self.latest, self.buffer.view(), features
+
+    def substitute(self, version, values, features):
+        """The arguments to decode the window with ``version`` instead."""
+        window = self.buffer.view()
+        substitute = Features(registry.models[version].extractors(self.rate))
+        substitute.update(window)
+        shared = {
+            name: value
+            for name, value in features.items()
+            if name not in self.features.extractors
+        }
+        return version, values, window.copy(), dict(substitute.values(), **shared)
+
+    def respond(self, text):
+        self.decodes += 1
+        response = {"text": text}
+        for extension in self.extensions:
+            extension.respond(self, response)
+        return response
+
+    async def decode(self, priority="continuous", deadline=None):
+        """
+        Decode a snapshot of the window once the scheduler gets to it, unless
+        the ``deadline`` passes first. When the model is expected to miss the
+        deadline, the ``fallback`` version decodes the window instead.
+        """
+        if self.latest is None and not self.streams:
+            return None
+        if self.quality is not None:
+            with span("quality"):
+                reasons = self.quality.check(self.streams)
+            if reasons:
+                # Decoding a window of noise would only waste a worker
+                self.gated += 1
+                return {"quality": "low", "reasons": reasons}
+        version, values, window, features = self.prepare()
+        for name in ("streams", "aligned"):
+            if name in features:
+                features[name] = {id: w.copy() for id, w in features[name].items()}
+        args = version, values, window.copy(), features
+        fallback = self.settings.fallback
+        if deadline is not None and fallback in registry.models:
+            expected = registry.stats[version].ewma + scheduler.waits[priority].ewma
+            if fallback != version and time.perf_counter() + expected > deadline:
+                self.fallbacks += 1
+                if self.fallbacks % PROBE:
+                    args = self.substitute(fallback, values, features)
+        with span("scheduled"):
+            try:
+                text = await scheduler.run(
+                    priority, self.id, registry.decode, *args, deadline=deadline
+                )
+            except Expired:
+                self.expired += 1
+                return {"deadline": "expired"}
+        response = self.respond(text)
+        if args[0] != version:
+            response["fallback"] = args[0]
+        return response
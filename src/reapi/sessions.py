@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+
+from .admin import require_admin
+from .websockets import manager
+
+# Session history is raw EEG, so it takes the admin token
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+BINARY = "application/octet-stream"
+
+
+def lookup(id):
+    session = manager.find(id)
+    if session is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "unknown session")
+    return session
+
+
+def history(session):
+    from .store import Store
+
+    store = next((e for e in session.extensions if isinstance(e, Store)), None)
+    if store is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "no history is kept")
+    return store
+
+
+@router.get("/{id}/window")
+async def window(
+    id: str,
+    request: Request,
+    start: float | None = None,
+    end: float | None = None,
+    streams: str | None = None,
+):
+    """
+    Stream the stored samples of a session between ``start`` and ``end``,
+    for the comma separated ``streams`` or all of them; see ``reapi.store``.
+    """
+    store = history(lookup(id))
+    from .store import frame, pack
+
+    slices = store.slices(start, end, streams and streams.split(","))
+    if BINARY in request.headers.get("accept", ""):
+        return StreamingResponse((pack(*s) for s in slices), media_type=BINARY)
+    lines = (json.dumps(frame(*s)) + "\n" for s in slices)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@router.get("/{id}/markers")
+async def markers(
+    id: str,
+    start: float | None = None,
+    end: float | None = None,
+    label: str | None = None,
+):
+    marks = lookup(id).markers.between(start, end, label)
+    return [{"time": t, "label": name, "value": value} for t, name, value in marks]
+
+
+@router.get("/{id}/epochs")
+async def epochs(
+    id: str,
+    label: str | None = None,
+    before: float = 0.2,
+    after: float = 0.8,
+    streams: str | None = None,
+):
+    """
+    Cut the stored samples from ``before`` seconds before to ``after``
+    seconds after each marker with ``label``, or every marker, per stream.
+    Markers too close to either end of the stored history, or to a gap in
+    it, are left out.
+    """
+    session = lookup(id)
+    store = history(session)
+    onsets = [time for time, _, _ in session.markers.between(label=label)]
+    queries = []
+    for id in streams.split(",") if streams else list(store.series):
+        if id not in store.series or not onsets:
+            continue
+        stream = session.streams.get(id)
+        rate = session.settings.sample_rate if stream is None else stream.rate
+        start, end = onsets[0] - before - 1 / rate, onsets[-1] + after + 1 / rate
+        # Query here, as samples arrive, and cut in a thread
+        queries.append((id, rate, store.series[id].query(start, end)))
+    return await asyncio.to_thread(cut, queries, onsets, before, after)
+
+
+def cut(queries, onsets, before, after):
+    import numpy as np
+
+    from .markers import epochs
+
+    result = {}
+    for id, rate, slices in queries:
+        samples = round(before * rate), round(after * rate)
+        slices = list(slices)
+        if not slices:
+            continue
+        times, values = (np.concatenate(parts) for parts in zip(*slices))
+        segments, kept = epochs(times, values, onsets, *samples, rate)
+        result[id] = {
+            "onsets": [onset for onset, k in zip(onsets, kept) if k],
+            "times": (np.arange(-samples[0], samples[1]) / rate).tolist(),
+            "epochs": segments.tolist(),
+        }
+    return result
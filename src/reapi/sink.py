@@ -0,0 +1,377 @@
+"""
+Write-behind persistence of every session's raw samples.
+
+The ``persist`` extension hands each batch of samples to a process wide
+``Sink``: a bounded queue drained by a writer thread, so that no file I/O
+happens on the event loop. The writer appends to columnar files rolled
+once they reach ``sink_roll_bytes`` or ``sink_roll_seconds``:
+
+- ``recording``: a ``reapi.recording`` file per session and roll, whose
+  column blocks and time index can be memory mapped and range queried;
+- ``arrow``: an Arrow IPC file per roll, with ``session``, ``time``,
+  ``triggered`` and one column per channel, written as record batches.
+  This needs ``pyarrow``.
+
+When the writer falls behind and the queue fills up, ``sink_policy``
+decides: ``block`` makes the sessions sending samples wait for room, which
+pushes back on their clients while the rest of the server carries on,
+while ``spill`` hands the batches to a spill thread that appends them to a
+spill file, which the writer catches up on, in order, once the queue has
+drained. A batch the writer fails on is logged, counted in ``errors`` and
+lost; the writer carries on with the next.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import pickle
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from .extensions import Extension
+from .models import CHANNELS
+
+log = logging.getLogger(__name__)
+
+STOP = None
+
+
+class Writer(ABC):
+    """Rolls files over by size and age; subclasses open and fill them."""
+
+    def __init__(self, directory, roll_bytes=64 << 20, roll_seconds=3600.0):
+        self.directory = directory
+        self.roll_bytes = roll_bytes
+        self.roll_seconds = roll_seconds
+        self._names = itertools.count()
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, name, suffix):
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        return self.directory / f"{name}-{stamp}-{next(self._names)}{suffix}"
+
+    def expired(self, opened, size):
+        return size >= self.roll_bytes or time.time() - opened >= self.roll_seconds
+
+    @abstractmethod
+    def write(self, id, times, triggered, values):
+        """Append the samples of session ``id``."""
+
+    def end(self, id):  # noqa: B027
+        """Called when session ``id`` closes."""
+
+    def roll(self):  # noqa: B027
+        """Called when idle, to roll files over by age."""
+
+    def close(self):  # noqa: B027
+        """Close every file."""
+
+
+class RecordingWriter(Writer):
+    def __init__(self, directory, roll_bytes=64 << 20, roll_seconds=3600.0):
+        super().__init__(directory, roll_bytes, roll_seconds)
+        self.files = {}
+
+    def write(self, id, times, triggered, values):
+        entry = self.files.get(id)
+        if entry is not None and self.expired(entry[1], entry[0].size):
+            self.end(id)
+            entry = None
+        if entry is None:
+            from .recording import Recorder
+
+            recorder = Recorder(self.path(id, ".reapi"), CHANNELS, meta={"session": id})
+            entry = self.files[id] = recorder, time.time()
+        entry[0].write(times, triggered, values)
+
+    def end(self, id):
+        entry = self.files.pop(id, None)
+        if entry is not None:
+            entry[0].close()
+
+    def roll(self):
+        for id, (recorder, opened) in list(self.files.items()):
+            if self.expired(opened, recorder.size):
+                self.end(id)
+
+    def close(self):
+        for id in list(self.files):
+            self.end(id)
+
+
+class ArrowWriter(Writer):
+    def __init__(self, directory, roll_bytes=64 << 20, roll_seconds=3600.0, rows=8192):
+        try:
+            import pyarrow as pa
+        except ImportError as e:  # pragma: no cover
+            raise ImportError("the arrow sink needs pyarrow installed") from e
+        super().__init__(directory, roll_bytes, roll_seconds)
+        self.pa = pa
+        self.rows = rows
+        fields = [("session", pa.string()), ("time", pa.float64())]
+        fields += [("triggered", pa.bool_())]
+        fields += [(name, pa.float64()) for name in CHANNELS]
+        self.schema = pa.schema(fields)
+        self.file = self.stream = None
+        self.pending = []
+        self.count = 0
+
+    def write(self, id, times, triggered, values):
+        self.pending.append((id, times, triggered, values))
+        self.count += len(times)
+        if self.count >= self.rows:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        import numpy as np
+
+        pa = self.pa
+        ids, times, triggered, values = zip(*self.pending)
+        values = np.concatenate(values)
+        columns = [
+            pa.array(np.repeat(ids, [len(t) for t in times])),
+            pa.array(np.concatenate(times)),
+            pa.array(np.concatenate(triggered)),
+            *(pa.array(values[:, i]) for i in range(len(CHANNELS))),
+        ]
+        if self.stream is None:
+            self.opened = time.time()
+            self.file = pa.OSFile(str(self.path("samples", ".arrow")), "wb")
+            self.stream = pa.ipc.new_file(self.file, self.schema)
+        self.stream.write_batch(pa.record_batch(columns, schema=self.schema))
+        self.pending, self.count = [], 0
+        if self.expired(self.opened, self.file.tell()):
+            self.close()
+
+    def roll(self):
+        self.flush()
+        if self.stream is not None and self.expired(self.opened, self.file.tell()):
+            self.close()
+
+    def close(self):
+        self.flush()
+        if self.stream is not None:
+            self.stream.close()
+            self.file.close()
+            self.file = self.stream = None
+
+
+WRITERS = {"recording": RecordingWriter, "arrow": ArrowWriter}
+
+
+class _Handoff:
+    """Asks the spill thread to close its file and hand it to the writer."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.path = None
+
+
+class Sink:
+    def __init__(self, writer, size=4096, policy="block", spill=None, idle=1.0):
+        self.writer = writer
+        self.queue = queue.Queue(size)
+        self.policy = policy
+        self.spill_dir = spill
+        self.idle = idle
+        self.blocked = self.spilled = self.written = self.errors = self.dropped = 0
+        self.spilling = False
+        self.ends = []
+        self.overflow = queue.SimpleQueue()
+        self._spills = itertools.count()
+        self._lock = threading.Lock()
+        self._thread = _start(self._run, "reapi-sink")
+        self._spiller = None
+        if policy == "spill":
+            self._spiller = _start(self._spill, "reapi-sink-spill")
+
+    @property
+    def alive(self):
+        return self._thread.is_alive()
+
+    async def put(self, item):
+        """
+        Queue ``(id, now, triggered, values, rate)``. With the ``block``
+        policy, waits in a thread for room when the queue is full.
+        """
+        if not self.alive:
+            self.dropped += 1
+            return
+        if self.policy == "spill":
+            return self._overflow(item)
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.blocked += 1
+            await asyncio.to_thread(self._put, item)
+
+    def end(self, id):
+        """Close the files of session ``id`` once its samples are written."""
+        item = id, None, False, None, None
+        if self.policy == "spill":
+            return self._overflow(item)
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.ends.append(id)
+
+    def close(self):
+        if self.alive:
+            self._put(STOP)
+        self._thread.join()
+        if self._spiller is not None:
+            self.overflow.put(STOP)
+            self._spiller.join()
+
+    def _put(self, item):
+        while self.alive:
+            try:
+                return self.queue.put(item, timeout=self.idle)
+            except queue.Full:
+                pass
+        self.dropped += 1
+
+    def _overflow(self, item):
+        with self._lock:
+            if not self.spilling:
+                try:
+                    return self.queue.put_nowait(item)
+                except queue.Full:
+                    self.spilling = True
+            # Once spilling, everything spills until the writer catches up
+            self.overflow.put(item)
+            self.spilled += 1
+
+    def _spill(self):
+        file = None
+        while True:
+            item = self.overflow.get()
+            if item is STOP:
+                return
+            if isinstance(item, _Handoff):
+                if file is not None:
+                    file.close()
+                    item.path, file = file.name, None
+                item.done.set()
+                continue
+            try:
+                if file is None:
+                    name = f"spill-{os.getpid()}-{next(self._spills)}"
+                    file = open(self.spill_dir / name, "ab")
+                pickle.dump(item, file)
+            except Exception:
+                self.errors += 1
+                log.exception("sink: could not spill samples of %s", item[0])
+
+    def _run(self):
+        while True:
+            if self.queue.empty():
+                self._guard(self._replay)
+                self._end()
+            try:
+                item = self.queue.get(timeout=self.idle)
+            except queue.Empty:
+                self._guard(self.writer.roll)
+                continue
+            if item is STOP:
+                self._guard(self._replay)
+                self._end()
+                self._guard(self.writer.close)
+                return
+            self._guard(self._write, item)
+
+    def _guard(self, func, *args):
+        # A failing write loses its batch, not the writer thread
+        try:
+            func(*args)
+        except Exception:
+            self.errors += 1
+            log.exception("sink: %s failed", func.__name__)
+
+    def _replay(self):
+        with self._lock:
+            if not self.spilling:
+                return
+            self.spilling = False
+            handoff = _Handoff()
+            self.overflow.put(handoff)
+        handoff.done.wait()
+        if handoff.path is None:
+            return
+        with open(handoff.path, "rb") as f:
+            while True:
+                try:
+                    item = pickle.load(f)
+                except EOFError:
+                    break
+                self._guard(self._write, item)
+        os.unlink(handoff.path)
+
+    def _end(self):
+        with self._lock:
+            ends, self.ends = self.ends, []
+        for id in ends:
+            self._guard(self.writer.end, id)
+
+    def _write(self, item):
+        import numpy as np
+
+        id, now, triggered, values, rate = item
+        if values is None:
+            return self.writer.end(id)
+        n = len(values)
+        times = now - np.arange(n - 1, -1, -1) / rate
+        flags = np.zeros(n, dtype=bool)
+        flags[-1:] = triggered
+        self.writer.write(id, times, flags, values)
+        self.written += n
+
+
+def _start(target, name):
+    thread = threading.Thread(target=target, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+class Persist(Extension):
+    def __init__(self, sink):
+        self.sink = sink
+
+    async def samples(self, session, now, triggered, values):
+        rate = session.settings.sample_rate
+        await self.sink.put((session.id, now, triggered, values, rate))
+
+    def close(self, session):
+        self.sink.end(session.id)
+
+
+sink = None
+
+
+def open_sink(settings):
+    """The sink of this process, started on first use."""
+    global sink
+    if sink is None:
+        directory = settings.sink_dir
+        if directory is None:
+            raise ValueError("sink: REAPI_SINK_DIR is not set")
+        rolls = settings.sink_roll_bytes, settings.sink_roll_seconds
+        writer = WRITERS[settings.sink](directory, *rolls)
+        spill = directory / "spill"
+        spill.mkdir(exist_ok=True)
+        sink = Sink(writer, settings.sink_queue, settings.sink_policy, spill)
+    return sink
+
+
+def close_sink():
+    """Write out everything queued and close the files."""
+    global sink
+    if sink is not None:
+        sink.close()
+        sink = None
@@ -0,0 +1,89 @@
+"""
+One preallocated block for the windows of every connected session.
+
+A ``RingStore`` holds ``slots`` ring buffers side by side in a single
+``(slots, 2 * capacity, width)`` array, so its memory is fixed up front
+however many sessions come and go. The connection manager hands a slot to
+each session as it connects and takes it back when it disconnects; the
+session's buffer is then a ``Slot``, which behaves like the ``RingBuffer``
+it replaces. ``batch`` gathers the windows of many sessions with a single
+``take``, optionally into a preallocated array, for batched inference.
+"""
+
+import numpy as np
+
+from .buffer import RingBuffer
+
+
+def _restore(capacity, rows, count):
+    buffer = RingBuffer(capacity, rows.shape[1], rows.dtype)
+    buffer.extend(rows)
+    buffer.count = count
+    return buffer
+
+
+class Slot(RingBuffer):
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+        self.capacity = store.capacity
+        self._data = store.data[index]
+        self._data[:] = 0
+        self._end = 0
+        self.count = 0
+
+    def extend(self, rows):
+        super().extend(rows)
+        self.store.ends[self.index] = self._end
+        self.store.lengths[self.index] = len(self)
+
+    def detach(self):
+        """Free the slot and return a ``RingBuffer`` with its rows."""
+        buffer = _restore(self.capacity, self.view().copy(), self.count)
+        self.store.free(self.index)
+        return buffer
+
+    def __reduce__(self):
+        # Snapshots carry the rows, not the whole store
+        return _restore, (self.capacity, self.view().copy(), self.count)
+
+
+class RingStore:
+    def __init__(self, slots, capacity, width, dtype=float):
+        self.capacity = capacity
+        self.width = width
+        self.data = np.zeros((slots, 2 * capacity, width), dtype=dtype)
+        self.ends = np.zeros(slots, dtype=np.intp)
+        self.lengths = np.zeros(slots, dtype=np.intp)
+        self.available = list(range(slots - 1, -1, -1))
+
+    def __len__(self):
+        return len(self.data) - len(self.available)
+
+    def allocate(self, buffer):
+        """
+        Return a ``Slot`` holding the rows of ``buffer``, or None when the
+        store is full or its windows have another shape.
+        """
+        shape = buffer.capacity, buffer.view().shape[1]
+        if not self.available or shape != (self.capacity, self.width):
+            return None
+        slot = Slot(self, self.available.pop())
+        slot.extend(buffer.view())
+        slot.count = buffer.count
+        return slot
+
+    def free(self, index):
+        self.ends[index] = self.lengths[index] = 0
+        self.available.append(index)
+
+    def batch(self, slots, out=None):
+        """
+        Return the windows of ``slots`` as a ``(len(slots), capacity, width)``
+        array. Windows shorter than ``capacity`` are padded with zeros in
+        front; ``lengths`` has their lengths.
+        """
+        slots = np.asarray(slots, dtype=np.intp)
+        rows = self.ends[slots, None] + np.arange(self.capacity)
+        rows += slots[:, None] * 2 * self.capacity
+        return np.take(self.data.reshape(-1, self.width), rows, axis=0, out=out)
@@ -0,0 +1,34 @@
+import time
+from collections import deque
+
+
+class Stats:
+    def __init__(self, size=1024, period=60.0):
+        self.calls = self.errors = 0
+        self.total = self.ewma = 0.0
+        self.period = period
+        self._recent = deque(maxlen=size)
+
+    def observe(self, seconds, error=False):
+        self.calls += 1
+        self.errors += error
+        self.total += seconds
+        self.ewma += (seconds - self.ewma) * (0.1 if self.calls > 1 else 1.0)
+        self._recent.append((time.monotonic(), seconds))
+
+    def summary(self):
+        now = time.monotonic()
+        latencies = sorted(seconds for _, seconds in self._recent)
+        recent = sum(now - t <= self.period for t, _ in self._recent)
+
+        def quantile(q):
+            return latencies[int(q * (len(latencies) - 1))] if latencies else None
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean": self.total / self.calls if self.calls else None,
+            "p50": quantile(0.5),
+            "p99": quantile(0.99),
+            "throughput": recent / self.period,
+        }
@@ -0,0 +1,182 @@
+"""
+Time-indexed history of a session's samples.
+
+Every stream of a session, ``"eeg"`` included, is kept as a series of
+chunks of ``store_chunk`` samples. The newest ``store_hot`` chunks are kept
+in memory; older ones are spilled to ``.npy`` files under ``store_dir``,
+up to ``store_cold`` of them, or dropped when there is no such directory.
+Chunks are listed with their first and last times, so a time range query
+is a binary search over chunks and a mask over the few chunks at its ends.
+
+``GET /sessions/{id}/window`` streams the slices of a range, as NDJSON
+lines in the batch format of stream frames, or, for ``Accept:
+application/octet-stream``, as binary slices: a ``SLICE`` header with the
+length of the stream id, the number of samples and of channels, then the
+id, the ``float64`` times and the ``float64`` samples, row by row.
+"""
+
+import shutil
+import struct
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from .extensions import Extension
+from .models import CHANNELS
+
+SLICE = struct.Struct("<HII")
+
+
+class Series:
+    def __init__(self, channels, chunk=1024, hot=8, cold=0, path=None):
+        self.channels = tuple(channels)
+        self.chunk = chunk
+        self.hot = hot
+        self.cold = cold
+        self.path = path
+        self.chunks = []
+        self.starts = []
+        self.ends = []
+        self.spilled = 0
+        self.written = 0
+        self._times = np.empty(chunk)
+        self._values = np.empty((chunk, len(self.channels)))
+        self._count = 0
+
+    def extend(self, times, values):
+        done = 0
+        while done < len(values):
+            size = min(self.chunk - self._count, len(values) - done)
+            rows = slice(self._count, self._count + size)
+            self._times[rows] = times[done : done + size]
+            self._values[rows] = values[done : done + size]
+            self._count += size
+            done += size
+            if self._count == self.chunk:
+                self._seal()
+
+    def _seal(self):
+        times = self._times.copy()
+        self.chunks.append((times, self._values.copy()))
+        self.starts.append(times[0])
+        self.ends.append(times[-1])
+        self._count = 0
+        if len(self.chunks) - self.spilled > self.hot:
+            self._spill()
+
+    def _spill(self):
+        if self.path is None or not self.cold:
+            del self.chunks[0], self.starts[0], self.ends[0]
+            return
+        times, values = self.chunks[self.spilled]
+        self.path.mkdir(parents=True, exist_ok=True)
+        path = self.path / f"{self.written}.npy"
+        np.save(path, np.column_stack([times, values]))
+        self.chunks[self.spilled] = path
+        self.spilled += 1
+        self.written += 1
+        if self.spilled > self.cold:
+            self.chunks[0].unlink(missing_ok=True)
+            del self.chunks[0], self.starts[0], self.ends[0]
+            self.spilled -= 1
+
+    def query(self, start=None, end=None):
+        """
+        Return the ``(times, values)`` slices of the samples with
+        ``start <= time <= end``, oldest first. Chunks on disk are read
+        lazily, so the slices must be consumed while the series is alive.
+        """
+        lo = 0 if start is None else bisect_left(self.ends, start)
+        hi = len(self.chunks) if end is None else bisect_right(self.starts, end)
+        chunks = self.chunks[lo:hi]
+        if self._count:
+            n = self._count
+            chunks.append((self._times[:n].copy(), self._values[:n].copy()))
+        return _slices(chunks, start, end)
+
+    def close(self):
+        if self.path is not None:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _slices(chunks, start, end):
+    for chunk in chunks:
+        if not isinstance(chunk, tuple):
+            try:
+                data = np.load(chunk, mmap_mode="r")
+            except FileNotFoundError:
+                continue
+            chunk = data[:, 0], data[:, 1:]
+        times, values = chunk
+        mask = np.ones(len(times), dtype=bool)
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times <= end
+        if mask.any():
+            yield np.asarray(times[mask]), np.asarray(values[mask])
+
+
+class Store(Extension):
+    """Keeps the history of a session's EEG and streams."""
+
+    def __init__(self, settings, path=None):
+        self.settings = settings
+        self.path = path
+        self.series = {}
+
+    def _series(self, id, channels):
+        series = self.series.get(id)
+        if series is None or series.channels != tuple(channels):
+            if series is not None:
+                series.close()
+            s = self.settings
+            path = None if self.path is None else self.path / id
+            series = Series(channels, s.store_chunk, s.store_hot, s.store_cold, path)
+            self.series[id] = series
+        return series
+
+    def samples(self, session, now, triggered, values):
+        times = now - np.arange(len(values) - 1, -1, -1) / self.settings.sample_rate
+        self._series("eeg", CHANNELS).extend(times, values)
+
+    def stream(self, session, stream, values, times):
+        self._series(stream.id, stream.channels).extend(times, values)
+
+    def slices(self, start=None, end=None, streams=None):
+        """
+        Return an iterator of ``(id, times, values)`` over the slices in the
+        range. The chunks are picked right away, so the iterator can be
+        consumed in another thread while samples keep arriving.
+        """
+        ids = [id for id in streams or self.series if id in self.series]
+        queries = [(id, self.series[id].query(start, end)) for id in ids]
+        return ((id, *s) for id, slices in queries for s in slices)
+
+    def close(self, session):
+        if self.path is not None:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+def frame(id, times, values):
+    data = {"times": times.tolist(), "samples": values.tolist()}
+    return data if id == "eeg" else {"stream": id, **data}
+
+
+def pack(id, times, values):
+    key = id.encode()
+    header = SLICE.pack(len(key), *values.shape)
+    data = [times.astype("<f8").tobytes(), values.astype("<f8").tobytes()]
+    return b"".join([header, key, *data])
+
+
+def unpack(data, offset=0):
+    """Read the binary slice at ``offset``; return it and the next offset."""
+    size, rows, width = SLICE.unpack_from(data, offset)
+    offset += SLICE.size
+    id = bytes(data[offset : offset + size]).decode()
+    offset += size
+    times = np.frombuffer(data, "<f8", rows, offset)
+    offset += 8 * rows
+    values = np.frombuffer(data, "<f8", rows * width, offset).reshape(rows, width)
+    return (id, times, values), offset + 8 * rows * width
@@ -0,0 +1,96 @@
+"""
+Typed streams multiplexed on one connection.
+
+Besides its EEG samples, a session can carry other streams, such as the
+motion, metrics and band power streams of a Cortex headset. A client
+declares each stream once, with its channels and nominal rate::
+
+    {"declare": "mot", "channels": ["ACCX", "ACCY", "ACCZ"], "rate": 64}
+
+and then sends its samples with the stream id, either one at a time, with
+``values`` keyed by channel or in channel order, or as a batch of rows in
+the format of ``reapi.codec``::
+
+    {"stream": "mot", "time": 1712.25, "values": {"ACCX": 0.1, ...}}
+    {"stream": "mot", "times": [...], "samples": [[...], ...], "scale": 0.01}
+
+Samples without times are spaced at the nominal rate, ending at arrival
+on the session clock, and times must not go back; times sent by the client
+are Unix times, on the same clock. Every stream keeps a window of the same
+duration as the EEG window, which models receive as
+``features["streams"][id]``, and is resampled on a common time base, with
+``"align": "linear"`` or ``"hold"`` in its declaration; see ``reapi.align``.
+"""
+
+import math
+
+import numpy as np
+
+from . import codec
+from .align import METHODS
+from .buffer import RingBuffer
+
+
+class Stream:
+    __slots__ = ("id", "channels", "rate", "method", "buffer", "times", "samples")
+
+    def __init__(self, id, channels, rate, capacity, method="linear"):
+        self.id = id
+        self.channels = tuple(channels)
+        self.rate = rate
+        self.method = method
+        self.buffer = RingBuffer(capacity, len(self.channels))
+        self.times = RingBuffer(capacity, 1)
+        self.samples = 0
+
+    @classmethod
+    def declare(cls, data, settings):
+        id, channels = data["declare"], data.get("channels")
+        rate = float(data.get("rate") or settings.sample_rate)
+        method = data.get("align", "linear")
+        if not isinstance(id, str) or not id or id == "eeg":
+            raise ValueError("declare: stream ids are non-empty strings but eeg")
+        if not channels or not all(isinstance(c, str) for c in channels):
+            raise ValueError("channels: a stream needs a list of channel names")
+        if not rate > 0:
+            raise ValueError("rate: must be positive")
+        if method not in METHODS:
+            raise ValueError(f"align: one of {', '.join(METHODS)}")
+        capacity = max(math.ceil(settings.window * rate / settings.sample_rate), 1)
+        return cls(id, channels, rate, capacity, method)
+
+    def parse(self, data, now):
+        """Return the ``(values, times)`` arrays of a frame of this stream."""
+        if "samples" in data:
+            values = codec.decode(
+                data["samples"], data.get("scale"), len(self.channels)
+            )
+        else:
+            row = data["values"]
+            if isinstance(row, dict):
+                row = [row[name] for name in self.channels]
+            values = np.array([row], dtype=float)
+            if values.shape != (1, len(self.channels)):
+                raise ValueError(f"values: {self.id} has {len(self.channels)} channels")
+        if "times" in data:
+            times = np.asarray(data["times"], dtype=float)
+        elif "time" in data and len(values) == 1:
+            times = np.array([data["time"]], dtype=float)
+        else:
+            times = now - np.arange(len(values) - 1, -1, -1) / self.rate
+        if times.shape != (len(values),):
+            raise ValueError("times: need one time per sample")
+        if not np.isfinite(times).all():
+            raise ValueError("times: must be finite")
+        last = self.times.view()[-1:, 0]
+        if np.any(np.diff(np.concatenate([last, times])) < 0):
+            raise ValueError("times: must not go back")
+        return values, times
+
+    def extend(self, values, times):
+        self.buffer.extend(values)
+        self.times.extend(times[:, None])
+        self.samples += len(values)
+
+    def window(self):
+        return self.buffer.view()
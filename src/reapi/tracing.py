@@ -0,0 +1,104 @@
+"""
+Sampled tracing of the request path.
+
+``tracer.trace(name)`` starts a trace for a ``rate`` fraction of the calls
+and makes it current for the task, and for worker threads started from it.
+``span(name)`` times a stage of the current trace and costs one context
+variable lookup when nothing is being traced. Finished traces are kept in a
+bounded buffer and every span feeds latency statistics per stage.
+"""
+
+import random
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from .stats import Stats
+
+current = ContextVar("trace", default=None)
+
+
+class _Noop:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+NOOP = _Noop()
+
+
+class Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.trace.spans.append((self.name, self.start, end - self.start))
+        return False
+
+
+class Trace:
+    __slots__ = ("tracer", "name", "start", "spans", "_token")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.spans = []
+
+    def __enter__(self):
+        self._token = current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.start
+        current.reset(self._token)
+        self.tracer.finish(self, duration)
+        return False
+
+
+def span(name):
+    trace = current.get()
+    return NOOP if trace is None else Span(trace, name)
+
+
+class Tracer:
+    def __init__(self, rate=0.0, size=256):
+        self.rate = rate
+        self.traces = deque(maxlen=size)
+        self.stats = defaultdict(Stats)
+
+    def trace(self, name):
+        if self.rate and random.random() < self.rate:
+            return Trace(self, name)
+        return NOOP
+
+    def finish(self, trace, duration):
+        self.stats[trace.name].observe(duration)
+        spans = []
+        for name, start, seconds in trace.spans:
+            self.stats[f"{trace.name}.{name}"].observe(seconds)
+            spans.append(
+                {"name": name, "start": start - trace.start, "duration": seconds}
+            )
+        spans.sort(key=lambda s: s["start"])
+        self.traces.append({"name": trace.name, "duration": duration, "spans": spans})
+
+    def summary(self, limit=20):
+        return {
+            "rate": self.rate,
+            "stages": {name: s.summary() for name, s in sorted(self.stats.items())},
+            "recent": list(self.traces)[-limit:] if limit else [],
+        }
+
+
+tracer = Tracer()
@@ -1,16 +1,128 @@
-from fastapi import WebSocket, WebSocketDisconnect
+import asyncio
+import time
+from collections import Counter
+
+from fastapi import WebSocket, status
 
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        self.active_connections: dict[WebSocket, object] = {}
+        self.clients = Counter()
+        self.streams = {}
+        self.owners = {}
+        self.slots = 0
+        self.store = None
+
+    def configure(self, slots):
+        """Keep the windows of up to ``slots`` sessions in one ``RingStore``."""
+        self.slots = slots
+        self.store = None
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, session=None):
+        self.active_connections[websocket] = session
+        self.clients[client(websocket)] += 1
+        if session is not None:
+            self.attach(session)
         await websocket.accept()
-        self.active_connections.append(websocket)
 
-    def disconnect(self, websocket: WebSocket):  # pragma: no cover
-        self.active_connections.remove(websocket)
+    def disconnect(self, websocket: WebSocket):
+        session = self.active_connections.pop(websocket, False)
+        if session is not False:
+            self.release(client(websocket))
+            if session is not None:
+                self.detach(session)
+
+    def release(self, host):
+        self.clients[host] -= 1
+        if not self.clients[host]:
+            del self.clients[host]
+
+    def attach(self, session):
+        if not self.slots:
+            return
+        from .slots import RingStore
+
+        buffer = session.buffer
+        if self.store is None:
+            width = buffer.view().shape[1]
+            self.store = RingStore(self.slots, buffer.capacity, width)
+        slot = self.store.allocate(buffer)
+        if slot is not None:
+            session.buffer = slot
+
+    def detach(self, session):
+        if hasattr(session.buffer, "detach"):
+            session.buffer = session.buffer.detach()
+
+    def add_stream(self, session, connection):
+        self.streams[session.id] = session
+        host = self.owners[session.id] = client(connection)
+        self.clients[host] += 1
+        self.attach(session)
+
+    @property
+    def sessions(self):
+        return [s for s in self.active_connections.values() if s is not None]
+
+    def find(self, id):
+        """Return the session with ``id``, over websockets or HTTP ingest."""
+        if id in self.streams:
+            return self.streams[id]
+        return next((s for s in self.sessions if s.id == id), None)
+
+    def close_stream(self, id):
+        session = self.streams.pop(id, None)
+        if session is not None:
+            self.release(self.owners.pop(id))
+            self.detach(session)
+            session.close()
+
+    def refuse(self, connection, limit=None, client_limit=None):
+        """Return why a new connection would exceed the limits, if it would."""
+        count = len(self.active_connections) + len(self.streams)
+        if limit is not None and count >= limit:
+            return "too many connections"
+        if (
+            client_limit is not None
+            and self.clients[client(connection)] >= client_limit
+        ):
+            return "too many connections from this client"
+
+    async def reap(self, heartbeat, timeout):
+        """
+        Ping sessions that have been quiet for ``heartbeat`` seconds and close
+        those that have been quiet for ``timeout`` seconds. Any frame from the
+        client counts as activity. One task checks every connection, at a
+        quarter of the shorter interval, so connections need no timers of
+        their own; a send that stalls, as on a half-open socket, is abandoned
+        at the next check. Idle sessions of HTTP uploads are closed as well.
+        """
+        interval = min(t for t in (heartbeat, timeout) if t) / 4
+        while True:
+            await asyncio.sleep(interval)
+            now, sends = time.time(), []
+            for id, session in list(self.streams.items()):
+                if timeout and now - session.last_seen >= timeout:
+                    self.close_stream(id)
+            for ws, session in list(self.active_connections.items()):
+                if session is None:
+                    continue
+                quiet = now - session.last_seen
+                if timeout and quiet >= timeout:
+                    self.disconnect(ws)
+                    sends.append(ws.close(status.WS_1001_GOING_AWAY, "idle timeout"))
+                elif (
+                    heartbeat
+                    and now - max(session.last_seen, session.pinged) >= heartbeat
+                ):
+                    session.pinged = now
+                    sends.append(ws.send_json({"ping": now}))
+            if sends:
+                await asyncio.gather(
+                    *(asyncio.wait_for(send, interval) for send in sends),
+                    return_exceptions=True,
+                )
 
     # async def send_personal_message(self, message: str, websocket: WebSocket):
     #     await websocket.send_text(message)
@@ -20,13 +132,27 @@ class ConnectionManager:
     #         await connection.send_text(message)
 
 
+def client(connection):
+    return connection.client.host if connection.client else None
+
+
 manager = ConnectionManager()
 
 
-async def json_emitter(ws: WebSocket):
-    await manager.connect(ws)
+async def frame_emitter(ws: WebSocket, session=None, max_size=None):
+    """Yield text frames as strings and binary frames as bytes."""
+    await manager.connect(ws, session)
     try:
-        async for data in ws.iter_json():
+        while True:
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("text")
+            if data is None:
+                data = message.get("bytes", b"")
+            if max_size is not None and len(data) > max_size:
+                await ws.close(status.WS_1009_MESSAGE_TOO_BIG, "message too big")
+                break
             yield data
-    except WebSocketDisconnect:  # pragma: no cover
+    finally:
         manager.disconnect(ws)
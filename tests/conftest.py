@@ -2,6 +2,8 @@ import pytest
 from fastapi.testclient import TestClient
 
 from reapi import __version__
+from reapi.app import make
+from reapi.config import Settings
 from reapi.main import app
 
 
@@ -14,3 +16,11 @@ def version():
 def client():
     with TestClient(app) as c:
         yield c
+
+
+@pytest.fixture
+def make_client():
+    def make_client(**options):
+        return TestClient(make(Settings(**options)))
+
+    return make_client
@@ -0,0 +1,115 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from reapi.align import Alignment, resample
+from reapi.config import Settings
+from reapi.models import CHANNELS, Options
+from reapi.session import Session
+from reapi.streams import Stream
+
+
+def test_resample():
+    times = np.array([1.0, 2.0, 2.0, 4.0])
+    values = np.array([[0.0, 1], [10, 1], [20, 1], [40, 3]])
+    grid = np.array([0.0, 1.5, 2.0, 3.0, 5.0])
+    linear = resample(times, values, grid)
+    assert linear[:, 0].tolist() == [0, 5, 20, 30, 40]
+    assert linear[:, 1].tolist() == [1, 1, 1, 2, 3]
+    assert resample(times, values, grid, "hold")[:, 0].tolist() == [0, 0, 20, 20, 40]
+
+
+def feed(alignment, streams, chunks):
+    for parts in chunks:
+        for stream, (values, times) in zip(streams.values(), parts):
+            stream.extend(values, times)
+        alignment.update(streams)
+
+
+def test_incremental():
+    rng = np.random.default_rng(0)
+    mot = Stream("mot", ["x", "y"], 64.0, 128)
+    pow = Stream("pow", ["alpha"], 8.0, 16, "hold")
+    streams = {"mot": mot, "pow": pow}
+    t_mot = 100 + np.cumsum(rng.uniform(0.01, 0.02, 128))
+    t_pow = 100 + np.cumsum(rng.uniform(0.1, 0.15, 16))
+    v_mot, v_pow = rng.normal(size=(128, 2)), rng.normal(size=(16, 1))
+    chunks = []
+    for i in range(8):
+        a, b = slice(16 * i, 16 * (i + 1)), slice(2 * i, 2 * (i + 1))
+        chunks.append([(v_mot[a], t_mot[a]), (v_pow[b], t_pow[b])])
+    alignment = Alignment(128.0, 256, latency=0.2)
+    feed(alignment, streams, chunks)
+    grid = alignment.times()
+    assert len(grid) == alignment.length and np.allclose(np.diff(grid), 1 / 128)
+    assert grid[-1] <= max(t_mot[-1], t_pow[-1]) - 0.2
+    # Computed as samples arrived, yet as if every sample had been there
+    window = alignment.window()
+    later = grid > t_mot[0] + 0.2
+    expected = resample(t_mot, v_mot, grid)
+    assert np.allclose(window["mot"][later], expected[later])
+    expected = resample(t_pow, v_pow, grid, "hold")
+    assert np.allclose(
+        window["pow"][grid > t_pow[0] + 0.3], expected[grid > t_pow[0] + 0.3]
+    )
+
+
+def test_streams_come_and_go():
+    alignment = Alignment(10.0, 8)
+    mot = Stream("mot", ["x"], 10.0, 8)
+    alignment.update({"mot": mot})
+    assert len(alignment.times()) == 0 and alignment.window() == {}
+    mot.extend(np.ones((4, 1)), np.arange(4) / 10)
+    alignment.update({"mot": mot})
+    assert alignment.window()["mot"].shape == (4, 1)
+    alignment.update({})
+    assert "mot" in alignment.window()
+    # A stream that is no longer declared leaves the window
+    pow = Stream("pow", ["alpha"], 10.0, 8)
+    pow.extend(np.ones((2, 1)), np.array([0.4, 0.5]))
+    alignment.update({"pow": pow})
+    assert list(alignment.window()) == ["pow"]
+
+
+def test_session():
+    session = Session(Options(ack=False), Settings(window=64))
+    session.declare({"declare": "mot", "channels": ["x"], "rate": 32})
+    session.declare({"declare": "pow", "channels": ["a", "b"], "rate": 4})
+    for i in range(40):
+        frame = {"stream": "mot", "time": 10 + i / 32, "values": [i]}
+        asyncio.run(session.receive(frame))
+        if i % 8 == 0:
+            frame = {"stream": "pow", "time": 10 + i / 32, "values": [i, -i]}
+            asyncio.run(session.receive(frame))
+    *_, features = session.prepare()
+    aligned, times = features["aligned"], features["aligned_times"]
+    assert aligned["mot"].shape == (len(times), 1) and aligned["pow"].shape[1] == 2
+    assert np.allclose(aligned["mot"][:, 0], (times - 10) * 32)
+    with pytest.raises(ValueError, match="go back"):
+        asyncio.run(session.receive({"stream": "mot", "time": 1, "values": [0]}))
+    with pytest.raises(ValueError, match="align"):
+        session.declare({"declare": "met", "channels": ["x"], "align": "cubic"})
+    session.declare({"declare": "mot", "channels": ["y"]})
+    asyncio.run(session.receive({"stream": "mot", "time": 12, "values": [1]}))
+    mot = session.alignment.window()["mot"]
+    assert len(mot) == session.alignment.length and set(mot[:, 0]) == {1}
+    session.close()
+
+
+def test_session_eeg():
+    session = Session(Options(ack=False), Settings(window=256))
+    session.declare({"declare": "mot", "channels": ["x"], "rate": 32})
+    session.last_seen = 100.0
+    rows = np.repeat(np.arange(128.0)[:, None], len(CHANNELS), axis=1)
+    asyncio.run(session.extend(False, rows))
+    for i in range(48):
+        frame = {"stream": "mot", "time": 99 + i / 32, "values": [i]}
+        asyncio.run(session.receive(frame))
+    *_, features = session.prepare()
+    aligned, times = features["aligned"], features["aligned_times"]
+    assert aligned["eeg"].shape == (len(times), len(CHANNELS))
+    expected = np.clip((times - 100) * session.rate + 127, 0, 127)
+    assert np.allclose(aligned["eeg"][:, 0], expected)
+    assert session.clock() == session.last_seen
+    session.close()
@@ -0,0 +1,150 @@
+import json
+
+import numpy as np
+import pytest
+
+from reapi.ai import limit_threads
+from reapi.ai.backends import Backend, Network, NumpyBackend, open_backend
+from reapi.ai.model import Features
+from reapi.ai.registry import Registry
+from reapi.ai.weights import Weights, save
+from reapi.models import EEGValues
+
+rng = np.random.default_rng(0)
+W0, B0 = rng.normal(size=(16, 4)), rng.normal(size=16)
+W1 = rng.normal(size=(3, 16))
+VOCABULARY = ["yes", "no", "maybe"]
+LAYERS = [
+    {"op": "dense", "weight": "w0", "bias": "b0"},
+    {"op": "relu"},
+    {"op": "dense", "weight": "w1"},
+    {"op": "softmax"},
+]
+X = rng.normal(size=(5, 4)).astype(np.float32)
+
+
+def reference(x):
+    h = np.maximum(x @ W0.T + B0, 0) @ W1.T
+    e = np.exp(h - h.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def write(path, dtype):
+    meta = {"layers": LAYERS, "vocabulary": VOCABULARY}
+    save(path, {"w0": W0, "b0": B0, "w1": W1}, dtype, meta)
+    return path
+
+
+@pytest.mark.parametrize(
+    "dtype,tolerance", [("float32", 1e-5), ("float16", 1e-2), ("int8", 5e-2)]
+)
+def test_numpy_backend(tmp_path, dtype, tolerance):
+    backend = NumpyBackend(write(tmp_path / "model.weights", dtype))
+    weights = backend.weights
+    assert weights["w0"][0].dtype == dtype
+    assert weights["b0"][0].dtype == np.float32 and weights["b0"][1] is None
+    assert isinstance(weights._map, np.memmap)
+    assert backend.size == 4 and "w1" in weights and list(weights) == ["w0", "b0", "w1"]
+    assert np.abs(backend.run(X) - reference(X)).max() < tolerance
+
+
+def test_blocks(tmp_path):
+    backend = NumpyBackend(write(tmp_path / "model.weights", "int8"))
+    whole = backend.run(X)
+    backend.block = 8
+    assert np.allclose(backend.run(X), whole)
+
+
+def test_file_sizes(tmp_path):
+    tensors = {"w": rng.normal(size=(256, 256))}
+    sizes = {}
+    for dtype in ("float32", "float16", "int8"):
+        save(tmp_path / dtype, tensors, dtype)
+        sizes[dtype] = Weights(tmp_path / dtype).nbytes
+    assert sizes["int8"] < sizes["float16"] / 1.9
+    assert sizes["float16"] < sizes["float32"] / 1.9
+
+
+def test_errors(tmp_path):
+    with pytest.raises(ValueError):
+        save(tmp_path / "x", {}, "int4")
+    (tmp_path / "bad").write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        Weights(tmp_path / "bad")
+    save(tmp_path / "x", {}, meta={"layers": [{"op": "gelu"}]})
+    with pytest.raises(ValueError):
+        NumpyBackend(tmp_path / "x")
+
+
+def test_network(tmp_path):
+    path = write(tmp_path / "model.weights", "int8")
+    registry = Registry()
+    registry.load("net", str(path))
+    network = registry.get("net")
+    assert isinstance(network, Network)
+    values = EEGValues(Cx=1, Drm=2)
+    assert sorted(
+        network.head(values, None, {"mean": None, "variance": None})
+    ) == sorted(VOCABULARY)
+    features = Features(network.extractors(128.0))
+    features.update(X[:, :2])
+    words = registry.decode("net", values, X[:, :2], features.values())
+    expected = reference(np.concatenate([X[:, :2].mean(0), X[:, :2].var(0)])[None])[0]
+    assert words[0] == VOCABULARY[expected.argmax()]
+
+
+class Constant(Backend):
+    vocabulary = ("a",)
+
+    def run(self, x):
+        return np.ones((len(x), 1))
+
+
+def test_unsized(tmp_path):
+    save(tmp_path / "relu", {}, meta={"layers": [{"op": "relu"}]})
+    backend = NumpyBackend(tmp_path / "relu")
+    assert backend.size is None and backend.run([[-1.0, 1.0]]).tolist() == [[0, 1]]
+    Network(backend).warm_up()
+    network = Network(Constant())
+    assert network.head(None, None, {"mean": None, "variance": None}) == []
+    features = {"mean": np.ones(2), "variance": np.ones(2)}
+    assert network.head(None, None, features) == ["a"]
+
+
+def test_onnx(tmp_path):
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from onnx import TensorProto, helper, numpy_helper
+
+    graph = helper.make_graph(
+        [helper.make_node("Gemm", ["x", "w", "b"], ["y"], transB=1)],
+        "linear",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, ["batch", 4])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, ["batch", 16])],
+        [
+            numpy_helper.from_array(W0.astype(np.float32), "w"),
+            numpy_helper.from_array(B0.astype(np.float32), "b"),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    helper.set_model_props(model, {"vocabulary": json.dumps(list("abcdefghijklmnop"))})
+    path = tmp_path / "model.onnx"
+    onnx.save(model, path)
+    backend = open_backend(path, threads=1)
+    assert backend.size == 4 and len(backend.vocabulary) == 16
+    assert np.allclose(backend.run(X), X @ W0.T + B0, atol=1e-5)
+    Network(backend).warm_up()
+    # Models that take any number of features have no size to warm up with
+    model.graph.input[0].type.tensor_type.shape.dim[1].dim_param = "features"
+    onnx.save(model, path)
+    backend = open_backend(path)
+    assert backend.size is None
+    Network(backend).warm_up()
+
+
+def test_limit_threads():
+    environ = {"MKL_NUM_THREADS": "4"}
+    limit_threads(2, environ)
+    assert environ["OMP_NUM_THREADS"] == "2" and environ["MKL_NUM_THREADS"] == "4"
+    limit_threads(None, environ)
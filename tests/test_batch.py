@@ -0,0 +1,116 @@
+import json
+
+import numpy as np
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+
+from reapi.ai.model import Model
+from reapi.batch import preprocess, read_csv, run, sample_rate, windows
+from reapi.cli import main
+from reapi.config import Settings
+from reapi.preprocess import build
+from reapi.recording import Recorder
+
+TEXT = ["Some", "ai", "generated", "data"]
+PROBE = "test_batch:Probe"
+
+
+class Probe(Model):
+    def extractors(self, fs):
+        self.fs = fs
+        return {}
+
+    def head(self, values, window, features):
+        return [self.fs, window.shape[1], values.Cx]
+
+
+@pytest.mark.parametrize("sizes", [[20], [3, 7, 1, 9], [1] * 20])
+def test_windows_span_chunks(sizes):
+    values = np.arange(40.0).reshape(20, 2)
+    chunks, start = [], 0
+    for size in sizes:
+        chunks.append((values[start : start + size, 0], values[start : start + size]))
+        start += size
+    batches = list(windows(chunks, 5, 3, batch=2))
+    times = np.concatenate([t for t, _ in batches])
+    result = np.concatenate([w for _, w in batches])
+    expected = sliding_window_view(values, 5, axis=0)[::3].transpose(0, 2, 1)
+    assert np.array_equal(result, expected)
+    assert np.array_equal(times, expected[:, -1, 0])
+
+
+def test_read_csv(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text(
+        "title:test,sampling rate:eeg_128\n"
+        "Timestamp,EEG.Counter,EEG.Cx,EEG.Drm\n"
+        "1.0,0,4.0,5.0\n"
+        "2.0,1,6.0,7.0\n"
+    )
+    ((times, values),) = read_csv(path)
+    assert times.tolist() == [1.0, 2.0]
+    assert values.tolist() == [[4.0, 5.0], [6.0, 7.0]]
+    path.write_text("Cx,Drm\n1,2\n")
+    ((times, values),) = read_csv(path)
+    assert times.tolist() == [0.0] and values.tolist() == [[1.0, 2.0]]
+    path.write_text("a,b\n1,2\n")
+    with pytest.raises(ValueError):
+        list(read_csv(path))
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_run(tmp_path, workers):
+    path = tmp_path / "session.reapi"
+    with Recorder(path, ("Cx", "Drm"), chunk=16) as recorder:
+        for i in range(100):
+            recorder.append(float(i), False, (i, i))
+    results = list(run([path], 10, 5, workers=workers, batch=4))
+    assert [r["time"] for r in results] == list(range(9, 100, 5))
+    assert all(r["text"] == TEXT and r["source"] == str(path) for r in results)
+
+
+def test_cli(tmp_path, capsys):
+    path = tmp_path / "export.csv"
+    path.write_text("Cx,Drm\n" + "1,2\n" * 8)
+    output = tmp_path / "out.jsonl"
+    main(["batch", str(path), "--window", "4", "--hop", "2", "--workers", "0"])
+    main(["batch", str(path), "--window", "4", "--workers", "0", "-o", str(output)])
+    main(["batch", str(path), "--window", "8", "--workers", "0", "--model", PROBE])
+    lines = capsys.readouterr().out.splitlines()
+    results = [json.loads(line) for line in lines]
+    assert [r["time"] for r in results] == [3, 5, 7, 7]
+    assert results[-1]["text"] == [128, 2, 1]
+    assert len(output.read_text().splitlines()) == 1
+
+
+def test_sample_rate(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text("title:test,sampling rate:eeg_256\nCx,Drm\n")
+    assert sample_rate(path, 128.0) == 256
+    path.write_text("Cx,Drm\n")
+    assert sample_rate(path, 128.0) == 128
+    path = tmp_path / "session.reapi"
+    Recorder(path, ("Cx", "Drm"), meta={"rate": 64}).close()
+    assert sample_rate(path, 128.0) == 64
+
+
+def test_preprocess():
+    pipeline = build([{"stage": "decimate", "factor": 4}], 64)
+    chunks = [(np.array([i / 64]), np.full((1, 2), i)) for i in range(8)]
+    times = [times.tolist() for times, _ in preprocess(chunks, pipeline, 64)]
+    assert times == [[0.0], [4 / 64]]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_run_preprocess(tmp_path, workers):
+    path = tmp_path / "export.csv"
+    rows = "".join(f"{i / 64},{i},0\n" for i in range(64))
+    path.write_text("title:test,sampling rate:eeg_64\nTimestamp,Cx,Drm\n" + rows)
+    settings = Settings(preprocess=[{"stage": "decimate", "factor": 2}])
+    results = list(run([path], 4, 4, workers, 4, PROBE, settings))
+    assert [r["time"] * 64 for r in results] == [7, 15, 23, 31, 39, 47, 55, 63]
+    assert all(r["text"][:2] == [32, 2] for r in results)
+    assert [r["text"][2] for r in results] == [r["time"] * 64 for r in results]
+    settings = Settings(preprocess=[{"stage": "bandpower", "bands": {"a": [1, 4]}}])
+    results = list(run([path], 4, 30, 0, 4, PROBE, settings))
+    assert [r["text"] for r in results] == [[64, 2, 3], [64, 2, 33], [64, 2, 63]]
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from reapi import codec
+from reapi.websockets import manager
+
+TEXT = ["Some", "ai", "generated", "data"]
+
+
+def signal(n=64):
+    t = np.arange(n)[:, None]
+    return np.hstack([np.sin(t / 8), np.cos(t / 8)]) * 50
+
+
+def test_delta():
+    values = signal()
+    frame = codec.encode(values, scale=0.01)
+    assert all(isinstance(v, int) for row in frame["samples"] for v in row)
+    assert np.abs(frame["samples"][1:]).max() < 1000 < np.abs(values).max() / 0.01
+    decoded = codec.decode(frame["samples"], frame["scale"])
+    assert np.abs(decoded - values).max() <= 0.005 + 1e-9
+    assert np.array_equal(codec.decode(codec.encode(values)["samples"]), values)
+
+
+@pytest.mark.parametrize("scale,code", [(None, b"f"), (0.01, b"h"), (1e-6, b"i")])
+def test_binary(scale, code):
+    values = signal()
+    frame = codec.pack(values, True, scale)
+    assert frame[3:4] == code
+    triggered, decoded = codec.unpack(frame)
+    assert triggered and decoded.shape == values.shape
+    assert np.allclose(decoded, values, atol=scale or 1e-4)
+    with pytest.raises(ValueError):
+        codec.unpack(frame[:-1])
+    with pytest.raises(ValueError, match="header"):
+        codec.unpack(frame[:3])
+    with pytest.raises(ValueError, match="not a reapi"):
+        codec.unpack(b"x" + frame[1:])
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        codec.decode([[1, 2, 3]])
+    assert codec.decode([]).shape == (0, 2)
+    assert codec.unpack(codec.pack(np.empty((0, 2))))[1].shape == (0, 2)
+
+
+def test_split():
+    frame = codec.pack(signal(3))
+    frames, rest = codec.split(frame * 2 + frame[:-1])
+    assert frames == [frame, frame] and rest == frame[:-1]
+    with pytest.raises(ValueError):
+        codec.split(b"x" * len(frame))
+
+
+def test_batches(make_client):
+    values = signal(10)
+    with make_client() as client:
+        with client.websocket_connect("/connect/text") as ws:
+            ws.send_json(codec.encode(values[:4], scale=0.01))
+            assert ws.receive_json() == {"ack": "received"}
+            ws.send_bytes(codec.pack(values[4:], True, 0.01))
+            assert ws.receive_json() == {"text": TEXT}
+            (session,) = manager.sessions
+            assert session.samples == 10 and len(session.buffer) == 10
+            assert session.latest.Cx == pytest.approx(values[-1, 0], abs=0.01)
+            # An empty batch still answers its trigger from the last samples
+            ws.send_bytes(codec.pack(np.empty((0, 2)), True))
+            assert ws.receive_json() == {"text": TEXT}
+            assert session.samples == 10
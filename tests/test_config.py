@@ -0,0 +1,19 @@
+from pathlib import Path
+
+from reapi.config import Settings
+
+
+def test_from_env():
+    settings = Settings.from_env(
+        {"REAPI_RECORD_DIR": "/tmp/records", "REAPI_RECORD_CHUNK": "64", "OTHER": "1"}
+    )
+    assert settings.record_dir == Path("/tmp/records")
+    assert settings.record_chunk == 64
+    assert Settings.from_env({}) == Settings()
+
+
+def test_from_env_json():
+    settings = Settings.from_env(
+        {"REAPI_PREPROCESS": '[{"stage": "notch", "freq": 50}]'}
+    )
+    assert settings.preprocess == [{"stage": "notch", "freq": 50}]
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from reapi.continuous import Continuous
+from reapi.models import EEGValues, Message
+
+TEXT = ["Some", "ai", "generated", "data"]
+
+
+def test_continuous_mode(client):
+    url = "/connect/text?mode=continuous&hop=0.01&ack=false"
+    with client.websocket_connect(url) as ws:
+        message = Message(values=EEGValues(Cx=1.0, Drm=2.0)).model_dump()
+        for _ in range(5):
+            ws.send_json(message)
+        assert ws.receive_json() == {"text": TEXT}
+        assert ws.receive_json() == {"text": TEXT}
+
+
+def test_invalid_options(client):
+    with pytest.raises(WebSocketDisconnect) as e:
+        with client.websocket_connect("/connect/text?hop=0"):
+            pass  # pragma: no cover
+    assert e.value.code == 1008
+
+
+def test_backoff():
+    sent = []
+
+    async def decode():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def send(result):
+        sent.append(result)
+
+    async def main():
+        continuous = Continuous(0.01, decode, send, max_hop=0.04)
+        task = asyncio.create_task(continuous.run())
+        await asyncio.sleep(0.3)
+        task.cancel()
+        return continuous
+
+    continuous = asyncio.run(main())
+    assert continuous.skipped > 0
+    assert continuous.hop == 0.04
+    assert sent and continuous.runs == len(sent)
+
+
+def test_recover():
+    continuous = Continuous(0.01, None, None, max_hop=0.1)
+    for _ in range(5):
+        continuous._adapt(True)
+    assert continuous.hop == 0.1
+    for _ in range(50):
+        continuous._adapt(False)
+    assert continuous.hop == 0.01
+
+
+def test_finish():
+    sent = []
+    results = [None, "result"]
+    started = asyncio.Event()
+
+    async def decode():
+        result = results.pop(0)
+        if result is not None:
+            started.set()
+            await asyncio.sleep(0.05)
+        return result
+
+    async def send(result):
+        sent.append(result)
+
+    async def main():
+        continuous = Continuous(0.01, decode, send)
+        runner = asyncio.create_task(continuous.run())
+        await started.wait()
+        # The decode in flight still sends its result
+        await continuous.finish(runner)
+        assert runner.cancelled()
+
+    asyncio.run(main())
+    assert sent == ["result"]
+
+
+def test_errors(caplog):
+    sent = []
+
+    async def decode():
+        raise RuntimeError("boom")
+
+    async def send(result):
+        sent.append(result)
+        if len(sent) == 2:
+            raise ConnectionError("gone")
+
+    async def main():
+        continuous = Continuous(0.01, decode, send)
+        await asyncio.wait_for(continuous.run(), 1)
+        return continuous
+
+    continuous = asyncio.run(main())
+    assert continuous.stopped and sent == [{"error": "boom"}] * 2
+    assert "decode failed" in caplog.text and "could not send" in caplog.text
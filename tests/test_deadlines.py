@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+from reapi.ai import registry
+from reapi.ai.features import RunningMean
+from reapi.ai.model import Model
+from reapi.api import watch
+from reapi.config import Settings
+from reapi.models import Options
+from reapi.session import PROBE, Session
+from reapi.stats import Stats
+from reapi.websockets import manager
+
+SAMPLE = {"Cx": 1, "Drm": 2}
+
+
+class Fast(Model):
+    def extractors(self, fs):
+        self.fs = fs
+        return {"mean": RunningMean()}
+
+    def head(self, values, window, features):
+        assert features["mean"] is not None and "markers" in features
+        return ["fast"]
+
+
+def test_fallback():
+    registry.get()
+    fast = Fast()
+    registry.add("fast", fast)
+    settings = Settings(fallback="fast", sample_rate=256)
+    session = Session(Options(ack=False), settings)
+    try:
+        version = session.version
+        stats = registry.stats[version]
+        registry.stats[version] = Stats()
+        registry.stats[version].observe(10.0)
+        asyncio.run(session.receive({"marker": "cue"}))
+        frame = {"triggered": True, "values": SAMPLE, "deadline": 1}
+        response = asyncio.run(session.receive(frame))
+        assert response == {"text": ["fast"], "fallback": "fast"}
+        assert fast.fs == session.rate == 256
+        # Now and then the routed model runs anyway, to measure it again
+        responses = [asyncio.run(session.receive(frame)) for _ in range(PROBE)]
+        assert sum("fallback" not in r for r in responses) == 1
+        assert session.fallbacks == PROBE + 1
+        registry.stats[version].ewma = 0.0
+        frame["deadline"] = 60
+        assert asyncio.run(session.receive(frame))["text"] != ["fast"]
+    finally:
+        registry.stats[version] = stats
+        session.close()
+        del registry.models["fast"], registry.stats["fast"]
+
+
+def test_expired():
+    session = Session(Options(ack=False), Settings())
+    frame = {"triggered": True, "values": SAMPLE, "deadline": -1}
+    assert asyncio.run(session.receive(frame)) == {"deadline": "expired"}
+    assert session.expired == 1 and session.decodes == 0
+    with pytest.raises(ValueError, match="deadline"):
+        asyncio.run(session.receive(dict(frame, deadline="soon")))
+    session.close()
+
+
+def test_watch():
+    async def frames(items, closed):
+        for item in items:
+            yield item
+        await closed.wait()
+
+    async def main():
+        closed, never = asyncio.Event(), asyncio.Event()
+        work = asyncio.ensure_future(never.wait())
+        stream = frames(["next"], closed)
+        # A frame arriving meanwhile waits for the work
+        pending = asyncio.ensure_future(watch(asyncio.sleep(0.01, "done"), stream))
+        response, ahead = await pending
+        assert response == "done" and await ahead == "next"
+        # The client going away cancels it
+        pending = asyncio.ensure_future(watch(work, stream))
+        await asyncio.sleep(0.01)
+        closed.set()
+        assert await pending == (None, None)
+        assert work.cancelled()
+        # Cancelling the watch cancels the work and the read ahead
+        work = asyncio.ensure_future(never.wait())
+        pending = asyncio.ensure_future(watch(work, frames([], never)))
+        await asyncio.sleep(0.01)
+        pending.cancel()
+        await asyncio.wait([pending])
+        assert work.cancelled()
+
+    asyncio.run(main())
+
+
+class Slow(Model):
+    def head(self, values, window, features):
+        time.sleep(0.2)
+        return ["slow"]
+
+
+def test_disconnect(make_client):
+    registry.get()
+    registry.add("slow", Slow())
+    try:
+        with make_client() as client:
+            with client.websocket_connect("/connect/text?model=slow") as ws:
+                ws.send_json({"triggered": True, "values": SAMPLE})
+                # The trigger is cancelled as soon as the client goes away
+                ws.close()
+            assert not manager.active_connections
+    finally:
+        del registry.models["slow"], registry.stats["slow"]
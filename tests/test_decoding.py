@@ -0,0 +1,128 @@
+import asyncio
+import pickle
+
+import numpy as np
+
+from reapi.ai import registry
+from reapi.ai.decoding import (
+    BeamModel,
+    Beams,
+    BeamSearch,
+    Bigram,
+    LanguageModel,
+    PrefixCache,
+    Trie,
+    _unlink,
+)
+from reapi.config import Settings
+from reapi.models import Options
+from reapi.session import Session
+
+ALPHABET = ["", " ", "a", "b", "c", "t"]
+VOCABULARY = ["cat", "bat", "at", "a"]
+
+
+def emissions(text, sure=0.9):
+    """Log probabilities that spell ``text``, one symbol per step."""
+    scores = np.full((len(text), len(ALPHABET)), (1 - sure) / (len(ALPHABET) - 1))
+    for step, char in enumerate(text):
+        scores[step, ALPHABET.index(char)] = sure
+    return np.log(scores)
+
+
+def search(lm=None, width=8):
+    cache = PrefixCache(lm or LanguageModel(), size=16)
+    return BeamSearch(Trie(VOCABULARY), ALPHABET, cache, width)
+
+
+def test_trie():
+    trie = Trie(VOCABULARY)
+    assert "cat" in trie and "ca" not in trie and "dog" not in trie
+    assert set(trie.find("a")) == {"t", ""}
+
+
+def test_beam_search():
+    beams = search()
+    beams.extend(emissions("cat bat a"))
+    assert beams.best() == ["cat", "bat", "a"]
+    # Out of vocabulary spellings are not hypotheses
+    beams.reset()
+    beams.extend(emissions("cab "))
+    assert beams.best() == ["cat"]
+
+
+def test_language_model():
+    scores = emissions("cat at")
+    # The acoustics cannot tell c from b
+    scores[0, ALPHABET.index("b")] = scores[0, ALPHABET.index("c")]
+    lm = Bigram([["bat", "at"], ["bat", "at"], ["cat"]])
+    beams = search(lm)
+    beams.extend(scores)
+    assert beams.best() == ["bat", "at"]
+    # Hypotheses that start with cat keep bat from being committed
+    beams.extend(emissions(" "))
+    assert beams.commit() == [] and beams.best() == ["bat", "at"]
+
+
+def test_incremental():
+    scores = emissions("cat bat at cat ")
+    whole = search()
+    whole.extend(scores)
+    parts = search()
+    for part in np.array_split(scores, 5):
+        parts.extend(part)
+    assert parts.best() == whole.best() == ["cat", "bat", "at", "cat"]
+    assert parts.cache.hits > 0
+
+
+def test_commit():
+    beams = search()
+    committed = []
+    for word in ["cat", "bat", "at", "cat"] * 8:
+        beams.extend(emissions(word + " "))
+        committed += beams.commit()
+        # The hypotheses only hold the words still in doubt
+        assert all(len(_unlink(words)) <= 1 for _, _, _, words, *_ in beams.beams)
+    assert committed + beams.best() == ["cat", "bat", "at", "cat"] * 8
+    assert beams.commit() == []
+
+
+def test_cache():
+    cache = PrefixCache(LanguageModel(), size=2)
+    for word in ["cat", "bat", "at", "cat"]:
+        cache.score(None, word)
+    # The least recently used entry made room for the others
+    assert cache.misses == 4 and list(cache.entries) == [(None, "at"), (None, "cat")]
+
+
+def test_window():
+    beams = Beams(search(), window=5)
+    for i in range(4):
+        beams.update(np.full((2, 1), i))
+    (rows,) = beams.take()
+    assert rows[:, 0].tolist() == [1, 2, 2, 3, 3] and beams.take() == []
+
+
+def test_session():
+    text = "cat bat at "
+    model = BeamModel(
+        lambda rows: emissions(text)[rows[:, 0].astype(int)], VOCABULARY, ALPHABET
+    )
+    registry.add("beams", model)
+    registry.pins["beams-session"] = "beams"
+    session = Session(Options(ack=False), Settings(), id="beams-session")
+    try:
+        responses = []
+        for step in range(len(text)):
+            frame = {"triggered": step % 4 == 3, "values": {"Cx": step, "Drm": 0}}
+            responses.append(asyncio.run(session.receive(frame)))
+        assert [r["text"] for r in responses if r] == [[], ["cat"]]
+        assert asyncio.run(session.decode())["text"] == ["bat"]
+        # Decoding again without new samples keeps the hypotheses
+        assert asyncio.run(session.decode())["text"] == []
+        state = pickle.loads(pickle.dumps(session.snapshot()))
+        search = state["features"].extractors["beams"].search
+        assert search.best() == ["at"]
+    finally:
+        session.close()
+        del registry.models["beams"], registry.stats["beams"]
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import signal
+
+import pytest
+from fastapi import WebSocketDisconnect
+from starlette.websockets import WebSocketState
+
+from reapi import drain
+from reapi.websockets import manager
+
+SAMPLE = {"triggered": False, "values": {"Cx": 1, "Drm": 2}}
+TEXT = ["Some", "ai", "generated", "data"]
+
+
+def start(client):
+    client.portal.start_task_soon(drain.start, client.app)
+
+
+def test_drain(make_client, tmp_path):
+    with make_client(snapshot_dir=tmp_path) as client:
+        with client.websocket_connect("/connect/text?ack=false") as ws:
+            for _ in range(3):
+                ws.send_json(SAMPLE)
+            start(client)
+            token = ws.receive_json()["reconnect"]
+            ws.send_json(SAMPLE)
+            ws.send_json({"reconnect": token})
+            with pytest.raises(WebSocketDisconnect) as e:
+                ws.receive_json()
+            assert e.value.code == 1012
+        with pytest.raises(WebSocketDisconnect) as e:
+            with client.websocket_connect("/connect/text"):
+                pass  # pragma: no cover
+        assert e.value.code == 1013 and e.value.reason == "draining"
+        assert client.get("/health/ready").status_code == 503
+    assert [p.name for p in tmp_path.iterdir()] == [f"{token}.snapshot"]
+
+    with make_client(snapshot_dir=tmp_path) as client:
+        with client.websocket_connect(f"/connect/text?resume={token}") as ws:
+            (session,) = manager.sessions
+            assert session.samples == 4 and len(session.buffer) == 4
+            ws.send_json(dict(SAMPLE, triggered=True))
+            assert ws.receive_json() == {"text": TEXT}
+        assert not list(tmp_path.iterdir())
+        with client.websocket_connect(f"/connect/text?resume={token}") as ws:
+            (session,) = manager.sessions
+            assert session.samples == 0
+
+
+def test_drain_timeout(make_client, tmp_path):
+    with make_client(snapshot_dir=tmp_path, drain_timeout=0.1) as client:
+        with client.websocket_connect("/connect/text?mode=continuous") as ws:
+            ws.send_json(SAMPLE)
+            start(client)
+            while "reconnect" not in (frame := ws.receive_json()):
+                pass
+            token = frame["reconnect"]
+            with pytest.raises(WebSocketDisconnect) as e:
+                while True:
+                    ws.receive_json()
+            assert e.value.code == 1012
+        assert (tmp_path / f"{token}.snapshot").exists()
+        assert not manager.active_connections
+
+
+def test_drain_continuous(make_client):
+    url = "/connect/text?mode=continuous&hop=0.01&ack=false"
+    with make_client() as client:
+        with client.websocket_connect(url) as ws:
+            start(client)
+            frame = ws.receive_json()
+            ws.send_json(frame)
+            with pytest.raises(WebSocketDisconnect) as e:
+                while True:
+                    ws.receive_json()
+            assert e.value.code == 1012
+    # Without a snapshot directory, resumed sessions start afresh
+    with make_client() as client:
+        with client.websocket_connect(f"/connect/text?resume={frame['reconnect']}"):
+            (session,) = manager.sessions
+            assert session.samples == 0
+
+
+def test_close_closed():
+    class Closed:
+        client_state = application_state = WebSocketState.DISCONNECTED
+
+    # Sockets closed by the client in the meantime are left alone
+    asyncio.run(drain.close(Closed()))
+
+
+def test_sigterm(make_client):
+    app = make_client().app
+    received = []
+
+    async def main():
+        drain.install(app)
+        os.kill(os.getpid(), signal.SIGTERM)
+        while not received:
+            await asyncio.sleep(0.01)
+        assert app.state.drain.done()
+
+    previous = signal.signal(signal.SIGTERM, lambda sig, frame: received.append(sig))
+    try:
+        asyncio.run(main())
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+    assert received == [signal.SIGTERM]
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from reapi.ai import get_model
+from reapi.ai.features import RunningMean, RunningVariance, Welch
+from reapi.ai.model import Features, Model
+from reapi.ai.text import eeg_to_text
+from reapi.models import EEGValues
+
+rng = np.random.default_rng(0)
+X = rng.normal(5.0, 2.0, size=(1000, 3))
+PARTS = [1, 2, 100, 101, 500, 999]
+
+
+@pytest.mark.parametrize("decay", [1.0, 0.99])
+def test_moments(decay):
+    mean, variance = RunningMean(decay), RunningVariance(decay)
+    features = Features({"mean": mean, "variance": variance})
+    assert features.values() == {"mean": None, "variance": None}
+    for part in np.array_split(X, PARTS):
+        features.update(part)
+    features.update(X[:0])
+    w = decay ** np.arange(len(X) - 1, -1, -1.0)[:, None]
+    expected = (w * X).sum(axis=0) / w.sum()
+    assert np.allclose(mean.value(), expected)
+    expected = (w * (X - expected) ** 2).sum(axis=0) / w.sum()
+    assert np.allclose(variance.value(), expected)
+
+
+def test_welch():
+    whole, welch = Welch(128.0, 64), Welch(128.0, 64)
+    assert welch.value() is None
+    whole.update(X)
+    for part in np.array_split(X, PARTS):
+        welch.update(part)
+    assert welch.segments == whole.segments == (len(X) - 64) // 32 + 1
+    assert np.allclose(welch.value(), whole.value())
+    assert welch.value().shape == (33, 3)
+    t = np.arange(1024) / 128.0
+    sine = Welch(128.0, 128)
+    sine.update(np.sin(2 * np.pi * 10 * t)[:, None])
+    assert sine.freqs[sine.value()[:, 0].argmax()] == 10
+    # the integral of the density is the signal power, for odd segments too
+    odd = Welch(128.0, 127)
+    odd.update(np.sin(2 * np.pi * 10 * t)[:, None])
+    for welch in (sine, odd):
+        power = welch.value().sum() * (welch.freqs[1] - welch.freqs[0])
+        assert np.isclose(power, 0.5)
+
+
+def test_model():
+    values = EEGValues(Cx=1, Drm=2)
+    model = get_model()
+    assert model(values) == model(values, X[:, :2]) == model.head(values, X, {})
+    assert eeg_to_text(values, None, {}) == model(values)
+    with pytest.raises(TypeError):
+        Model()
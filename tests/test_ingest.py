@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+from reapi import codec
+from reapi.ingest import Events
+from reapi.store import Store
+from reapi.websockets import manager
+
+TEXT = ["Some", "ai", "generated", "data"]
+
+
+def ndjson(count, trigger_every=100):
+    for i in range(count):
+        sample = {"triggered": i % trigger_every == 99, "values": {"Cx": i, "Drm": -i}}
+        yield (json.dumps(sample) + "\n").encode()
+
+
+def test_ndjson(make_client):
+    with make_client(window=64) as client:
+        id = client.post("/ingest").json()["id"]
+        session = manager.streams[id]
+        response = client.post(f"/ingest/{id}", content=ndjson(1000))
+        assert response.json() == {"samples": 1000, "triggers": 10}
+        assert session.decodes == 10 and len(session.buffer) == 64
+        assert session.buffer.view()[-1].tolist() == [999, -999]
+        batch = json.dumps(codec.encode(np.ones((5, 2)), True, 0.5))
+        response = client.post(f"/ingest/{id}", content=batch)
+        assert response.json() == {"samples": 5, "triggers": 1}
+        lines = [
+            {"values": {"Cx": 1, "Drm": 2}},
+            {"declare": "pow", "channels": ["alpha"], "rate": 8},
+            {"stream": "pow", "values": [0.5]},
+            {"values": {"Cx": 1, "Drm": 2}},
+        ]
+        content = "\n".join(json.dumps(line) for line in lines)
+        response = client.post(f"/ingest/{id}", content=content)
+        assert response.json() == {"samples": 2, "triggers": 0}
+        assert session.streams["pow"].window().tolist() == [[0.5]]
+        response = client.post(f"/ingest/{id}", content=b'{"values": {"Cx": 1}}\n')
+        assert response.status_code == 400
+        assert client.delete(f"/ingest/{id}").status_code == 204
+        assert client.post(f"/ingest/{id}", content=b"").status_code == 404
+
+
+def test_upload_times(make_client):
+    with make_client(sample_rate=10, store_chunk=64) as client:
+        id = client.post("/ingest").json()["id"]
+        for count in (200, 50):
+            client.post(f"/ingest/{id}", content=ndjson(count))
+        (store,) = (e for e in manager.streams[id].extensions if isinstance(e, Store))
+        series = store.series["eeg"]
+        times, values = (np.concatenate(p) for p in zip(*series.query()))
+        # Uploaded faster than real time, the samples still follow on
+        assert np.allclose(np.diff(times), 0.1)
+        assert values[:, 0].tolist() == list(range(200)) + list(range(50))
+        assert series.starts == sorted(series.starts)
+        _, values = zip(*series.query(times[100], times[149]))
+        assert np.concatenate(values)[:, 0].tolist() == list(range(100, 150))
+        client.delete(f"/ingest/{id}")
+
+
+def test_binary(make_client):
+    values = np.random.default_rng(0).normal(size=(600, 2))
+    frames = [codec.pack(part, True, 0.001) for part in np.split(values, 6)]
+    body = b"".join(frames)
+    with make_client() as client:
+        assert client.post("/ingest?model=none").status_code == 422
+        assert client.post("/ingest?hop=0").status_code == 422
+        id = client.post("/ingest").json()["id"]
+        chunks = (body[i : i + 1000] for i in range(0, len(body), 1000))
+        headers = {"Content-Type": "application/octet-stream"}
+        response = client.post(f"/ingest/{id}", content=chunks, headers=headers)
+        assert response.json() == {"samples": 600, "triggers": 6}
+        response = client.post(f"/ingest/{id}", content=body[:-1], headers=headers)
+        assert response.status_code == 400
+        client.delete(f"/ingest/{id}")
+
+
+def test_limits(make_client):
+    with make_client(max_message=1024, max_client_connections=1) as client:
+        id = client.post("/ingest").json()["id"]
+        assert client.post("/ingest").status_code == 503
+        # Lines may span chunks, but not grow past max_message
+        body = b"".join(ndjson(300))
+        chunks = (body[i : i + 7] for i in range(0, len(body), 7))
+        response = client.post(f"/ingest/{id}", content=chunks)
+        assert response.json() == {"samples": 300, "triggers": 3}
+        response = client.post(f"/ingest/{id}", content=(b"x" * 100 for _ in range(20)))
+        assert response.status_code == 413
+        header = codec.HEADER.pack(codec.MAGIC, False, b"f", 60000, 0)
+        headers = {"Content-Type": "application/octet-stream"}
+        content = (header + b"\0" * 2000, b"\0" * 2000)
+        response = client.post(f"/ingest/{id}", content=content, headers=headers)
+        assert response.status_code == 413
+        client.delete(f"/ingest/{id}")
+        response = client.post("/ingest")
+        assert response.status_code == 201
+        client.delete(f"/ingest/{response.json()['id']}")
+
+
+def test_events(make_client):
+    with make_client() as client:
+        id = client.post("/ingest").json()["id"]
+        (events,) = (e for e in manager.streams[id].extensions if isinstance(e, Events))
+        result = {}
+        reader = threading.Thread(
+            target=lambda: result.update(body=client.get(f"/ingest/{id}/events").text)
+        )
+        reader.start()
+        while not events.listeners:
+            time.sleep(0.01)
+        client.post(f"/ingest/{id}", content=ndjson(200))
+        client.delete(f"/ingest/{id}")
+        reader.join(5)
+    assert result["body"] == f"data: {json.dumps({'text': TEXT})}\n\n" * 2
+
+
+def test_keepalive(make_client):
+    with make_client(heartbeat=0.02, idle_timeout=0) as client:
+        id = client.post("/ingest").json()["id"]
+        result = {}
+        reader = threading.Thread(
+            target=lambda: result.update(body=client.get(f"/ingest/{id}/events").text)
+        )
+        reader.start()
+        time.sleep(0.1)
+        client.delete(f"/ingest/{id}")
+        reader.join(5)
+    assert result["body"].startswith(": keepalive\n\n")
+
+
+def test_slow_listener():
+    events = Events(size=1)
+    queue = events.listen()
+    events.publish(1)
+    events.publish(2)
+    assert queue.get_nowait() == 2
+
+
+def test_without_lifespan(make_client):
+    # Without the lifespan there is no warm-up to wait for
+    client = make_client()
+    id = client.post("/ingest").json()["id"]
+    assert client.delete(f"/ingest/{id}").status_code == 204
+
+
+def test_idle(make_client):
+    with make_client(heartbeat=0, idle_timeout=0.05) as client:
+        id = client.post("/ingest").json()["id"]
+        while id in manager.streams:
+            time.sleep(0.01)
+        assert client.post(f"/ingest/{id}", content=b"").status_code == 404
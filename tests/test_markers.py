@@ -0,0 +1,94 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from reapi.config import Settings
+from reapi.markers import Markers, epochs
+from reapi.models import Options
+from reapi.session import Session
+from reapi.websockets import manager
+
+
+def test_markers():
+    markers = Markers(size=3)
+    for time, label in [(3, "b"), (1, "a"), (2, "a"), (4, "a")]:
+        markers.add(time, label)
+    assert markers.times == [2, 3, 4] and len(markers) == 3
+    assert markers.between(2.5) == [(3, "b", None), (4, "a", None)]
+    assert markers.between(end=3, label="a") == [(2, "a", None)]
+
+
+def test_epochs():
+    times = np.arange(100) / 10
+    values = np.column_stack([times, -times])
+    onsets = [0.1, 2.0, 5.05, 9.8]
+    cut, kept = epochs(times, values, onsets, 2, 3, 10)
+    assert kept.tolist() == [False, True, True, False]
+    assert cut.shape == (2, 5, 2)
+    assert np.allclose(cut[0, :, 0], [1.8, 1.9, 2.0, 2.1, 2.2])
+    assert np.allclose(cut[1, :, 1], -np.arange(49, 54) / 10)
+    # Onsets next to a gap in the samples are left out
+    gap = np.delete(np.arange(100), 50)
+    cut, kept = epochs(times[gap], values[gap], onsets, 2, 3, 10)
+    assert kept.tolist() == [False, True, False, False] and len(cut) == 1
+    assert epochs(times, values, onsets, 0, 0, 10)[0].shape == (4, 0, 2)
+
+
+def test_session():
+    session = Session(Options(ack=False), Settings(sample_rate=10, window=10))
+    values = {"Cx": 0, "Drm": 0}
+    asyncio.run(session.receive({"triggered": False, "values": values}))
+    now = session.sampled
+    for frame in [
+        {"marker": "cue", "time": now - 0.5, "value": 1},
+        {"marker": "old", "time": now - 10},
+        {"marker": "now"},
+    ]:
+        assert asyncio.run(session.receive(frame)) is None
+    *_, features = session.prepare()
+    assert features["markers"] == []
+    session.buffer.extend(np.zeros((9, 2)))
+    *_, features = session.prepare()
+    # Markers after the last sample are not in the window yet
+    assert features["markers"] == [(4, "cue", 1)]
+    with pytest.raises(ValueError, match="number"):
+        asyncio.run(session.receive({"marker": "cue", "time": "now"}))
+    with pytest.raises(ValueError, match="finite"):
+        asyncio.run(session.receive({"marker": "cue", "time": float("nan")}))
+    with pytest.raises(ValueError):
+        asyncio.run(session.receive({"marker": 1}))
+    session.close()
+
+
+def test_endpoints(make_client):
+    with make_client(admin_token="secret") as client:
+        client.headers["Authorization"] = "Bearer secret"
+        with client.websocket_connect("/connect/text?ack=false") as ws:
+            ws.send_json({"declare": "mot", "channels": ["x"], "rate": 10})
+            ws.receive_json()
+            times = (np.arange(100) / 10).tolist()
+            samples = [[t] for t in times]
+            ws.send_json({"stream": "mot", "times": times, "samples": samples})
+            for time, label in [(2.0, "cue"), (5.0, "cue"), (6.0, "rest")]:
+                ws.send_json({"marker": label, "time": time})
+            ws.send_json({"marker": "cue", "time": 9.95})
+            ws.send_json({"marker": "late", "time": 50.0})
+            ws.send_json({"ping": 1})
+            ws.receive_json()
+            (session,) = manager.sessions
+            url = f"/sessions/{session.id}"
+            marks = client.get(f"{url}/markers", params={"label": "rest"}).json()
+            assert marks == [{"time": 6.0, "label": "rest", "value": None}]
+            query = {"label": "cue", "before": 0.2, "after": 0.3, "streams": "mot"}
+            result = client.get(f"{url}/epochs", params=query).json()
+            assert list(result) == ["mot"]
+            assert result["mot"]["onsets"] == [2.0, 5.0]
+            assert np.allclose(result["mot"]["times"], [-0.2, -0.1, 0, 0.1, 0.2])
+            assert np.allclose(np.array(result["mot"]["epochs"])[1, :, 0], times[48:53])
+            # Unknown streams, labels without markers and markers past the
+            # stored samples give no epochs
+            query = {"label": "late", "streams": "mot,met"}
+            assert client.get(f"{url}/epochs", params=query).json() == {}
+            query = {"label": "none"}
+            assert client.get(f"{url}/epochs", params=query).json() == {}
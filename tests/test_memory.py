@@ -0,0 +1,63 @@
+import gc
+import importlib
+import sys
+
+import pytest
+
+from reapi import app, main
+from reapi.ai import registry as default_registry
+from reapi.ai.registry import Registry
+from reapi.app import preload
+from reapi.config import Settings
+from reapi.memory import usage, weights
+
+HEADERS = {"Authorization": "Bearer secret"}
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="needs /proc")
+def test_usage():
+    report = usage()
+    assert 0 < report["uss"] <= report["pss"] <= report["rss"]
+
+
+def test_usage_fallback(tmp_path):
+    report = usage(tmp_path / "missing")
+    assert report["max_rss"] > 0 and "pss" not in report
+
+
+def test_weights(tmp_path):
+    from test_backends import write
+
+    registry = Registry()
+    registry.load("text", registry.default)
+    registry.load("net", str(write(tmp_path / "model.weights", "int8")))
+    assert weights(registry) == {"net": (tmp_path / "model.weights").stat().st_size}
+
+
+def test_memory_endpoint(make_client):
+    with make_client(admin_token="secret") as client:
+        report = client.get("/admin/memory", headers=HEADERS).json()
+    assert report["pid"] and report["weights"] == {}
+
+
+def test_preload():
+    default_registry.get()
+    settings = Settings(models={"preloaded": "reapi.ai.text"})
+    try:
+        preload(settings)
+        assert gc.get_freeze_count() > 0
+        model = default_registry.models["preloaded"]
+        # Versions already loaded are kept
+        preload(settings)
+        assert default_registry.models["preloaded"] is model
+    finally:
+        gc.unfreeze()
+        del default_registry.models["preloaded"], default_registry.stats["preloaded"]
+
+
+def test_main(monkeypatch):
+    preloaded = []
+    monkeypatch.setenv("REAPI_PRELOAD", "1")
+    monkeypatch.setattr(app, "preload", preloaded.append)
+    importlib.reload(main)
+    assert preloaded == [main.app.state.settings]
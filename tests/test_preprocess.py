@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from reapi.buffer import RingBuffer
+from reapi.models import EEGValues, Message
+from reapi.preprocess import BANDS, biquad, build
+
+FS = 256.0
+SPECS = [
+    {"stage": "bandpass", "low": 1, "high": 40},
+    {"stage": "notch", "freq": 50},
+    {"stage": "fir", "cutoff": 30},
+    {"stage": "decimate", "factor": 2},
+    {"stage": "bandpower", "tau": 0.5},
+]
+
+
+def sine(freq, seconds=4.0, channels=2):
+    t = np.arange(int(seconds * FS)) / FS
+    return np.repeat(np.sin(2 * np.pi * freq * t)[:, None], channels, axis=1)
+
+
+def test_incremental_matches_whole():
+    x = sine(10) + sine(50)
+    whole = build(SPECS, FS).process(x)
+    pipeline = build(SPECS, FS)
+    parts = [pipeline.process(part) for part in np.array_split(x, [1, 2, 50, 51, 700])]
+    assert np.allclose(np.concatenate(parts), whole)
+    assert whole.shape == (len(x) // 2, 2 * len(BANDS))
+    assert pipeline.rate(FS) == FS / 2
+
+
+def test_notch():
+    pipeline = build([{"stage": "notch", "freq": 50}], FS)
+    assert np.abs(pipeline.process(sine(50))[-256:]).max() < 0.05
+    assert np.abs(pipeline.process(sine(10))[-256:]).max() > 0.95
+
+
+def test_highpass_lowpass():
+    high = build([{"stage": "highpass", "freq": 30}], FS)
+    low = build([{"stage": "lowpass", "freq": 30}], FS)
+    assert np.abs(high.process(sine(2))[-256:]).max() < 0.05
+    assert np.abs(low.process(sine(100))[-256:]).max() < 0.05
+
+
+def test_bandpower():
+    pipeline = build([{"stage": "bandpower"}], FS)
+    power = pipeline.process(sine(10, channels=1))[-1]
+    assert dict(zip(BANDS, power))["alpha"] == power.max()
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        build([{"stage": "wavelet"}], FS)
+    with pytest.raises(ValueError, match="notch"):
+        build([{"stage": "notch", "frequency": 50}], FS)
+    with pytest.raises(ValueError):
+        biquad("allpass", 10, FS)
+
+
+def test_ring_buffer():
+    buffer = RingBuffer(4, 1)
+    expected = []
+    for chunk in ([1], [2, 3], [4, 5, 6], list(range(7, 13)), [13]):
+        buffer.extend(np.array(chunk, dtype=float)[:, None])
+        expected = (expected + chunk)[-4:]
+        assert buffer.view()[:, 0].tolist() == expected
+    assert len(buffer) == 4 and buffer.count == 13
+
+
+def test_server_pipeline(make_client):
+    with make_client(preprocess=SPECS, window=8) as client:
+        with client.websocket_connect("/connect/text") as ws:
+            for i in range(20):
+                values = EEGValues(Cx=i, Drm=-i)
+                ws.send_json(Message(triggered=i == 19, values=values).model_dump())
+                data = ws.receive_json()
+    assert data == {"text": ["Some", "ai", "generated", "data"]}
+
+
+def test_startup(make_client):
+    client = make_client(preprocess=[{"stage": "notch", "frequency": 50}])
+    with pytest.raises(ValueError, match="notch"):
+        with client:
+            pass  # pragma: no cover
@@ -0,0 +1,70 @@
+import asyncio
+
+import numpy as np
+
+from reapi.config import Settings
+from reapi.models import Options
+from reapi.quality import Quality
+from reapi.session import Session
+
+
+def test_checks():
+    quality = Quality(Settings(quality_window=100, max_deviation=50))
+    rng = np.random.default_rng(0)
+    good = 4200 + rng.normal(0, 10, size=(100, 2))
+    quality.update(good)
+    assert quality.check({}) == []
+    flat = good.copy()
+    flat[:, 0] = 4200
+    quality.update(flat)
+    assert quality.check({}) == ["flat: Cx"]
+    clipped = good.copy()
+    clipped[:, 1] = np.minimum(clipped[:, 1], 4205)
+    quality.update(clipped)
+    assert quality.check({}) == ["clipped: Drm"]
+    quality.update(good * [1, 20])
+    assert quality.check({}) == ["noisy: Drm"]
+
+
+def test_short_window():
+    quality = Quality(Settings(quality_window=100))
+    rng = np.random.default_rng(0)
+    # In a few samples, each is a large share of the window
+    quality.update(4200 + rng.normal(0, 10, size=(5, 2)))
+    assert quality.check({}) == []
+    quality = Quality(Settings(quality_window=100))
+    quality.update(np.array([[4200, 4200], [4300, 4201], [4300, 4202], [4300, 4203]]))
+    assert quality.check({}) == ["clipped: Cx"]
+
+
+def test_gate():
+    settings = Settings(quality_gate=True, quality_window=16)
+    session = Session(Options(ack=False), settings)
+    rng = np.random.default_rng(0)
+
+    def trigger(values):
+        frame = {"samples": values.tolist(), "triggered": True}
+        return asyncio.run(session.receive(frame))
+
+    response = trigger(np.zeros((16, 2)))
+    assert response == {"quality": "low", "reasons": ["flat: Cx", "flat: Drm"]}
+    assert session.gated == 1 and session.decodes == 0
+    assert "text" in trigger(rng.normal(size=(16, 2)))
+    dev = {"declare": "dev", "channels": ["AF3", "T7", "OVERALL"], "rate": 2}
+    session.declare(dev)
+    asyncio.run(session.receive({"stream": "dev", "values": [4, 4, 30]}))
+    assert trigger(rng.normal(size=(16, 2)))["reasons"] == ["contact: 30"]
+    session.close()
+
+
+def test_contact():
+    quality = Quality(Settings(quality_window=16))
+    session = Session(Options(ack=False), Settings())
+    session.declare({"declare": "dev", "channels": ["AF3", "T7"], "rate": 2})
+    # Too few samples to judge, but the electrodes report poor contact
+    quality.update(np.ones((1, 2)))
+    asyncio.run(session.receive({"stream": "dev", "values": [1, 2]}))
+    assert quality.check(session.streams) == ["contact: 37.5"]
+    asyncio.run(session.receive({"stream": "dev", "values": [4, 3]}))
+    assert quality.check(session.streams) == []
+    session.close()
@@ -0,0 +1,135 @@
+import json
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from reapi.cli import main
+from reapi.models import EEGValues, Message
+from reapi.recording import Recorder, Recording
+from reapi.replay import replay
+
+TEXT = ["Some", "ai", "generated", "data"]
+
+
+def record(path, count=10, chunk=4):
+    with Recorder(path, ("Cx", "Drm"), chunk=chunk) as recorder:
+        for i in range(count):
+            recorder.append(float(i), i % 3 == 0, (i, -i))
+        recorder.respond(9.5, ["done"])
+
+
+def test_roundtrip(tmp_path):
+    path = tmp_path / "session.reapi"
+    record(path)
+    recording = Recording(path)
+    assert recording.channels == ("Cx", "Drm")
+    assert len(recording) == 10
+    assert len(recording.index) == 4
+    times, triggered, values = recording.samples()
+    assert times.tolist() == list(range(10))
+    assert triggered.tolist() == [i % 3 == 0 for i in range(10)]
+    assert values[:, 1].tolist() == [-i for i in range(10)]
+    assert list(recording.responses()) == [(9.5, ["done"])]
+
+
+def test_time_range(tmp_path):
+    path = tmp_path / "session.reapi"
+    record(path)
+    recording = Recording(path)
+    assert len(list(recording.blocks(4.5, 6))) == 1
+    times, _, values = recording.samples(2, 5)
+    assert times.tolist() == [2, 3, 4, 5]
+    assert values.shape == (4, 2)
+    times, _, values = recording.samples(20, 30)
+    assert len(times) == 0 and values.shape == (0, 2)
+
+
+def test_rebuild_index(tmp_path):
+    path = tmp_path / "session.reapi"
+    record(path)
+    index = path.with_name(path.name + ".idx")
+    index.write_bytes(index.read_bytes()[:50])
+    rebuilt = Recording(path).index
+    index.unlink()
+    assert np.array_equal(Recording(path).index, rebuilt)
+    assert len(rebuilt) == 4
+    # A block cut short by a crash is left out
+    path.write_bytes(path.read_bytes()[:-3])
+    assert len(Recording(path).index) == 3
+    (tmp_path / "other").write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        Recording(tmp_path / "other")
+
+
+def test_append_channels(tmp_path):
+    path = tmp_path / "session.reapi"
+    record(path)
+    record(path, count=2)
+    assert len(Recording(path)) == 12
+    with pytest.raises(ValueError):
+        Recorder(path, ("Cx",))
+
+
+def test_record_and_replay(make_client, tmp_path):
+    with make_client(record_dir=tmp_path) as client:
+        with client.websocket_connect("/connect/text") as ws:
+            for i in range(5):
+                values = EEGValues(Cx=i, Drm=2 * i)
+                ws.send_json(Message(triggered=i == 4, values=values).model_dump())
+                ws.receive_json()
+        (path,) = tmp_path.glob("*.reapi")
+        recording = Recording(path)
+        assert len(recording) == 5
+        assert [r for _, r in recording.responses()] == [
+            ["Some", "ai", "generated", "data"]
+        ]
+        with client.websocket_connect("/connect/text") as ws:
+            responses = list(replay(path, ws.send_text, ws.receive_text, speed=0))
+        assert responses[:4] == [{"ack": "received"}] * 4
+        assert responses[4] == {"text": ["Some", "ai", "generated", "data"]}
+
+
+def test_cli_replay(make_client, tmp_path, monkeypatch, capsys):
+    path = tmp_path / "session.reapi"
+    record(path, count=4)
+    urls = []
+    with make_client() as client:
+
+        @contextmanager
+        def connect(url):
+            urls.append(url)
+            with client.websocket_connect(url.removeprefix("ws://testserver")) as ws:
+                yield SimpleNamespace(send=ws.send_text, recv=ws.receive_text)
+
+        monkeypatch.setattr("websockets.sync.client.connect", connect)
+        url = "ws://testserver/connect/text"
+        main(["replay", str(path), "--url", url, "--speed", "0"])
+        lines = capsys.readouterr().out.splitlines()
+        url += "?priority=interactive"
+        main(["replay", str(path), "--url", url, "--speed", "0", "--all"])
+        assert len(capsys.readouterr().out.splitlines()) == 4
+    assert [json.loads(line) for line in lines] == [{"text": TEXT}] * 2
+    assert urls == ["ws://testserver/connect/text?priority=replay", url]
+
+
+def test_replay_timing(tmp_path):
+    path = tmp_path / "session.reapi"
+    record(path)
+    sent = []
+    ack = '{"ack": "received"}'
+    responses = replay(Recording(path), sent.append, lambda: ack, 1000, 3, 6)
+    assert len(list(responses)) == 4
+    assert [m.count('"triggered": true') for m in sent] == [1, 0, 0, 1]
+
+
+def test_extend(tmp_path):
+    path = tmp_path / "session.reapi"
+    with Recorder(path, ("Cx", "Drm"), chunk=4) as recorder:
+        recorder.extend(10.0, True, np.arange(20.0).reshape(10, 2), rate=2.0)
+    recorder.close()
+    times, triggered, values = Recording(path).samples()
+    assert times.tolist() == [5.5 + i / 2 for i in range(10)]
+    assert triggered.tolist() == [False] * 9 + [True]
+    assert values[:, 1].tolist() == list(range(1, 20, 2))
@@ -0,0 +1,134 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from reapi.ai import call_eeg_to_text
+from reapi.ai import registry as default_registry
+from reapi.ai.model import Model
+from reapi.ai.registry import Registry
+from reapi.ai.text import eeg_to_text
+from reapi.models import EEGValues, Message
+
+TEXT = ["Some", "ai", "generated", "data"]
+VALUES = EEGValues(Cx=1.0, Drm=2.0)
+HEADERS = {"Authorization": "Bearer secret"}
+
+
+class Reverse(Model):
+    def head(self, values, window, features):
+        return TEXT[::-1]
+
+
+class Broken(Model):
+    def head(self, values, window, features):
+        raise RuntimeError
+
+
+@pytest.fixture
+def registry():
+    saved = dict(default_registry.__dict__)
+    yield default_registry
+    default_registry.__dict__.update(saved)
+    default_registry.models = dict(saved["models"])
+
+
+def test_split():
+    registry = Registry()
+    assert registry.primary == "default"
+    registry.add("b", Reverse())
+    registry.split({"default": 1, "b": 3})
+    assert registry.primary == "b"
+    routes = [registry.route(key) for key in range(1000)]
+    assert 150 < routes.count("default") < 350
+    assert routes == [registry.route(key) for key in range(1000)]
+    registry.pins[1] = "default"
+    assert registry.route(1) == "default"
+    with pytest.raises(KeyError):
+        registry.split({"c": 1})
+    with pytest.raises(ValueError):
+        registry.split({"b": 0})
+    with pytest.raises(ValueError):
+        registry.remove("b")
+    registry.split({"b": 1})
+    registry.remove("default")
+    assert registry.route(1) == "b" and 1 not in registry.pins
+
+
+def test_stats():
+    registry = Registry()
+    registry.load("text", registry.default)
+    registry.add("broken", Broken())
+    assert registry.decode("text", VALUES) == eeg_to_text(VALUES) == TEXT
+    assert call_eeg_to_text(VALUES, version=default_registry.primary) == TEXT
+    assert call_eeg_to_text(VALUES) == TEXT
+    with pytest.raises(RuntimeError):
+        registry.decode("broken", VALUES)
+    summary = registry.summary()
+    assert summary["weights"] == {"text": 1.0}
+    assert summary["versions"]["text"]["calls"] == 1
+    assert summary["versions"]["broken"]["errors"] == 1
+    assert summary["versions"]["broken"]["p99"] is not None
+
+
+def test_admin_auth(make_client):
+    with make_client() as client:
+        assert client.get("/admin/models").status_code == 404
+    with make_client(admin_token="secret") as client:
+        assert client.get("/admin/models").status_code == 401
+        assert client.get("/admin/models", headers=HEADERS).status_code == 200
+
+
+def test_hot_swap(make_client, registry):
+    message = Message(triggered=True, values=VALUES).model_dump()
+    with make_client(admin_token="secret") as client:
+        with client.websocket_connect("/connect/text") as ws:
+            ws.send_json(message)
+            assert ws.receive_json() == {"text": TEXT}
+            source = {"version": "v2", "source": "test_registry:Reverse"}
+            response = client.post("/admin/models", json=source, headers=HEADERS)
+            assert response.json()["weights"] == {"default": 1.0}
+            ws.send_json(message)
+            assert ws.receive_json() == {"text": TEXT}
+            response = client.put(
+                "/admin/models/split", json={"v2": 1}, headers=HEADERS
+            )
+            assert response.json()["weights"] == {"v2": 1.0}
+            ws.send_json(message)
+            assert ws.receive_json() == {"text": TEXT[::-1]}
+        with client.websocket_connect("/connect/text?model=default") as ws:
+            ws.send_json(message)
+            assert ws.receive_json() == {"text": TEXT}
+        response = client.get("/admin/models", headers=HEADERS).json()
+        assert response["versions"]["v2"]["calls"] == 1
+        assert client.delete("/admin/models/v2", headers=HEADERS).status_code == 409
+        assert client.delete("/admin/models/v3", headers=HEADERS).status_code == 404
+        assert (
+            client.put(
+                "/admin/models/split", json={"v3": 1}, headers=HEADERS
+            ).status_code
+            == 404
+        )
+        assert (
+            client.put(
+                "/admin/models/split", json={"v2": 0}, headers=HEADERS
+            ).status_code
+            == 422
+        )
+        source = {"version": "v3", "source": "test_registry:Missing"}
+        assert (
+            client.post("/admin/models", json=source, headers=HEADERS).status_code
+            == 400
+        )
+        client.put("/admin/models/split", json={"default": 1}, headers=HEADERS)
+        assert client.delete("/admin/models/v2", headers=HEADERS).status_code == 200
+
+
+def test_configured_models(make_client, registry):
+    models = {"v1": "test_registry:Reverse"}
+    with make_client(models=models, model_split={"v1": 1}) as client:
+        with client.websocket_connect("/connect/text") as ws:
+            ws.send_json(Message(triggered=True, values=VALUES).model_dump())
+            assert ws.receive_json() == {"text": TEXT[::-1]}
+    with make_client() as client:
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect("/connect/text?model=v9"):
+                pass  # pragma: no cover
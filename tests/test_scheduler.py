@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from reapi.scheduler import Expired, Scheduler
+
+
+def test_fair_order():
+    scheduler = Scheduler(workers=1)
+    order = []
+    gate = threading.Event()
+
+    async def main():
+        blocker = asyncio.create_task(scheduler.run("interactive", "x", gate.wait))
+        await asyncio.sleep(0)
+        jobs = [("replay", "a")] * 4 + [("replay", "b"), ("interactive", "c")] * 2
+        tasks = [
+            asyncio.create_task(scheduler.run(p, key, order.append, (p, key)))
+            for p, key in jobs
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.summary()["queued"] == {
+            "interactive": 2,
+            "continuous": 0,
+            "replay": 6,
+        }
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+
+    asyncio.run(main())
+    a, b, c = ("replay", "a"), ("replay", "b"), ("interactive", "c")
+    assert order == [c, c, a, b, a, b, a, a]
+    summary = scheduler.summary()
+    assert summary["running"] == 0 and not scheduler._finish
+    assert summary["wait"]["replay"]["calls"] == 6
+
+
+def test_weights():
+    scheduler = Scheduler(workers=1, weights={"replay": 16.0})
+    order = []
+    gate = threading.Event()
+
+    async def main():
+        blocker = asyncio.create_task(scheduler.run("replay", "x", gate.wait))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(scheduler.run(p, p, order.append, p))
+            for p in ["replay"] * 2 + ["interactive"] * 2
+        ]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+
+    asyncio.run(main())
+    assert order == ["replay", "interactive"] * 2
+
+
+def test_errors_and_cancellation():
+    scheduler = Scheduler(workers=1)
+    gate = threading.Event()
+    ran = []
+
+    async def main():
+        blocker = asyncio.create_task(scheduler.run("interactive", "x", gate.wait))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(scheduler.run("replay", "a", ran.append, 1))
+        failing = asyncio.create_task(scheduler.run("replay", "b", int, "x"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        gate.set()
+        await blocker
+        with pytest.raises(ValueError):
+            await failing
+
+    asyncio.run(main())
+    assert ran == [] and scheduler.running == 0
+
+
+def test_cancel_running():
+    scheduler = Scheduler(workers=1)
+    gate, done = threading.Event(), threading.Event()
+
+    async def main():
+        # A caller that gives up leaves the job to finish in its thread
+        running = asyncio.create_task(scheduler.run("replay", "a", gate.wait))
+        await asyncio.sleep(0)
+        running.cancel()
+        gate.set()
+        while scheduler.running:
+            await asyncio.sleep(0.01)
+        # Jobs still running when the loop shuts down are cancelled
+        asyncio.create_task(scheduler.run("replay", "b", done.wait))
+        await asyncio.sleep(0)
+        done.set()
+
+    asyncio.run(main())
+    assert scheduler.running == 0
+
+
+def test_deadlines():
+    scheduler = Scheduler(workers=1)
+    gate = threading.Event()
+    ran = []
+
+    async def main():
+        blocker = asyncio.create_task(scheduler.run("interactive", "x", gate.wait))
+        await asyncio.sleep(0)
+        now = time.perf_counter()
+        stale = scheduler.run("interactive", "a", ran.append, 1, deadline=now)
+        stale = asyncio.create_task(stale)
+        fresh = scheduler.run("interactive", "b", ran.append, 2, deadline=now + 60)
+        fresh = asyncio.create_task(fresh)
+        await asyncio.sleep(0.01)
+        gate.set()
+        await asyncio.gather(blocker, fresh)
+        with pytest.raises(Expired):
+            await stale
+
+    asyncio.run(main())
+    assert ran == [2] and scheduler.summary()["expired"]["interactive"] == 1
+
+
+def test_admin(make_client):
+    with make_client(admin_token="secret") as client:
+        headers = {"Authorization": "Bearer secret"}
+        summary = client.get("/admin/scheduler", headers=headers).json()
+        assert summary["workers"] == 2 and set(summary["wait"]) >= {"replay"}
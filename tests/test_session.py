@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from reapi.config import Settings
+from reapi.extensions import Extension
+from reapi.models import EEGValues, Message, Options
+from reapi.session import Session
+from reapi.websockets import manager
+
+TEXT = ["Some", "ai", "generated", "data"]
+
+
+def message(triggered=False):
+    return Message(triggered=triggered, values=EEGValues(Cx=1, Drm=2)).model_dump()
+
+
+def test_session():
+    session = Session(Options(ack=False), Settings(window=4))
+    with pytest.raises(AttributeError):
+        session.anything = None
+    # Nothing to decode before the first sample
+    assert asyncio.run(session.decode()) is None
+    assert asyncio.run(session.receive(message())) is None
+    assert asyncio.run(session.receive(message(True))) == {"text": TEXT}
+    assert (session.samples, session.triggers, session.decodes) == (2, 1, 1)
+    assert len(session.buffer) == 2 and session.latest == EEGValues(Cx=1, Drm=2)
+    assert session.last_seen >= session.opened
+    # Every hook of an extension is optional
+    session.extensions = (Extension(),)
+    assert asyncio.run(session.receive(message(True))) == {"text": TEXT}
+    session.close()
+
+
+class Spy(Extension):
+    def __init__(self):
+        self.events = []
+
+    def samples(self, session, now, triggered, values):
+        self.events.append(("samples", triggered, values.tolist()))
+
+    def respond(self, session, response):
+        self.events.append(("respond", response["text"]))
+
+    def close(self, session):
+        self.events.append(("close", session in manager.sessions))
+
+
+def test_extensions(make_client):
+    spy = Spy()
+    client = make_client()
+    client.app.state.extensions.append(lambda ws, session: spy)
+    with client:
+        with client.websocket_connect("/connect/text") as ws:
+            ws.send_json(message())
+            ws.receive_json()
+            (session,) = manager.sessions
+            assert session.samples == 1
+            ws.send_json(message(True))
+            ws.receive_json()
+    assert spy.events == [
+        ("samples", False, [[1.0, 2.0]]),
+        ("samples", True, [[1.0, 2.0]]),
+        ("respond", TEXT),
+        ("close", False),
+    ]
+    assert not manager.sessions
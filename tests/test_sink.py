@@ -0,0 +1,218 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from reapi import sink as sinks
+from reapi.config import Settings
+from reapi.models import CHANNELS
+from reapi.recording import Recording
+from reapi.sink import RecordingWriter, Sink, Writer
+
+
+def batch(id, start, n=4, rate=10.0):
+    values = np.arange(start, start + n, dtype=float)[:, None] * np.ones(len(CHANNELS))
+    return id, (start + n - 1) / rate, True, values, rate
+
+
+def put(sink, *items):
+    async def main():
+        for item in items:
+            await sink.put(item)
+
+    asyncio.run(main())
+
+
+def read(directory, id):
+    paths = sorted(
+        directory.glob(f"{id}-*.reapi"), key=lambda p: int(p.stem.rsplit("-", 1)[1])
+    )
+    parts = [Recording(path).samples() for path in paths]
+    return paths, np.concatenate([values[:, 0] for _, _, values in parts])
+
+
+def wait(condition):
+    deadline = time.time() + 5
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_recording(tmp_path):
+    sink = Sink(RecordingWriter(tmp_path))
+    for start in range(0, 12, 4):
+        put(sink, batch("a", start), batch("b", 100 + start))
+    sink.end("a")
+    sink.end("c")
+    sink.close()
+    assert sink.written == 24
+    paths, values = read(tmp_path, "a")
+    assert len(paths) == 1 and values.tolist() == list(range(12))
+    times, triggered, _ = Recording(paths[0]).samples()
+    assert np.allclose(times, np.arange(12) / 10)
+    assert triggered.tolist() == [False, False, False, True] * 3
+    assert read(tmp_path, "b")[1].tolist() == list(range(100, 112))
+
+
+def test_roll(tmp_path):
+    sink = Sink(RecordingWriter(tmp_path, roll_bytes=1))
+    put(sink, *(batch("a", start) for start in range(0, 12, 4)))
+    sink.close()
+    assert len(list(tmp_path.glob("a-*.reapi"))) == 3
+
+
+def test_roll_age(tmp_path):
+    writer = RecordingWriter(tmp_path, roll_seconds=0.05)
+    sink = Sink(writer, idle=0.01)
+    put(sink, batch("a", 0))
+    # Idle, the writer closes the file once it is old enough
+    assert wait(lambda: sink.written == 4 and not writer.files)
+    put(sink, batch("a", 4))
+    sink.close()
+    paths, values = read(tmp_path, "a")
+    assert len(paths) == 2 and values.tolist() == list(range(8))
+
+
+class Stalled(Writer):
+    def __init__(self, directory, error=None):
+        super().__init__(directory)
+        self.entered = threading.Event()
+        self.go = threading.Event()
+        self.error = error
+        self.rows = []
+        self.ended = []
+
+    def write(self, id, times, triggered, values):
+        self.entered.set()
+        self.go.wait()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        self.rows.extend(values[:, 0].tolist())
+
+    def end(self, id):
+        self.ended.append((id, len(self.rows)))
+
+
+def test_spill(tmp_path):
+    writer = Stalled(tmp_path)
+    sink = Sink(writer, size=1, policy="spill", spill=tmp_path)
+    put(sink, *(batch("a", start) for start in range(0, 40, 4)))
+    sink.end("a")
+    assert sink.spilled > 0
+    writer.go.set()
+    sink.close()
+    assert writer.rows == list(range(40)) and writer.ended == [("a", 40)]
+    assert not list(tmp_path.glob("spill-*"))
+
+
+def test_spill_errors(tmp_path):
+    writer = Stalled(tmp_path)
+    sink = Sink(writer, size=1, policy="spill", spill=tmp_path / "missing")
+    put(sink, *(batch("a", start) for start in range(0, 12, 4)))
+    writer.go.set()
+    sink.close()
+    assert sink.errors == sink.spilled > 0
+    assert writer.rows == list(range(len(writer.rows)))
+
+
+def test_backpressure(tmp_path):
+    writer = Stalled(tmp_path)
+    sink = Sink(writer, size=1)
+
+    async def main():
+        await sink.put(batch("a", 0))
+        await asyncio.to_thread(writer.entered.wait)
+        await sink.put(batch("a", 4))
+        waiting = asyncio.create_task(sink.put(batch("a", 8)))
+        # The put waits for room without holding up the event loop
+        await asyncio.sleep(0.05)
+        assert not waiting.done() and sink.blocked == 1
+        sink.end("b")
+        writer.go.set()
+        await waiting
+
+    asyncio.run(main())
+    sink.close()
+    assert writer.rows == list(range(12)) and [id for id, _ in writer.ended] == ["b"]
+
+
+def test_errors(tmp_path):
+    writer = Stalled(tmp_path, OSError("disk full"))
+    writer.go.set()
+    sink = Sink(writer)
+    put(sink, *(batch("a", start) for start in range(0, 12, 4)))
+    sink.close()
+    assert sink.errors == 1 and writer.rows == list(range(4, 12))
+    put(sink, batch("a", 12))
+    assert sink.dropped == 1
+    sink.close()
+
+
+def test_dead_writer(tmp_path):
+    writer = Stalled(tmp_path, SystemExit())
+    sink = Sink(writer, size=1, idle=0.01)
+
+    async def main():
+        await sink.put(batch("a", 0))
+        await asyncio.to_thread(writer.entered.wait)
+        await sink.put(batch("a", 4))
+        waiting = asyncio.create_task(sink.put(batch("a", 8)))
+        await asyncio.sleep(0.05)
+        writer.go.set()
+        # The writer thread exits and the waiting put gives up
+        await waiting
+
+    asyncio.run(main())
+    assert not sink.alive and sink.dropped == 1
+    sink.close()
+
+
+def test_sessions(make_client, tmp_path):
+    with make_client(sink="recording", sink_dir=tmp_path) as client:
+        with client.websocket_connect("/connect/text") as ws:
+            for i in range(5):
+                ws.send_json({"triggered": False, "values": {"Cx": i, "Drm": -i}})
+                ws.receive_json()
+    (path,) = tmp_path.glob("*.reapi")
+    _, _, values = Recording(path).samples()
+    assert values[:, CHANNELS.index("Cx")].tolist() == list(range(5))
+    assert sinks.sink is None
+    sinks.close_sink()
+
+
+def test_sink_dir():
+    with pytest.raises(ValueError, match="REAPI_SINK_DIR"):
+        sinks.open_sink(Settings(sink="recording"))
+
+
+def test_arrow(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    from reapi.sink import ArrowWriter
+
+    writer = ArrowWriter(tmp_path, roll_seconds=0.05, rows=6)
+    sink = Sink(writer, idle=0.01)
+    put(sink, *(batch("a", start) for start in range(0, 12, 4)))
+    assert wait(lambda: sink.written == 12 and writer.stream is None)
+    put(sink, batch("b", 12))
+    sink.close()
+    paths = sorted(tmp_path.glob("*.arrow"))
+    tables = [pa.ipc.open_file(p).read_all() for p in paths]
+    table = pa.concat_tables(tables)
+    assert len(paths) == 2
+    assert table.column(CHANNELS[0]).to_pylist() == list(range(16))
+    assert table.column("session").to_pylist() == ["a"] * 12 + ["b"] * 4
+
+
+def test_arrow_roll(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    from reapi.sink import ArrowWriter
+
+    sink = Sink(ArrowWriter(tmp_path, roll_bytes=1, rows=4))
+    put(sink, *(batch("a", start) for start in range(0, 12, 4)))
+    sink.close()
+    paths = list(tmp_path.glob("*.arrow"))
+    assert len(paths) == 3
+    assert all(pa.ipc.open_file(p).read_all().num_rows == 4 for p in paths)
@@ -0,0 +1,57 @@
+import pickle
+
+import numpy as np
+
+from reapi.buffer import RingBuffer
+from reapi.slots import RingStore, Slot
+from reapi.websockets import manager
+
+
+def test_store():
+    rng = np.random.default_rng(0)
+    store = RingStore(3, capacity=8, width=2)
+    buffers = [RingBuffer(8, 2) for _ in range(3)]
+    buffers[0].extend(rng.normal(size=(5, 2)))
+    slots = [store.allocate(buffer) for buffer in buffers]
+    assert store.allocate(RingBuffer(8, 2)) is None
+    assert len(store) == 3
+    for i, n in enumerate([13, 3, 8]):
+        rows = rng.normal(size=(n, 2))
+        buffers[i].extend(rows)
+        slots[i].extend(rows)
+    for slot, buffer in zip(slots, buffers):
+        assert np.array_equal(slot.view(), buffer.view()) and len(slot) == len(buffer)
+    out = np.empty((2, 8, 2))
+    batch = store.batch([2, 0], out=out)
+    assert batch is out
+    assert np.array_equal(batch[0], buffers[2].view())
+    assert np.array_equal(batch[1], buffers[0].view())
+    assert store.lengths.tolist() == [8, 3, 8]
+    short = store.batch([1])[0]
+    assert np.array_equal(short[5:], buffers[1].view()) and not short[:5].any()
+    copy = pickle.loads(pickle.dumps(slots[0]))
+    assert type(copy) is RingBuffer and np.array_equal(copy.view(), buffers[0].view())
+    assert copy.count == 18
+    detached = slots[1].detach()
+    assert np.array_equal(detached.view(), buffers[1].view()) and len(store) == 2
+    again = store.allocate(RingBuffer(8, 2))
+    assert again.index == 1 and not store.batch([1]).any()
+    assert store.allocate(RingBuffer(4, 2)) is None
+
+
+def test_connections(make_client):
+    with make_client(buffer_slots=1, window=16) as client:
+        with client.websocket_connect("/connect/text") as ws:
+            ws.send_json({"triggered": False, "values": {"Cx": 1, "Drm": 2}})
+            ws.receive_json()
+            with client.websocket_connect("/connect/text") as other:
+                other.send_json({"triggered": False, "values": {"Cx": 3, "Drm": 4}})
+                other.receive_json()
+                first, second = manager.sessions
+                assert isinstance(first.buffer, Slot)
+                assert not isinstance(second.buffer, Slot)
+                assert manager.store.batch([0])[0, -1].tolist() == [1, 2]
+            assert len(manager.store) == 1
+        assert len(manager.store) == 0
+        assert type(first.buffer) is RingBuffer
+        assert first.buffer.view().tolist() == [[1, 2]]
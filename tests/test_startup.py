@@ -0,0 +1,52 @@
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from reapi.app import make
+
+DEFERRED = {"numpy", "reapi.ai.text", "reapi.preprocess", "reapi.recording"}
+BUDGET = 0.1  # seconds spent in reapi's own modules
+
+
+def import_times(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "[us]" not in line:
+            own, _, name = line[len("import time:") :].split("|")
+            times[name.strip()] = int(own) / 1e6
+    return times
+
+
+def test_import_time():
+    times = import_times("reapi.main")
+    assert "reapi.main" in times
+    assert not DEFERRED & times.keys()
+    own = sum(t for name, t in times.items() if name.split(".")[0] == "reapi")
+    assert own < BUDGET
+
+
+async def warm_up(app):
+    await app.state.warmup
+
+
+def test_health(client):
+    assert client.get("/health/live").json() == {"status": "live"}
+    client.portal.call(warm_up, client.app)
+    assert client.get("/health/ready").json() == {"status": "ready"}
+
+
+def test_not_ready():
+    client = TestClient(make())
+    assert client.get("/health/live").status_code == 200
+    assert client.get("/health/ready").status_code == 503
+    # Sessions do not wait for a warm-up that never started
+    with client.websocket_connect("/connect/text") as ws:
+        ws.send_json({"triggered": False, "values": {"Cx": 1, "Drm": 2}})
+        assert ws.receive_json() == {"ack": "received"}
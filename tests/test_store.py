@@ -0,0 +1,101 @@
+import json
+
+import numpy as np
+
+from reapi import store
+from reapi.config import Settings
+from reapi.store import Series, Store
+from reapi.streams import Stream
+from reapi.websockets import manager
+
+
+def collect(slices):
+    slices = [s[-2:] for s in slices]
+    if not slices:
+        return [], []
+    times, values = zip(*slices)
+    return np.concatenate(times).tolist(), np.concatenate(values).tolist()
+
+
+def test_series(tmp_path):
+    series = Series(["x", "y"], chunk=10, hot=2, cold=3, path=tmp_path / "mot")
+    times = np.arange(95) / 10
+    values = np.column_stack([times, -times])
+    for part in np.array_split(np.arange(95), 7):
+        series.extend(times[part], values[part])
+    assert series.spilled == 3 and len(series.chunks) == 5
+    assert len(list((tmp_path / "mot").iterdir())) == 3
+    # The oldest chunks were dropped, others are on disk or in memory
+    stored, _ = collect(series.query())
+    assert stored == times[40:].tolist()
+    stored, rows = collect(series.query(4.55, 8.0))
+    assert stored == times[46:81].tolist() and rows == values[46:81].tolist()
+    assert collect(series.query(9.45)) == ([], [])
+    slices = series.query()
+    series.close()
+    assert not (tmp_path / "mot").exists()
+    # Chunks removed from disk since the query are skipped
+    assert collect(slices)[0] == times[70:].tolist()
+
+
+def test_memory():
+    series = Series(["x"], chunk=4, hot=2)
+    series.extend(np.arange(20.0), np.arange(20.0)[:, None])
+    assert collect(series.query(end=14))[0] == list(range(12, 15))
+    series.close()
+
+
+def test_redeclare():
+    history = Store(Settings(store_chunk=4, store_hot=2))
+    history.stream(None, Stream("mot", ["x"], 10.0, 8), np.ones((2, 1)), [0, 1])
+    mot = Stream("mot", ["x", "y"], 10.0, 8)
+    history.stream(None, mot, np.full((2, 2), 2.0), np.array([2.0, 3.0]))
+    # A stream redeclared with other channels starts a new history
+    assert collect(history.slices(streams=["mot"]))[1] == [[2, 2], [2, 2]]
+    history.close(None)
+
+
+def test_window(make_client, tmp_path):
+    settings = dict(store_chunk=16, store_hot=1, store_dir=tmp_path)
+    with make_client(admin_token="secret", **settings) as client:
+        with client.websocket_connect("/connect/text") as ws:
+            for i in range(40):
+                ws.send_json({"triggered": False, "values": {"Cx": i, "Drm": -i}})
+                ws.receive_json()
+            ws.send_json({"declare": "mot", "channels": ["x"], "rate": 4})
+            ws.receive_json()
+            ws.send_json(
+                {"stream": "mot", "times": [1, 2, 3], "samples": [[1], [2], [3]]}
+            )
+            ws.receive_json()
+            ws.send_json({"stream": "mot", "times": [5], "values": [5]})
+            ws.receive_json()
+            (session,) = manager.sessions
+            url = f"/sessions/{session.id}/window"
+            assert client.get(url).status_code == 401
+            client.headers["Authorization"] = "Bearer secret"
+            lines = client.get(url).text.splitlines()
+            frames = [json.loads(line) for line in lines]
+            eeg = sum((f["samples"] for f in frames if "stream" not in f), [])
+            assert [row[0] for row in eeg] == list(range(40))
+            assert frames[-1] == {
+                "stream": "mot",
+                "times": [1, 2, 3, 5],
+                "samples": [[1], [2], [3], [5]],
+            }
+            headers = {"Accept": "application/octet-stream"}
+            query = {"streams": "mot,met", "start": 1.5, "end": 4}
+            body = client.get(url, params=query, headers=headers).content
+            (id, times, values), offset = store.unpack(body)
+            assert id == "mot" and times.tolist() == [2, 3] and offset == len(body)
+            assert client.get("/sessions/nope/window").status_code == 404
+        assert not (tmp_path / session.id).exists()
+
+
+def test_ingest(make_client):
+    with make_client(admin_token="secret", store_hot=0) as client:
+        client.headers["Authorization"] = "Bearer secret"
+        id = client.post("/ingest").json()["id"]
+        response = client.get(f"/sessions/{id}/window")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "no history is kept"
@@ -0,0 +1,86 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from reapi import codec
+from reapi.ai import registry
+from reapi.config import Settings
+from reapi.models import Options
+from reapi.session import Session
+from reapi.websockets import manager
+
+MOT = {"declare": "mot", "channels": ["ACCX", "ACCY", "ACCZ"], "rate": 64}
+
+
+class Spy:
+    def __init__(self):
+        self.calls = []
+
+    def head(self, values, window, features):
+        self.calls.append(features["streams"])
+        return ["ok"]
+
+
+def test_streams(make_client):
+    with make_client(window=256, sample_rate=128) as client:
+        with client.websocket_connect("/connect/text") as ws:
+            ws.send_json(MOT)
+            assert ws.receive_json() == {"declared": "mot"}
+            ws.send_json({"stream": "mot", "time": 1.0, "values": [1, 2, 3]})
+            assert ws.receive_json() == {"ack": "received"}
+            batch = codec.encode(np.ones((200, 3)), scale=0.5)
+            ws.send_json(dict(batch, stream="mot", times=list(range(2, 202))))
+            ws.receive_json()
+            (session,) = manager.sessions
+            mot = session.streams["mot"]
+            assert mot.buffer.capacity == 128 and mot.samples == 201
+            assert mot.times.view()[-1, 0] == 201
+            assert session.samples == 0
+            ws.send_json({"stream": "mot", "triggered": True, "values": [0, 0, 0]})
+            assert ws.receive_json() == {"text": ["Some", "ai", "generated", "data"]}
+
+
+def test_features():
+    session = Session(Options(ack=False), Settings())
+    spy = Spy()
+    session.version = "spy"
+    registry.add("spy", spy)
+    registry.pins[session.id] = "spy"
+    try:
+        session.declare(dict(MOT, declare="pow", channels=["a"], rate=2))
+        keyed = {"stream": "pow", "values": {"a": 7.0}, "triggered": True}
+        assert asyncio.run(session.receive(keyed)) == {"text": ["ok"]}
+    finally:
+        del registry.models["spy"], registry.stats["spy"]
+        session.close()
+    (streams,) = spy.calls
+    assert streams["pow"].tolist() == [[7.0]]
+
+
+def test_invalid():
+    session = Session(Options(), Settings(max_streams=1))
+    session.declare(MOT)
+    assert session.declare(MOT) == {"declared": "mot"}
+    with pytest.raises(ValueError, match="at most 1"):
+        session.declare(dict(MOT, declare="pow"))
+    for frame in [
+        {"stream": "pow", "values": [1]},
+        {"stream": "mot", "values": [1, 2]},
+        {"stream": "mot", "values": [1, 2, 3], "times": [1, 2]},
+        {"stream": "mot", "values": [1, 2, 3], "time": float("nan")},
+        {"stream": "mot", "values": [1, 2, 3], "times": [float("inf")]},
+    ]:
+        with pytest.raises(ValueError):
+            asyncio.run(session.receive(frame))
+    # Rejected times are not stored and later frames go through
+    asyncio.run(session.receive({"stream": "mot", "values": [1, 2, 3], "time": 5}))
+    assert session.streams["mot"].times.view()[:, 0].tolist() == [5]
+    for declaration in [
+        dict(MOT, channels=[]),
+        dict(MOT, declare=""),
+        dict(MOT, rate=-1),
+    ]:
+        with pytest.raises(ValueError):
+            session.declare(declaration)
+    session.close()
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+from reapi import admin
+from reapi.scheduler import Scheduler
+from reapi.tracing import NOOP, Tracer, span, tracer
+
+HEADERS = {"Authorization": "Bearer secret"}
+SAMPLE = {"triggered": True, "values": {"Cx": 1, "Drm": 2}}
+
+
+def test_sampling():
+    assert Tracer(rate=0).trace("frame") is NOOP
+    assert span("parse") is NOOP
+    quiet = Tracer(rate=1)
+    with quiet.trace("frame"):
+        with span("parse"):
+            pass
+    assert span("parse") is NOOP
+    (trace,) = quiet.traces
+    assert [s["name"] for s in trace["spans"]] == ["parse"]
+    assert quiet.stats["frame.parse"].calls == 1
+
+
+def test_queued_jobs():
+    quiet = Tracer(rate=1)
+    pool = Scheduler(workers=1)
+
+    def infer():
+        with span("inference"):
+            pass
+
+    async def decode(name):
+        with quiet.trace(name):
+            await pool.run("interactive", name, infer)
+
+    async def main():
+        await asyncio.gather(*(decode(name) for name in "abc"))
+
+    asyncio.run(main())
+    # Queued jobs run in the context of their caller, not of the job before
+    assert {t["name"]: len(t["spans"]) for t in quiet.traces} == {
+        "a": 1,
+        "b": 1,
+        "c": 1,
+    }
+
+
+def test_traces(make_client):
+    with make_client(admin_token="secret", trace_rate=1.0) as client:
+        tracer.traces.clear()
+        with client.websocket_connect("/connect/text") as ws:
+            ws.send_json(SAMPLE)
+            ws.receive_json()
+        summary = client.get("/admin/traces?limit=1", headers=HEADERS).json()
+        (trace,) = summary["recent"]
+        names = [s["name"] for s in trace["spans"]]
+        assert names == [
+            "parse",
+            "validate",
+            "extensions",
+            "preprocess",
+            "scheduled",
+            "inference",
+            "send",
+        ]
+        assert summary["stages"]["frame.inference"]["calls"] >= 1
+        response = client.put("/admin/traces?rate=0", headers=HEADERS)
+        assert response.json()["rate"] == 0 and tracer.rate == 0
+        assert client.put("/admin/traces?rate=2", headers=HEADERS).status_code == 422
+
+
+def spin(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+
+def test_profile(make_client):
+    stop = threading.Event()
+    worker = threading.Thread(target=spin, args=(stop,), name="busy worker")
+    worker.start()
+    try:
+        with make_client(admin_token="secret") as client:
+            response = client.get("/admin/profile?seconds=0.2", headers=HEADERS)
+            # One profile at a time
+            client.portal.call(admin.profiling.acquire)
+            try:
+                second = client.get("/admin/profile?seconds=0.2", headers=HEADERS)
+                assert second.status_code == 409
+            finally:
+                admin.profiling.release()
+    finally:
+        stop.set()
+        worker.join()
+    lines = response.text.splitlines()
+    assert response.headers["content-type"].startswith("text/plain")
+    busy = [line for line in lines if line.startswith("busy_worker;")]
+    assert busy and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("test_tracing:spin" in line for line in busy)
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from reapi.websockets import manager
+
+SAMPLE = {"triggered": False, "values": {"Cx": 1, "Drm": 2}}
+
+
+def test_heartbeat(make_client):
+    with make_client(heartbeat=0.05, idle_timeout=0.5) as client:
+        with client.websocket_connect("/connect/text") as ws:
+            ping = ws.receive_json()["ping"]
+            ws.send_json({"pong": ping})
+            ws.send_json({"ping": 1})
+            assert ws.receive_json() == {"pong": 1}
+            (session,) = manager.sessions
+            assert session.samples == 0 and session.pinged == ping
+
+
+def test_idle_timeout(make_client):
+    with make_client(heartbeat=0, idle_timeout=0.1) as client:
+        with client.websocket_connect("/connect/text") as ws:
+            ws.send_json(SAMPLE)
+            assert ws.receive_json() == {"ack": "received"}
+            with pytest.raises(WebSocketDisconnect) as e:
+                ws.receive_json()
+            assert e.value.code == 1001 and e.value.reason == "idle timeout"
+            assert not manager.active_connections
+    assert not manager.clients
+
+
+class Bare:
+    client = None
+
+    async def accept(self):
+        pass
+
+
+def test_without_session(make_client):
+    ws = Bare()
+
+    async def main():
+        await manager.connect(ws)
+        reaper = asyncio.create_task(manager.reap(0.01, 0.01))
+        await asyncio.sleep(0.05)
+        reaper.cancel()
+
+    asyncio.run(main())
+    # Connections without a session are neither pinged nor closed
+    assert ws in manager.active_connections
+    manager.disconnect(ws)
+    manager.close_stream("nope")
+    assert not manager.active_connections and not manager.clients
+    with make_client(heartbeat=0, idle_timeout=0) as client:
+        assert client.get("/health/live").status_code == 200
+
+
+@pytest.mark.parametrize(
+    "limits", [{"max_connections": 1}, {"max_client_connections": 1}]
+)
+def test_connection_limits(make_client, limits):
+    with make_client(**limits) as client:
+        with client.websocket_connect("/connect/text"):
+            with pytest.raises(WebSocketDisconnect) as e:
+                with client.websocket_connect("/connect/text"):
+                    pass  # pragma: no cover
+            assert e.value.code == 1013
+        with client.websocket_connect("/connect/text") as ws:
+            ws.send_json(SAMPLE)
+            assert ws.receive_json() == {"ack": "received"}
+
+
+def test_max_message(make_client):
+    with make_client(max_message=64) as client:
+        with client.websocket_connect("/connect/text") as ws:
+            ws.send_json(dict(SAMPLE, padding="x" * 64))
+            with pytest.raises(WebSocketDisconnect) as e:
+                ws.receive_json()
+            assert e.value.code == 1009
+    assert not manager.active_connections
+
+
+def test_invalid_frames(make_client):
+    with make_client() as client:
+        with client.websocket_connect("/connect/text") as ws:
+            ws.send_text("{")
+            assert ws.receive_json()["error"].startswith("invalid JSON")
+            ws.send_json({"stream": "mot", "values": [1]})
+            assert ws.receive_json() == {"error": "stream: mot was not declared"}
+            ws.send_json({"marker": 3})
+            assert ws.receive_json() == {"error": "marker: labels are strings"}
+            ws.send_json({"triggered": True, "values": {"Cx": 1}})
+            assert ws.receive_json() == {"error": "values.Drm: Field required"}
+            ws.send_bytes(b"RB")
+            assert "header" in ws.receive_json()["error"]
+            # The connection carries on
+            ws.send_json({"values": {"Cx": 1, "Drm": 2}})
+            assert ws.receive_json() == {"ack": "received"}